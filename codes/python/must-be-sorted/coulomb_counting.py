@@ -1,7 +1,87 @@
-import time
+import json
+import os
 import random
+import numpy as np
 import matplotlib.pyplot as plt
 
+
+# The clamped scan below follows soc_estimation/src/coulomb_counting.py
+# (_clamped_scan / _clamped_loop) with the bounds fixed at 0 and 100 %. This
+# script is run on its own from this folder, which is not a package and does
+# not have soc_estimation on its path, so it keeps its own copy; changes to
+# one should be made to the other.
+
+# Window scanned right after the SOC hits a bound; it doubles every time it
+# is consumed without a violation.
+_MIN_SCAN_WINDOW = 64
+# Samples stepped through in plain floats when the SOC keeps hitting a bound.
+_LOOP_BLOCK = 4096
+
+
+def _clamped_soc_loop(soc, delta_soc):
+    """
+    Plain-float version of the clamped update, for stretches where the SOC
+    hits a bound too often for the vectorized scan to pay off.
+    """
+    trace = [soc]
+    append = trace.append
+    for delta in delta_soc:
+        soc = max(0.0, min(100.0, soc - delta))
+        append(soc)
+    return trace
+
+
+def _clamped_soc_trace(soc, delta_soc):
+    """
+    Applies soc -= delta; soc = max(0, min(100, soc)) for every delta.
+
+    ``np.subtract.accumulate`` performs the same sequential float operations
+    as repeated ``update`` calls. When the running SOC leaves [0, 100] it is
+    clamped, the deltas that keep pushing into the bound (e.g. charging at
+    100%) are filled in directly and the scan restarts; if the bound is hit
+    again soon after, the next block is stepped through in plain floats.
+
+    :param soc: SOC in percentage before the first delta.
+    :param delta_soc: Array of SOC decrements in percentage.
+    :return: Array of SOC values after each delta.
+    """
+    n = len(delta_soc)
+    trace = np.empty(n + 1)
+    trace[0] = soc
+    t = 0
+    window = n
+    while t < n:
+        stop = min(n, t + window)
+        segment = trace[t:stop + 1]
+        np.subtract.accumulate(np.concatenate((trace[t:t + 1], delta_soc[t:stop])), out=segment)
+        violated = (segment[1:] < 0.0) | (segment[1:] > 100.0)
+        if not violated.any():
+            t = stop
+            window *= 2
+            continue
+
+        first = 1 + int(np.argmax(violated))
+        t += first
+        bound = 100.0 if trace[t] > 100.0 else 0.0
+        trace[t] = bound
+        window = _MIN_SCAN_WINDOW
+
+        # Deltas pushing further into the bound leave the SOC pinned there.
+        ahead = delta_soc[t:t + _LOOP_BLOCK]
+        pinned = ahead <= 0 if bound == 100.0 else ahead >= 0
+        run = len(ahead) if pinned.all() else int(np.argmin(pinned))
+        trace[t + 1:t + 1 + run] = bound
+        t += run
+        if run == len(ahead):
+            continue
+
+        if first < _MIN_SCAN_WINDOW:
+            stop = min(n, t + _LOOP_BLOCK)
+            trace[t:stop + 1] = _clamped_soc_loop(float(trace[t]), delta_soc[t:stop].tolist())
+            t = stop
+    return trace[1:]
+
+
 class CoulombCounter:
     def __init__(self, capacity_ah, initial_soc=100.0):
         """
@@ -32,6 +112,91 @@ class CoulombCounter:
         self.soc -= delta_soc  # Subtract because discharge decreases SOC
         self.soc = max(0.0, min(100.0, self.soc))  # Clamp SOC between 0% and 100%
         self.previous_time = current_time
+
+    def update_chunk(self, currents_a, timestamps):
+        """
+        Update the SOC with a chunk of samples at once.
+
+        Equivalent to calling ``update`` for every sample in order, but
+        integrated with NumPy. Only the last timestamp and the SOC are kept,
+        so memory use does not grow with the length of the feed.
+
+        :param currents_a: Array of currents in Amperes (A). Positive for discharge.
+        :param timestamps: Array of timestamps in seconds, same length as currents_a.
+        :return: Array of SOC values in percentage after each sample.
+        """
+        currents_a = np.asarray(currents_a, dtype=float)
+        timestamps = np.asarray(timestamps, dtype=float)
+        if currents_a.shape != timestamps.shape or currents_a.ndim != 1:
+            raise ValueError("currents_a and timestamps must be 1-D arrays of equal length")
+        if len(timestamps) == 0:
+            return np.empty(0)
+
+        if self.previous_time is None:
+            # First sample ever: only sets the time reference, like update().
+            self.previous_time = float(timestamps[0])
+            currents_a = currents_a[1:]
+            timestamps = timestamps[1:]
+            first = [self.soc]
+        else:
+            first = []
+
+        delta_time_h = np.diff(timestamps, prepend=self.previous_time) / 3600
+        delta_soc = (currents_a * delta_time_h) / self.capacity_ah * 100
+        trace = _clamped_soc_trace(self.soc, delta_soc)
+        if len(trace):
+            self.soc = float(trace[-1])
+            self.previous_time = float(timestamps[-1])
+        return np.concatenate((first, trace))
+
+    def get_state(self):
+        """
+        Get the counter state needed to resume integration.
+
+        :return: Dictionary with capacity, SOC and last timestamp.
+        """
+        return {
+            'capacity_ah': self.capacity_ah,
+            'soc': self.soc,
+            'previous_time': self.previous_time,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Restore a counter from a state returned by ``get_state``.
+
+        :param state: Dictionary with capacity, SOC and last timestamp.
+        :return: CoulombCounter continuing from that state.
+        """
+        counter = cls(capacity_ah=state['capacity_ah'], initial_soc=state['soc'])
+        counter.previous_time = state['previous_time']
+        return counter
+
+    def save_state(self, path):
+        """
+        Write the counter state to a JSON checkpoint file.
+
+        The file is replaced atomically, so a crash mid-write leaves the
+        previous checkpoint intact.
+
+        :param path: Path of the checkpoint file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.get_state(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_state(cls, path):
+        """
+        Restore a counter from a JSON checkpoint file.
+
+        :param path: Path of the checkpoint file.
+        :return: CoulombCounter continuing from the checkpoint.
+        """
+        with open(path) as f:
+            return cls.from_state(json.load(f))
     
     def get_soc(self):
         """
@@ -50,39 +215,41 @@ def simulate_current():
     """
     return random.uniform(-2.0, 2.0)
 
+def simulate_current_chunk(size, rng):
+    """
+    Simulate a chunk of current measurements.
+    Random currents between -2A (charging) and 2A (discharging).
+
+    :param size: Number of samples.
+    :param rng: NumPy random generator.
+    :return: Array of simulated currents in Amperes.
+    """
+    return rng.uniform(-2.0, 2.0, size)
+
 def main():
     # Initialize Coulomb Counter with a 100 Ah battery, starting at 100% SOC
     bms = CoulombCounter(capacity_ah=100.0, initial_soc=100.0)
     
     # Simulation parameters
     simulation_duration = 60  # seconds
-    start_time = time.time()
-    current_time = start_time
-    end_time = start_time + simulation_duration
     interval = 1  # seconds
+    chunk_size = 10  # samples per chunk, as they would arrive from a CAN log
+    rng = np.random.default_rng()
     
     # Data storage for plotting
-    time_data = []
-    soc_data = []
-    current_data = []
+    time_data = np.arange(0, simulation_duration, interval, dtype=float)
+    current_data = np.empty_like(time_data)
+    soc_data = np.empty_like(time_data)
     
     print("Starting Coulomb Counting Simulation")
     print(f"Initial SOC: {bms.get_soc():.2f}%\n")
     
-    while current_time < end_time:
-        current = simulate_current()
-        bms.update(current_a=current, current_time=current_time)
-        soc = bms.get_soc()
-        
-        elapsed_time = current_time - start_time
-        time_data.append(elapsed_time)
-        soc_data.append(soc)
-        current_data.append(current)
-        
-        print(f"Time: {int(elapsed_time)}s | Current: {current:.2f}A | SOC: {soc:.2f}%")
-        
-        time.sleep(interval)  # Wait for the next interval
-        current_time = time.time()
+    for start in range(0, len(time_data), chunk_size):
+        stop = min(start + chunk_size, len(time_data))
+        current_data[start:stop] = simulate_current_chunk(stop - start, rng)
+        soc_data[start:stop] = bms.update_chunk(current_data[start:stop], time_data[start:stop])
+        print(f"Time: {int(time_data[stop - 1])}s | Mean current: "
+              f"{current_data[start:stop].mean():.2f}A | SOC: {bms.get_soc():.2f}%")
     
     print(f"\nFinal SOC after {simulation_duration} seconds: {bms.get_soc():.2f}%")
     
@@ -1,7 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from filterpy.kalman import UnscentedKalmanFilter, MerweScaledSigmaPoints
-from filterpy.kalman import ExtendedKalmanFilter
+# The filters come from soc_estimation/src; run from the repository root with
+#   PYTHONPATH=codes/python/soc_estimation/src python codes/python/must-be-sorted/ekf_ukf.py
+from nonlinear_filters import ExtendedKalmanFilter, UnscentedKalmanFilter
 
 # Simulation parameters
 np.random.seed(42)
@@ -10,21 +11,20 @@ steps = 50
 v = 1.0  # Velocity (m/s)
 true_state = np.array([0, 0, np.pi/4])  # Initial state [x, y, theta]
 
-# Motion model
-
-def motion_model(state, dt):
-    x, y, theta = state
+# Motion model, evaluated on states as rows of an (m, 3) array
+def motion_model(states, dt):
+    x, y, theta = states.T
     x_new = x + dt * v * np.cos(theta)
     y_new = y + dt * v * np.sin(theta)
     theta_new = theta  # Constant orientation for simplicity
-    return np.array([x_new, y_new, theta_new])
+    return np.column_stack((x_new, y_new, theta_new))
 
-# Measurement model
-def measurement_model(state):
-    x, y, _ = state
+# Measurement model, evaluated on states as rows of an (m, 3) array
+def measurement_model(states):
+    x, y, _ = states.T
     r = np.sqrt(x**2 + y**2)  # Range
     b = np.arctan2(y, x)  # Bearing
-    return np.array([r, b])
+    return np.column_stack((r, b))
 
 # EKF Jacobians
 def jacobian_motion(state, dt):
@@ -47,46 +47,28 @@ def jacobian_measurement(state):
 true_trajectory = [true_state]
 measurements = []
 for _ in range(steps):
-    true_state = motion_model(true_state, T)
+    true_state = motion_model(true_state[None], T)[0]
     true_trajectory.append(true_state)
-    noisy_measurement = measurement_model(true_state) + np.random.normal(0, [0.1, 0.05])
+    noisy_measurement = measurement_model(true_state[None])[0] + np.random.normal(0, [0.1, 0.05])
     measurements.append(noisy_measurement)
 
 true_trajectory = np.array(true_trajectory)
 measurements = np.array(measurements)
 
-# EKF implementation
-ekf = ExtendedKalmanFilter(dim_x=3, dim_z=2)
-ekf.x = np.array([0, 0, np.pi / 4])  # Initial estimate
-ekf.P = np.eye(3) * 0.1
-ekf.R = np.diag([0.1, 0.05])  # Measurement noise covariance
-ekf.Q = np.diag([0.01, 0.01, 0.01])  # Process noise covariance
-
-ekf_trajectory = []
-for z in measurements:
-    ekf.F = jacobian_motion(ekf.x, T)
-    ekf.predict()
-    ekf.H = jacobian_measurement(ekf.x)
-    ekf.update(z, HJacobian=jacobian_measurement, Hx=measurement_model)
-    ekf_trajectory.append(ekf.x.copy())
+initial_estimate = np.array([0, 0, np.pi / 4])
+P0 = np.eye(3) * 0.1
+R = np.diag([0.1, 0.05])  # Measurement noise covariance
+Q = np.diag([0.01, 0.01, 0.01])  # Process noise covariance
 
-ekf_trajectory = np.array(ekf_trajectory)
-
-# UKF implementation
-sigma_points = MerweScaledSigmaPoints(n=3, alpha=0.1, beta=2, kappa=0)
-ukf = UnscentedKalmanFilter(dim_x=3, dim_z=2, dt=T, fx=motion_model, hx=measurement_model, points=sigma_points)
-ukf.x = np.array([0, 0, np.pi / 4])  # Initial estimate
-ukf.P = np.eye(3) * 0.1
-ukf.R = np.diag([0.1, 0.05])  # Measurement noise covariance
-ukf.Q = np.diag([0.01, 0.01, 0.01])  # Process noise covariance
-
-ukf_trajectory = []
-for z in measurements:
-    ukf.predict(T)
-    ukf.update(z)
-    ukf_trajectory.append(ukf.x.copy())
+# EKF implementation
+ekf = ExtendedKalmanFilter(initial_estimate, P0, Q, R, motion_model, measurement_model,
+                           jacobian_motion, jacobian_measurement)
+ekf_trajectory, _ = ekf.run(measurements, dt=T)
 
-ukf_trajectory = np.array(ukf_trajectory)
+# UKF implementation: all sigma points go through the models in one call
+ukf = UnscentedKalmanFilter(initial_estimate, P0, Q, R, motion_model, measurement_model,
+                            alpha=0.1, beta=2, kappa=0)
+ukf_trajectory, _ = ukf.run(measurements, dt=T)
 
 # Plot results
 plt.figure(figsize=(10, 6))
@@ -1,8 +1,104 @@
+import sys
+import time
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.linalg import cho_factor, cho_solve, solve_discrete_are, solve_triangular
+from scipy.signal import lfilter
+
+# Steady-state solutions keyed by the bytes of (A, C, Q, R). B is not part of
+# the key because the control input does not affect the covariance.
+_STEADY_STATE_CACHE = {}
+
+def _matrix_key(*matrices):
+    return tuple((m.shape, m.dtype.str, m.tobytes()) for m in map(np.asarray, matrices))
+
+def steady_state_gain(A, C, Q, R):
+    """
+    Solve the discrete algebraic Riccati equation for a time-invariant filter.
+
+    Results are cached, so filters sharing the same model solve it only once.
+
+    :param A: State transition matrix (n x n).
+    :param C: Measurement matrix (p x n).
+    :param Q: Process noise covariance (n x n).
+    :param R: Measurement noise covariance (p x p).
+    :return: Tuple (K, P_prior, P_post) of steady-state gain, predicted and
+             updated covariances.
+    """
+    key = _matrix_key(A, C, Q, R)
+    if key not in _STEADY_STATE_CACHE:
+        P_prior = solve_discrete_are(A.T, C.T, Q, R)
+        S = C @ P_prior @ C.T + R
+        K = np.linalg.solve(S, C @ P_prior).T
+        P_post = (np.eye(A.shape[0]) - K @ C) @ P_prior
+        _STEADY_STATE_CACHE[key] = (K, P_prior, P_post)
+    return _STEADY_STATE_CACHE[key]
+
+def _sqrt_psd(M):
+    """
+    Lower-triangular square root L of a positive semi-definite matrix, M = L L^T.
+    """
+    try:
+        return np.linalg.cholesky(M)
+    except np.linalg.LinAlgError:
+        # Singular (e.g. noise on only some states): go through the
+        # eigendecomposition and re-triangularize with QR.
+        w, V = np.linalg.eigh(M)
+        root = V * np.sqrt(np.clip(w, 0.0, None))
+        return np.linalg.qr(root.T, mode='r').T
+
+def _linear_recurrence(M, drive, x0):
+    """
+    Evaluate x[k] = M x[k-1] + drive[k] for all k.
+
+    M is diagonalized so every mode becomes a first-order filter run by
+    lfilter; badly conditioned eigenvectors fall back to a plain loop.
+
+    :param M: Closed-loop matrix (n x n).
+    :param drive: Input sequence (T x n).
+    :param x0: State before the first step (n,).
+    :return: States (T x n).
+    """
+    eigvals, V = np.linalg.eig(M)
+    if np.linalg.cond(V) < 1e8:
+        modes = np.linalg.solve(V, drive.T).astype(complex)
+        modes0 = np.linalg.solve(V, x0.astype(complex))
+        for i, lam in enumerate(eigvals):
+            modes[i], _ = lfilter([1.0], [1.0, -lam], modes[i], zi=[lam * modes0[i]])
+        states = (V @ modes).T
+        return states.real if np.isrealobj(M) else states
+
+    states = np.empty_like(drive)
+    x = x0
+    for k in range(len(drive)):
+        x = M @ x + drive[k]
+        states[k] = x
+    return states
+
+UPDATE_METHODS = ('inverse', 'cholesky', 'sqrt')
+# Smallest innovation covariance solved through SciPy's Cholesky routines;
+# below it their call overhead outweighs the factorization and a NumPy
+# solve of the small symmetric S is faster.
+_CHOLESKY_MIN_DIM = 64
 
 class KalmanFilterBMS:
-    def __init__(self, A, B, C, Q, R, P, x0):
+    def __init__(self, A, B, C, Q, R, P, x0, steady_state=False, tol=1e-12, update_method='inverse'):
+        """
+        :param update_method: How the measurement update is computed:
+                              'inverse' - explicit inverse of S and (I - KC)P,
+                              'cholesky' - solve of S (Cholesky for large S)
+                              and Joseph-form covariance update, which keeps
+                              P symmetric positive definite under rounding;
+                              faster than 'inverse' for scalar measurements,
+                              slightly slower for vector ones,
+                              'sqrt' - square-root filter propagating a
+                              Cholesky factor of P through QR decompositions;
+                              the most robust and also the slowest method.
+        :param steady_state: Switch to the cached steady-state gain once the
+                             predicted covariance is within tol (relative) of
+                             the Riccati solution.
+        :param tol: Relative covariance tolerance that ends the transient.
+        """
         self.A = A
         self.B = B
         self.C = C
@@ -10,22 +106,217 @@ class KalmanFilterBMS:
         self.R = R
         self.P = P
         self.x = x0
+        self.steady_state = steady_state
+        self.tol = tol
+        self.converged = False
+        if update_method not in UPDATE_METHODS:
+            raise ValueError(f"update_method must be one of {UPDATE_METHODS}, got '{update_method}'")
+        self.update_method = update_method
+        if update_method == 'sqrt':
+            self.L = _sqrt_psd(P)
+            self.sqrt_Q = _sqrt_psd(Q)
+            self.sqrt_R = _sqrt_psd(R)
+
+    def _check_convergence(self):
+        if not self.steady_state or self.converged:
+            return
+        K, P_prior, P_post = steady_state_gain(self.A, self.C, self.Q, self.R)
+        if np.linalg.norm(self.P - P_prior) <= self.tol * np.linalg.norm(P_prior):
+            self.converged = True
+            self.K = K
+            self.P = P_prior
 
     def predict(self, u):
         self.x = self.A @ self.x + self.B @ u
-        self.P = self.A @ self.P @ self.A.T + self.Q
+        if self.converged:
+            return
+        if self.update_method == 'sqrt':
+            # P = [A L, sqrt(Q)] [A L, sqrt(Q)]^T, re-triangularized by QR.
+            pre = np.hstack((self.A @ self.L, self.sqrt_Q))
+            self.L = np.linalg.qr(pre.T, mode='r').T
+            self.P = self.L @ self.L.T
+        else:
+            self.P = self.A @ self.P @ self.A.T + self.Q
+        self._check_convergence()
 
     def update(self, z):
-        S = self.C @ self.P @ self.C.T + self.R
-        K = self.P @ self.C.T @ np.linalg.inv(S)
+        if self.converged:
+            # Steady state: the covariance no longer changes.
+            self.x = self.x + self.K @ (z - self.C @ self.x)
+            return
+        if self.update_method == 'cholesky':
+            self._update_cholesky(z)
+        elif self.update_method == 'sqrt':
+            self._update_sqrt(z)
+        else:
+            S = self.C @ self.P @ self.C.T + self.R
+            K = self.P @ self.C.T @ np.linalg.inv(S)
+            y = z - (self.C @ self.x)
+            self.x = self.x + K @ y
+            self.P = (np.eye(self.P.shape[0]) - K @ self.C) @ self.P
+
+    def _update_cholesky(self, z):
+        CP = self.C @ self.P
+        S = CP @ self.C.T + self.R
+        if S.shape == (1, 1):
+            # Scalar measurement: the solve is a division.
+            K = CP.T / S[0, 0]
+        elif S.shape[0] < _CHOLESKY_MIN_DIM:
+            K = np.linalg.solve(S, CP).T
+        else:
+            K = cho_solve(cho_factor(S, lower=True, check_finite=False), CP, check_finite=False).T
         y = z - (self.C @ self.x)
         self.x = self.x + K @ y
-        self.P = (np.eye(self.P.shape[0]) - K @ self.C) @ self.P
+        # Joseph form keeps P positive definite under rounding; averaging
+        # with the transpose removes the asymmetry rounding would accumulate.
+        I_KC = np.eye(self.P.shape[0]) - K @ self.C
+        P = I_KC @ self.P @ I_KC.T + K @ self.R @ K.T
+        self.P = 0.5 * (P + P.T)
+
+    def _update_sqrt(self, z):
+        # Triangularizing the pre-array
+        #     [sqrt(R)  C L]
+        #     [   0      L ]
+        # gives [[sqrt(S), 0], [K sqrt(S), L+]], with L+ the updated factor.
+        p, n = self.C.shape
+        pre = np.block([[self.sqrt_R, self.C @ self.L], [np.zeros((n, p)), self.L]])
+        post = np.linalg.qr(pre.T, mode='r').T
+        sqrt_S = post[:p, :p]
+        K_sqrt_S = post[p:, :p]
+        y = z - (self.C @ self.x)
+        if p == 1:
+            self.x = self.x + K_sqrt_S * (y[0, 0] / sqrt_S[0, 0])
+        else:
+            self.x = self.x + K_sqrt_S @ solve_triangular(sqrt_S, y, lower=True, check_finite=False)
+        self.L = post[p:, p:]
+        self.P = self.L @ self.L.T
+
+    def get_state(self):
+        return self.x
+
+    def filter(self, zs, us=None):
+        """
+        Run predict/update over a whole measurement sequence.
+
+        Without steady_state every step is a full recursion. With it, the
+        full recursion only covers the initial transient; the rest is the
+        linear recurrence x[k] = (I - KC)(A x[k-1] + B u[k]) + K z[k],
+        evaluated in one vectorized pass.
+
+        :param zs: Measurements (T x p).
+        :param us: Control inputs (T x m); zero input if None.
+        :return: Updated state estimates (T x n).
+        """
+        zs = np.asarray(zs, dtype=float).reshape(len(zs), -1)
+        if us is None:
+            us = np.zeros((len(zs), self.B.shape[1]))
+        us = np.asarray(us, dtype=float).reshape(len(zs), -1)
+
+        states = np.empty((len(zs), self.A.shape[0]))
+        k = 0
+        while k < len(zs) and not self.converged:
+            self.predict(us[k][:, None])
+            self.update(zs[k][:, None])
+            states[k] = self.x[:, 0]
+            k += 1
+        if k == len(zs):
+            return states
+
+        I_KC = np.eye(self.A.shape[0]) - self.K @ self.C
+        drive = us[k:] @ (I_KC @ self.B).T + zs[k:] @ self.K.T
+        if self.A.shape[0] == 1:
+            a = (I_KC @ self.A)[0, 0]
+            states[k:, 0], _ = lfilter([1.0], [1.0, -a], drive[:, 0], zi=[a * self.x[0, 0]])
+        else:
+            states[k:] = _linear_recurrence(I_KC @ self.A, drive, self.x[:, 0])
+        self.x = states[-1][:, None].copy()
+        return states
+
+class BatchKalmanFilterBMS:
+    """
+    Many independent KalmanFilterBMS instances sharing A, B, C, Q and R.
+
+    States are stored as (batch, n) and covariances as (batch, n, n), so a
+    single predict/update call advances every filter at once.
+    """
+    def __init__(self, A, B, C, Q, R, P, x0):
+        """
+        :param P: Initial covariance, (n, n) shared or (batch, n, n).
+        :param x0: Initial states (batch, n).
+        """
+        self.A = A
+        self.B = B
+        self.C = C
+        self.Q = Q
+        self.R = R
+        self.x = np.array(x0, dtype=float)
+        self.P = np.array(np.broadcast_to(P, (len(self.x),) + self.A.shape), dtype=float)
+
+    def predict(self, u=None):
+        """
+        :param u: Control inputs (batch, m); no input if None.
+        """
+        self.x = np.einsum('ij,bj->bi', self.A, self.x)
+        if u is not None:
+            self.x += np.einsum('ij,bj->bi', self.B, u)
+        self.P = self.A @ self.P @ self.A.T + self.Q
+
+    def update(self, z):
+        """
+        :param z: Measurements (batch, p).
+        """
+        CP = self.C @ self.P
+        S = CP @ self.C.T + self.R
+        # K = P C^T S^-1, obtained from S K^T = C P without forming S^-1.
+        K = np.swapaxes(np.linalg.solve(S, CP), 1, 2)
+        y = z - np.einsum('ij,bj->bi', self.C, self.x)
+        self.x = self.x + np.einsum('bij,bj->bi', K, y)
+        self.P = self.P - K @ CP
 
     def get_state(self):
         return self.x
 
-if __name__ == "__main__":
+def benchmark_update_methods(n=4, p=1, steps=2000, seed=0):
+    """
+    Time predict/update per step for every update method on a random
+    stable model with n states and p measurements.
+
+    :return: Dictionary mapping method name to (microseconds per step,
+             max state deviation from the 'inverse' method).
+    """
+    rng = np.random.default_rng(seed)
+    A = np.eye(n) * 0.98 + 0.01 * rng.random((n, n))
+    A[0] = np.eye(n)[0]  # SoC-like integrating state
+    B = rng.random((n, 1))
+    C = rng.random((p, n))
+    Q = np.diag(rng.uniform(1e-6, 1e-4, n))
+    R = np.diag(rng.uniform(1e-3, 1e-2, p))
+    us = rng.normal(size=(steps, 1, 1))
+    zs = rng.normal(size=(steps, p, 1))
+
+    results = {}
+    reference = None
+    for method in UPDATE_METHODS:
+        kf = KalmanFilterBMS(A, B, C, Q, R, np.eye(n), np.zeros((n, 1)), update_method=method)
+        states = np.empty((steps, n))
+        start = time.perf_counter()
+        for k in range(steps):
+            kf.predict(us[k])
+            kf.update(zs[k])
+            states[k] = kf.x[:, 0]
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = states
+        results[method] = (elapsed / steps * 1e6, float(np.abs(states - reference).max()))
+    return results
+
+if __name__ == "__main__" and "--benchmark" in sys.argv:
+    for n_states, n_measurements in ((1, 1), (3, 1), (5, 2), (10, 8)):
+        results = benchmark_update_methods(n=n_states, p=n_measurements)
+        for method, (us_per_step, deviation) in results.items():
+            print(f"n={n_states} p={n_measurements} {method:>8}: {us_per_step:7.1f} us/step, "
+                  f"max deviation {deviation:.2e}")
+elif __name__ == "__main__":
     # State-space representation
     A = np.array([[1]])
     B = np.array([[0]])
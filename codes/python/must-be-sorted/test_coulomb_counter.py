@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from coulomb_counting import CoulombCounter
+
+class TestCoulombCounter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.currents = rng.uniform(-50.0, 50.0, 5000)
+        self.timestamps = np.cumsum(rng.uniform(0.5, 2.0, 5000))
+
+    def reference_trace(self):
+        counter = CoulombCounter(capacity_ah=1.0, initial_soc=50.0)
+        trace = []
+        for current, timestamp in zip(self.currents, self.timestamps):
+            counter.update(current, timestamp)
+            trace.append(counter.get_soc())
+        return np.array(trace)
+
+    def test_chunks_match_per_sample_updates(self):
+        """Test that chunked updates reproduce per-sample updates exactly."""
+        counter = CoulombCounter(capacity_ah=1.0, initial_soc=50.0)
+        trace = np.concatenate([
+            counter.update_chunk(self.currents[i:i + 333], self.timestamps[i:i + 333])
+            for i in range(0, len(self.currents), 333)
+        ])
+        np.testing.assert_array_equal(trace, self.reference_trace())
+
+    def test_resume_from_checkpoint(self):
+        """Test that a counter restored from a checkpoint continues seamlessly."""
+        counter = CoulombCounter(capacity_ah=1.0, initial_soc=50.0)
+        first = counter.update_chunk(self.currents[:2500], self.timestamps[:2500])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'counter.json')
+            counter.save_state(path)
+            restored = CoulombCounter.load_state(path)
+        second = restored.update_chunk(self.currents[2500:], self.timestamps[2500:])
+        np.testing.assert_array_equal(np.concatenate((first, second)), self.reference_trace())
+
+    def test_pinned_at_bounds(self):
+        """Test that long stretches pinned at 100% and 0% match per-sample updates."""
+        self.currents = np.concatenate((np.full(1000, -5.0), np.full(20000, -0.001), self.currents[:1000],
+                                        np.full(20000, 80.0), self.currents[1000:2000]))
+        self.timestamps = np.arange(len(self.currents), dtype=float)
+        counter = CoulombCounter(capacity_ah=1.0, initial_soc=50.0)
+        trace = np.concatenate([
+            counter.update_chunk(self.currents[i:i + 7000], self.timestamps[i:i + 7000])
+            for i in range(0, len(self.currents), 7000)
+        ])
+        reference = self.reference_trace()
+        np.testing.assert_array_equal(trace, reference)
+        self.assertEqual(reference[15000], 100.0)
+        self.assertEqual(reference[40000], 0.0)
+
+    def test_mismatched_lengths(self):
+        """Test that currents and timestamps must have the same length."""
+        counter = CoulombCounter(capacity_ah=1.0)
+        with self.assertRaises(ValueError):
+            counter.update_chunk([1.0, 2.0], [0.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import importlib.util
+import os
+import unittest
+import numpy as np
+
+# kalman-filter.py is not an importable module name.
+_spec = importlib.util.spec_from_file_location(
+    'kalman_filter_bms', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kalman-filter.py'))
+kalman_filter_bms = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(kalman_filter_bms)
+KalmanFilterBMS = kalman_filter_bms.KalmanFilterBMS
+BatchKalmanFilterBMS = kalman_filter_bms.BatchKalmanFilterBMS
+
+
+def random_model(n, p, seed=0):
+    rng = np.random.default_rng(seed)
+    A = np.eye(n) * 0.98 + 0.01 * rng.random((n, n))
+    A[0] = np.eye(n)[0]
+    B = rng.random((n, 1))
+    C = rng.normal(size=(p, n))
+    Q = np.diag(rng.uniform(1e-6, 1e-4, n))
+    R = np.diag(rng.uniform(1e-3, 1e-2, p))
+    return A, B, C, Q, R
+
+
+class TestKalmanFilterBMS(unittest.TestCase):
+    def test_update_methods_agree(self):
+        """Test that the Cholesky and square-root updates follow the inverse-based update and keep P SPD."""
+        rng = np.random.default_rng(1)
+        for n, p in ((1, 1), (3, 1), (5, 2), (70, 66)):
+            A, B, C, Q, R = random_model(n, p)
+            us = rng.normal(size=(300, 1, 1))
+            zs = rng.normal(size=(300, p, 1))
+            filters = {method: KalmanFilterBMS(A, B, C, Q, R, np.eye(n), np.zeros((n, 1)), update_method=method)
+                       for method in kalman_filter_bms.UPDATE_METHODS}
+            for u, z in zip(us, zs):
+                for kf in filters.values():
+                    kf.predict(u)
+                    kf.update(z)
+                reference = filters['inverse']
+                for method in ('cholesky', 'sqrt'):
+                    kf = filters[method]
+                    np.testing.assert_allclose(kf.x, reference.x, rtol=1e-8, atol=1e-9 * np.abs(reference.x).max(),
+                                               err_msg=method)
+                    np.testing.assert_allclose(kf.P, reference.P, rtol=1e-8, atol=1e-12, err_msg=method)
+                    np.testing.assert_allclose(kf.P, kf.P.T, rtol=0, atol=1e-14 * np.abs(kf.P).max(), err_msg=method)
+                    np.linalg.cholesky(kf.P)
+
+    def test_batch_matches_independent_filters(self):
+        """Test that the batched filter advances every cell exactly like its own KalmanFilterBMS."""
+        rng = np.random.default_rng(2)
+        A, B, C, Q, R = random_model(3, 2)
+        n_cells = 8
+        x0 = rng.normal(size=(n_cells, 3))
+        P0 = np.eye(3) * rng.uniform(0.5, 2.0, (n_cells, 1, 1))
+        us = rng.normal(size=(200, n_cells, 1))
+        zs = rng.normal(size=(200, n_cells, 2))
+
+        batch = BatchKalmanFilterBMS(A, B, C, Q, R, P0, x0)
+        cells = [KalmanFilterBMS(A, B, C, Q, R, P0[i], x0[i][:, None]) for i in range(n_cells)]
+        for u, z in zip(us, zs):
+            batch.predict(u)
+            batch.update(z)
+            for i, kf in enumerate(cells):
+                kf.predict(u[i][:, None])
+                kf.update(z[i][:, None])
+        np.testing.assert_allclose(batch.get_state(), [kf.x[:, 0] for kf in cells], rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(batch.P, [kf.P for kf in cells], rtol=1e-10, atol=1e-14)
+
+    def test_steady_state_gain(self):
+        """Test the Riccati solution against a long covariance recursion and that it is cached."""
+        A, B, C, Q, R = random_model(3, 2)
+        P = np.eye(3)
+        for _ in range(5000):
+            P_prior = A @ P @ A.T + Q
+            K = P_prior @ C.T @ np.linalg.inv(C @ P_prior @ C.T + R)
+            P = (np.eye(3) - K @ C) @ P_prior
+        steady = kalman_filter_bms.steady_state_gain(A, C, Q, R)
+        np.testing.assert_allclose(steady[0], K, rtol=1e-8, atol=1e-12)
+        np.testing.assert_allclose(steady[1], P_prior, rtol=1e-8, atol=1e-14)
+        np.testing.assert_allclose(steady[2], P, rtol=1e-8, atol=1e-14)
+        self.assertIs(kalman_filter_bms.steady_state_gain(A.copy(), C.copy(), Q.copy(), R.copy()), steady)
+        self.assertIsNot(kalman_filter_bms.steady_state_gain(A, C, Q * 2, R), steady)
+
+    def test_filter_matches_step_loop(self):
+        """Test that filter(), with and without the steady-state recurrence, equals predict/update per step."""
+        rng = np.random.default_rng(3)
+        for n, p in ((1, 1), (3, 2)):
+            A, B, C, Q, R = random_model(n, p)
+            us = rng.normal(size=(3000, 1))
+            zs = rng.normal(size=(3000, p))
+            for steady_state in (False, True):
+                kf = KalmanFilterBMS(A, B, C, Q, R, np.eye(n), np.zeros((n, 1)), steady_state=steady_state)
+                loop = KalmanFilterBMS(A, B, C, Q, R, np.eye(n), np.zeros((n, 1)), steady_state=steady_state)
+                expected = []
+                for u, z in zip(us, zs):
+                    loop.predict(u[:, None])
+                    loop.update(z[:, None])
+                    expected.append(loop.x[:, 0].copy())
+                states = kf.filter(zs, us)
+                self.assertEqual(kf.converged, steady_state)
+                np.testing.assert_allclose(states, expected, rtol=1e-9, atol=1e-9)
+                np.testing.assert_allclose(kf.x, loop.x, rtol=1e-9, atol=1e-9)
+
+    def test_unknown_update_method(self):
+        """Test that an unknown update method is rejected."""
+        A, B, C, Q, R = random_model(2, 1)
+        with self.assertRaises(ValueError):
+            KalmanFilterBMS(A, B, C, Q, R, np.eye(2), np.zeros((2, 1)), update_method='lu')
+
+
+if __name__ == '__main__':
+    unittest.main()
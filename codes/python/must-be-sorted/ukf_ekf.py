@@ -1,7 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from filterpy.kalman import UnscentedKalmanFilter, MerweScaledSigmaPoints
-from filterpy.kalman import ExtendedKalmanFilter
+# The filters come from soc_estimation/src; run from the repository root with
+#   PYTHONPATH=codes/python/soc_estimation/src python codes/python/must-be-sorted/ukf_ekf.py
+from nonlinear_filters import ExtendedKalmanFilter, UnscentedKalmanFilter
 
 # Simulation parameters
 np.random.seed(42)
@@ -14,18 +15,17 @@ acceleration = 0.5  # m/s^2
 yaw_rate = 0.05  # rad/s
 
 # Motion model
-def motion_model(state, dt):
-    x, y, v, psi = state
+def motion_model(states, dt):
+    x, y, v, psi = states.T
     v_new = v + acceleration * dt  # Accelerating vehicle
     psi_new = psi + yaw_rate * dt  # Constant yaw rate
     x_new = x + v_new * np.cos(psi_new) * dt
     y_new = y + v_new * np.sin(psi_new) * dt
-    return np.array([x_new, y_new, v_new, psi_new])
+    return np.column_stack((x_new, y_new, v_new, psi_new))
 
 # Measurement model
-def measurement_model(state):
-    x, y, v, _ = state
-    return np.array([x, y, v])
+def measurement_model(states):
+    return states[:, :3]  # x, y, v
 
 # EKF Jacobians
 def jacobian_motion(state, dt):
@@ -48,46 +48,28 @@ def jacobian_measurement(state):
 true_trajectory = [true_state]
 measurements = []
 for _ in range(steps):
-    true_state = motion_model(true_state, T)
+    true_state = motion_model(true_state[None], T)[0]
     true_trajectory.append(true_state)
-    noisy_measurement = measurement_model(true_state) + np.random.normal(0, [1.0, 1.0, 0.5])
+    noisy_measurement = measurement_model(true_state[None])[0] + np.random.normal(0, [1.0, 1.0, 0.5])
     measurements.append(noisy_measurement)
 
 true_trajectory = np.array(true_trajectory)
 measurements = np.array(measurements)
 
-# EKF implementation
-ekf = ExtendedKalmanFilter(dim_x=4, dim_z=3)
-ekf.x = np.array([0, 0, 15, np.pi / 6])  # Initial estimate
-ekf.P = np.eye(4) * 1.0
-ekf.R = np.diag([1.0, 1.0, 0.5])  # Measurement noise covariance
-ekf.Q = np.diag([0.1, 0.1, 0.1, 0.01])  # Process noise covariance
-
-ekf_trajectory = []
-for z in measurements:
-    ekf.F = jacobian_motion(ekf.x, T)
-    ekf.predict()
-    ekf.H = jacobian_measurement(ekf.x)
-    ekf.update(z, HJacobian=jacobian_measurement, Hx=measurement_model)
-    ekf_trajectory.append(ekf.x.copy())
-
-ekf_trajectory = np.array(ekf_trajectory)
+initial_estimate = np.array([0, 0, 15, np.pi / 6])
+P0 = np.eye(4) * 1.0
+R = np.diag([1.0, 1.0, 0.5])  # Measurement noise covariance
+Q = np.diag([0.1, 0.1, 0.1, 0.01])  # Process noise covariance
 
-# UKF implementation
-sigma_points = MerweScaledSigmaPoints(n=4, alpha=0.1, beta=2, kappa=0)
-ukf = UnscentedKalmanFilter(dim_x=4, dim_z=3, dt=T, fx=motion_model, hx=measurement_model, points=sigma_points)
-ukf.x = np.array([0, 0, 15, np.pi / 6])  # Initial estimate
-ukf.P = np.eye(4) * 1.0
-ukf.R = np.diag([1.0, 1.0, 0.5])  # Measurement noise covariance
-ukf.Q = np.diag([0.1, 0.1, 0.1, 0.01])  # Process noise covariance
-
-ukf_trajectory = []
-for z in measurements:
-    ukf.predict()
-    ukf.update(z)
-    ukf_trajectory.append(ukf.x.copy())
+# EKF implementation
+ekf = ExtendedKalmanFilter(initial_estimate, P0, Q, R, motion_model, measurement_model,
+                           jacobian_motion, jacobian_measurement)
+ekf_trajectory, _ = ekf.run(measurements, dt=T)
 
-ukf_trajectory = np.array(ukf_trajectory)
+# UKF implementation: all sigma points go through the models in one call
+ukf = UnscentedKalmanFilter(initial_estimate, P0, Q, R, motion_model, measurement_model,
+                            alpha=0.1, beta=2, kappa=0)
+ukf_trajectory, _ = ukf.run(measurements, dt=T)
 
 # Plot results
 plt.figure(figsize=(12, 8))
@@ -0,0 +1,245 @@
+import numpy as np
+from battery_model import EquivalentCircuitModel
+from nonlinear_filters import ExtendedKalmanFilter, UnscentedKalmanFilter
+
+METHODS = ('ekf', 'ukf')
+
+
+class BatteryStateModel:
+    """
+    State-space form of an equivalent-circuit cell for the nonlinear filters.
+
+    The state is [SoC, v_rc_1, ..., v_rc_m] followed, with
+    ``estimate_capacity``, by the capacity relative to its nominal value.
+    The per-step input is u = (previous current, current), so that the
+    states line up with the simulated data: SoC[k] already includes the
+    charge of sample k, while the RC voltages at sample k follow the
+    currents before it. The terminal voltage is
+    OCV(SoC) - R0 I - sum(v_rc); its SoC derivative comes from the cell
+    model's precomputed dOCV/dSoC table.
+    """
+
+    def __init__(self, cell_model, capacity, estimate_capacity=False):
+        """
+        Parameters:
+            cell_model (EquivalentCircuitModel): OCV curve, R0 and RC pairs.
+            capacity (float): Nominal capacity in Coulombs.
+            estimate_capacity (bool): Track the relative capacity as a state.
+        """
+        self.cell_model = cell_model
+        self.capacity = capacity
+        self.estimate_capacity = estimate_capacity
+        self.n_rc = len(cell_model.rc_pairs)
+        self.n = 1 + self.n_rc + int(estimate_capacity)
+        rc = np.array(cell_model.rc_pairs, dtype=float).reshape(-1, 2)
+        self._resistance = rc[:, 0]
+        self._tau = rc[:, 0] * rc[:, 1]
+        self._rc = slice(1, 1 + self.n_rc)
+        self._decay_dt = None
+
+    def _decay(self, dt):
+        # Time steps are usually constant, so the factors are kept for the last dt.
+        if dt != self._decay_dt:
+            a = np.exp(-dt / self._tau)
+            self._decay_dt, self._a, self._gain = dt, a, self._resistance * (1.0 - a)
+        return self._a, self._gain
+
+    def _capacity(self, states):
+        return self.capacity * states[:, -1] if self.estimate_capacity else self.capacity
+
+    def fx(self, states, dt, u):
+        """
+        Motion model: Coulomb counting and the exact RC discretization.
+        """
+        previous, current = u
+        a, gain = self._decay(dt)
+        out = states.copy()
+        out[:, 0] = states[:, 0] - current * dt / self._capacity(states)
+        out[:, self._rc] = states[:, self._rc] * a + gain * previous
+        return out
+
+    def hx(self, states, u):
+        """
+        Measurement model: terminal voltage, shape (m, 1).
+        """
+        voltage = self.cell_model.ocv(states[:, 0]) - self.cell_model.r0 * u[1] - states[:, self._rc].sum(axis=1)
+        return voltage[:, None]
+
+    def F_jacobian(self, x, dt, u):
+        F = np.eye(self.n)
+        a, _ = self._decay(dt)
+        F[self._rc, self._rc] = np.diag(a)
+        if self.estimate_capacity:
+            F[0, -1] = u[1] * dt / (self.capacity * x[-1] ** 2)
+        return F
+
+    def H_jacobian(self, x, u):
+        H = np.zeros((1, self.n))
+        H[0, 0] = self.cell_model.docv_dsoc(x[0])
+        H[0, self._rc] = -1.0
+        return H
+
+
+class BatteryExtendedKalmanFilter(ExtendedKalmanFilter):
+    """
+    Extended Kalman filter specialized to a BatteryStateModel.
+
+    Same estimates as ExtendedKalmanFilter with the model's Jacobians, but
+    ``run`` exploits the structure of the model: the RC decay factors are
+    computed for all steps up front, F is diagonal apart from the capacity
+    column, and the scalar voltage measurement needs no matrix inverse.
+    This removes most of the per-step overhead on long traces.
+    """
+
+    def __init__(self, model, x, P, Q, R):
+        """
+        Parameters:
+            model (BatteryStateModel): State-space cell model.
+            x, P, Q, R: See ``NonlinearKalmanFilter``.
+        """
+        super().__init__(x, P, Q, R, model.fx, model.hx, model.F_jacobian, model.H_jacobian)
+        self.model = model
+
+    def run(self, measurements, dt=1.0, inputs=None):
+        """
+        Filters a whole trace, see ``NonlinearKalmanFilter.run``.
+
+        Parameters:
+            measurements (array): Terminal voltages, shape (N,).
+            dt (float or array): Time step, scalar or one per step.
+            inputs (array): Per-step inputs from ``battery_inputs``; required,
+                the cell model cannot run without the current.
+
+        Returns:
+            states (array): Posterior states, shape (N, n).
+            covariances (array): Posterior covariances, shape (N, n, n).
+        """
+        if inputs is None:
+            raise ValueError("inputs are required: pass battery_inputs(current)")
+        model, cell = self.model, self.model.cell_model
+        voltage = np.asarray(measurements, dtype=np.float64).reshape(-1)
+        n_steps, n, rc = len(voltage), len(self.x), model._rc
+        dts = np.broadcast_to(np.asarray(dt, dtype=np.float64), (n_steps,))
+        inputs = np.asarray(inputs, dtype=np.float64)
+        decay = np.exp(-dts[:, None] / model._tau)
+        drive = model._resistance * (1.0 - decay) * inputs[:, :1]
+        # Diagonal of F at every step; F P F^T is then P scaled by f f^T.
+        scale = np.ones((n_steps, n))
+        scale[:, rc] = decay
+        scale = scale[:, :, None] * scale[:, None, :]
+        charge = (inputs[:, 1] * dts).tolist()
+        r0_drop = (cell.r0 * inputs[:, 1]).tolist()
+        ocv_table, docv_table = cell.ocv_table, cell.docv_table
+        table_step = cell._table_step
+        x, P, Q, R = self.x.copy(), self.P.copy(), self.Q, self.R[0, 0]
+        states = np.empty((n_steps, n))
+        covariances = np.empty((n_steps, n, n))
+        for k in range(n_steps):
+            if model.estimate_capacity:
+                coupling = charge[k] / (model.capacity * x[-1] ** 2)
+                x[0] -= charge[k] / (model.capacity * x[-1])
+            else:
+                x[0] -= charge[k] / model.capacity
+            x[rc] = x[rc] * decay[k] + drive[k]
+            P *= scale[k]
+            if model.estimate_capacity:
+                P[0] += coupling * P[-1]
+                P[:, 0] += coupling * P[:, -1]
+            P += Q
+
+            # Linear interpolation in the dense OCV tables, as in EquivalentCircuitModel._lookup.
+            position = min(max(x[0], 0.0), 1.0) * table_step
+            index = min(int(position), table_step - 1)
+            fraction = position - index
+            ocv = ocv_table[index] + fraction * (ocv_table[index + 1] - ocv_table[index])
+            slope = docv_table[index] + fraction * (docv_table[index + 1] - docv_table[index])
+            PHT = slope * P[:, 0] - P[:, rc].sum(axis=1)
+            S = slope * PHT[0] - PHT[rc].sum() + R
+            K = PHT / S
+            x += K * (voltage[k] - ocv + r0_drop[k] + x[rc].sum())
+            P -= S * (K[:, None] * K)
+            states[k] = x
+            covariances[k] = P
+        self.x, self.P = x, P
+        return states, covariances
+
+
+def make_battery_filter(model, initial_soc=1.0, method='ekf', soc_variance=1e-2, rc_variance=1e-4,
+                        capacity_variance=1e-2, process_noise=(1e-8, 1e-6, 1e-10), measurement_noise=0.05 ** 2):
+    """
+    Creates an EKF or UKF over a BatteryStateModel.
+
+    Parameters:
+        model (BatteryStateModel): State-space cell model.
+        initial_soc (float): Initial SoC (0 to 1).
+        method (str): 'ekf' or 'ukf'.
+        soc_variance (float): Initial SoC variance.
+        rc_variance (float): Initial variance of each RC voltage in V^2.
+        capacity_variance (float): Initial variance of the relative capacity.
+        process_noise (tuple): Per-step variances of SoC, RC voltages and
+            relative capacity.
+        measurement_noise (float): Terminal voltage noise variance in V^2.
+
+    Returns:
+        filter (NonlinearKalmanFilter): Filter whose ``run`` takes the
+            voltages and inputs from ``battery_inputs``.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+    x = np.zeros(model.n)
+    x[0] = initial_soc
+    P = np.full(model.n, rc_variance)
+    Q = np.full(model.n, process_noise[1])
+    P[0], Q[0] = soc_variance, process_noise[0]
+    if model.estimate_capacity:
+        x[-1], P[-1], Q[-1] = 1.0, capacity_variance, process_noise[2]
+    if method == 'ekf':
+        return BatteryExtendedKalmanFilter(model, x, np.diag(P), np.diag(Q), [[measurement_noise]])
+    return UnscentedKalmanFilter(x, np.diag(P), np.diag(Q), [[measurement_noise]], model.fx, model.hx,
+                                 alpha=0.1, beta=2.0, kappa=0.0)
+
+
+def battery_inputs(current):
+    """
+    Per-step inputs (previous current, current) of a BatteryStateModel,
+    with zero current before the first sample.
+    """
+    current = np.asarray(current, dtype=np.float64)
+    return np.column_stack((np.concatenate(([0.0], current[:-1])), current))
+
+
+def battery_kalman_estimation(current, voltage, initial_soc, battery_capacity, dt, cell_model=None,
+                              method='ekf', estimate_capacity=False, **filter_params):
+    """
+    Estimates SoC with an EKF or UKF on an equivalent-circuit cell model.
+
+    Unlike ``kalman_filter_estimation``, which treats voltage as a linear
+    SoC measurement, the filter tracks SoC and the RC polarization
+    voltages through the nonlinear OCV curve, and optionally the capacity.
+
+    Parameters:
+        current (array): Current data in Amperes, positive for discharge.
+        voltage (array): Terminal voltage data in Volts.
+        initial_soc (float): Initial SoC (0 to 1).
+        battery_capacity (float): Nominal battery capacity in Coulombs.
+        dt (float or array): Time step in seconds, either a scalar or one
+            value per sample, or one value per interval (len(current) - 1,
+            dt[k-1] being the interval between samples k-1 and k; the step
+            into the first sample is then taken as dt[0]).
+        cell_model (EquivalentCircuitModel, optional): Cell model; the
+            default EquivalentCircuitModel if None.
+        method (str): 'ekf' or 'ukf'.
+        estimate_capacity (bool): Also estimate the capacity.
+        **filter_params: Noise settings, see ``make_battery_filter``.
+
+    Returns:
+        soc (array): Estimated SoC over time, clipped to [0, 1].
+    """
+    model = BatteryStateModel(cell_model or EquivalentCircuitModel(capacity=battery_capacity),
+                              battery_capacity, estimate_capacity)
+    dt = np.asarray(dt, dtype=np.float64)
+    if dt.ndim and len(dt) == len(current) - 1:
+        dt = np.concatenate((dt[:1], dt))
+    kf = make_battery_filter(model, initial_soc, method, **filter_params)
+    states, _ = kf.run(voltage, dt, battery_inputs(current))
+    return np.clip(states[:, 0], 0, 1)
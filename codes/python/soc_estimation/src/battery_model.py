@@ -0,0 +1,271 @@
+import numpy as np
+from coulomb_counting import coulomb_counting, coulomb_counting_batch
+
+# Representative NMC cell: SoC breakpoints and open-circuit voltage in Volts.
+DEFAULT_OCV_SOC = np.linspace(0.0, 1.0, 11)
+DEFAULT_OCV = np.array([3.00, 3.45, 3.55, 3.62, 3.68, 3.74, 3.82, 3.90, 3.99, 4.08, 4.20])
+
+# Largest decay (in nepers) accumulated inside one block of the time-varying
+# RC recurrence, keeping exp(+-decay) well inside the float64 range.
+_MAX_BLOCK_DECAY = 500.0
+
+
+def _time_varying_recurrence(a, b, x0):
+    """
+    Evaluates x[k+1] = a[k] x[k] + b[k] for coefficients that change per sample.
+
+    The first sample of a block is stepped directly; after it, x[k] =
+    A[k] (x_start + sum_j b[j] / A[j]) with A the running product of a.
+    Blocks end before A underflows, so the closed form stays exact up to
+    rounding. A sample whose own decay is past that limit (a long gap in the
+    time stamps, where a underflows to zero) always starts a block.
+
+    Parameters:
+        a (array): Decay factors in [0, 1], samples along the last axis.
+        b (array): Inputs, same shape as a.
+        x0 (array): Value before the first sample, shape a.shape[:-1].
+
+    Returns:
+        x (array): x[k+1] for every sample, same shape as a.
+    """
+    with np.errstate(divide='ignore'):
+        log_a = np.log(a)
+    # Block boundaries are shared by all rows so they can be sliced together:
+    # they follow the largest per-sample decay of any row, capped so that a
+    # zero decay factor still gives finite bounds and forces a new block.
+    step = np.minimum(-log_a.min(axis=tuple(range(log_a.ndim - 1))), _MAX_BLOCK_DECAY)
+    block_id = np.floor(np.cumsum(step) / _MAX_BLOCK_DECAY)
+    bounds = np.flatnonzero(np.diff(block_id)) + 1
+
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape))
+    x = np.asarray(x0, dtype=float)
+    for start, stop in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [a.shape[-1]]))):
+        x = a[..., start] * x + b[..., start]
+        out[..., start] = x
+        A = np.exp(np.cumsum(log_a[..., start + 1:stop], axis=-1))
+        out[..., start + 1:stop] = A * (x[..., None] + np.cumsum(b[..., start + 1:stop] / A, axis=-1))
+        x = out[..., stop - 1]
+    return out
+
+
+class EquivalentCircuitModel:
+    """
+    Thevenin equivalent-circuit cell model with one or more RC pairs.
+
+    Terminal voltage is OCV(SoC, T) - R0 I - sum(v_rc), with positive current
+    discharging the cell. RC-pair voltages are discretized exactly under a
+    zero-order hold: v[k+1] = a v[k] + R (1 - a) I[k], a = exp(-dt / (R C)).
+    Resistances scale with exp(r_temp_coeff * (reference_temp - T)) and the
+    OCV shifts by ocv_temp_coeff * (T - reference_temp).
+
+    The OCV curve and its SoC derivative are resampled once onto a dense
+    uniform grid, so lookups are index arithmetic instead of a search.
+    """
+
+    def __init__(self, capacity=3600.0, r0=0.01, rc_pairs=((0.015, 2000.0),),
+                 ocv_soc=DEFAULT_OCV_SOC, ocv=DEFAULT_OCV, ocv_temp_coeff=0.0,
+                 r_temp_coeff=0.0, reference_temp=25.0, table_size=4097):
+        """
+        Parameters:
+            capacity (float): Cell capacity in Coulombs (Ah * 3600).
+            r0 (float): Series resistance in Ohms.
+            rc_pairs (sequence): (resistance in Ohms, capacitance in Farads)
+                for each RC pair, e.g. one pair for a 1RC or two for a 2RC model.
+            ocv_soc (array): Increasing SoC breakpoints of the OCV curve.
+            ocv (array): Strictly increasing open-circuit voltage at each breakpoint.
+            ocv_temp_coeff (float): OCV temperature coefficient in V/degC.
+            r_temp_coeff (float): Resistance temperature coefficient in 1/degC.
+            reference_temp (float): Temperature of the given parameters in degC.
+            table_size (int): Number of points of the dense OCV lookup table.
+        """
+        ocv_soc = np.asarray(ocv_soc, dtype=float)
+        ocv = np.asarray(ocv, dtype=float)
+        if ocv_soc.shape != ocv.shape or np.any(np.diff(ocv) <= 0) or np.any(np.diff(ocv_soc) <= 0):
+            raise ValueError("ocv_soc and ocv must be strictly increasing arrays of equal length")
+
+        self.capacity = capacity
+        self.r0 = r0
+        self.rc_pairs = tuple((float(r), float(c)) for r, c in rc_pairs)
+        self.ocv_temp_coeff = ocv_temp_coeff
+        self.r_temp_coeff = r_temp_coeff
+        self.reference_temp = reference_temp
+
+        self.soc_grid = np.linspace(0.0, 1.0, table_size)
+        self.ocv_table = np.interp(self.soc_grid, ocv_soc, ocv)
+        self.docv_table = np.gradient(self.ocv_table, self.soc_grid)
+        self._table_step = table_size - 1
+
+    def _lookup(self, table, soc):
+        position = np.clip(soc, 0.0, 1.0) * self._table_step
+        index = np.minimum(position.astype(np.intp), self._table_step - 1)
+        fraction = position - index
+        return table[index] + fraction * (table[index + 1] - table[index])
+
+    def _resistance_scale(self, temperature):
+        if temperature is None or self.r_temp_coeff == 0.0:
+            return 1.0
+        return np.exp(self.r_temp_coeff * (self.reference_temp - np.asarray(temperature, dtype=float)))
+
+    def ocv(self, soc, temperature=None):
+        """
+        Open-circuit voltage at the given SoC (clipped to [0, 1]).
+
+        Parameters:
+            soc (array): State of Charge.
+            temperature (float or array, optional): Cell temperature in degC.
+
+        Returns:
+            ocv (array): Open-circuit voltage in Volts.
+        """
+        ocv = self._lookup(self.ocv_table, np.asarray(soc, dtype=float))
+        if temperature is not None and self.ocv_temp_coeff != 0.0:
+            ocv = ocv + self.ocv_temp_coeff * (np.asarray(temperature, dtype=float) - self.reference_temp)
+        return ocv
+
+    def docv_dsoc(self, soc):
+        """
+        Slope of the OCV curve, looked up from the precomputed derivative table.
+
+        Parameters:
+            soc (array): State of Charge.
+
+        Returns:
+            slope (array): dOCV/dSoC in Volts per unit SoC.
+        """
+        return self._lookup(self.docv_table, np.asarray(soc, dtype=float))
+
+    def soc_from_ocv(self, ocv):
+        """
+        Inverts the OCV curve.
+
+        Parameters:
+            ocv (array): Open-circuit voltage in Volts.
+
+        Returns:
+            soc (array): State of Charge, saturated at the ends of the curve.
+        """
+        return np.interp(ocv, self.ocv_table, self.soc_grid)
+
+    def soc_from_voltage(self, voltage, current, temperature=None):
+        """
+        SoC pseudo-measurement from terminal voltage, compensating the R0 drop.
+
+        RC-pair voltages are neglected, so this is most accurate at low
+        current or after rest.
+
+        Parameters:
+            voltage (array): Terminal voltage in Volts.
+            current (array): Current in Amperes, positive for discharge.
+            temperature (float or array, optional): Cell temperature in degC.
+
+        Returns:
+            soc (array): Estimated State of Charge.
+        """
+        ocv = np.asarray(voltage, dtype=float) + self.r0 * self._resistance_scale(temperature) * np.asarray(current)
+        if temperature is not None and self.ocv_temp_coeff != 0.0:
+            ocv = ocv - self.ocv_temp_coeff * (np.asarray(temperature, dtype=float) - self.reference_temp)
+        return self.soc_from_ocv(ocv)
+
+    def rc_voltages(self, current, dt, temperature=None, initial=None):
+        """
+        Voltages across each RC pair.
+
+        Parameters:
+            current (array): Current in Amperes, samples along the last axis.
+            dt (float or array): Time step in seconds, scalar or per sample.
+            temperature (float or array, optional): Cell temperature in degC,
+                scalar or broadcastable against current.
+            initial (array, optional): RC voltages at the first sample, shape
+                (n_pairs,) + current.shape[:-1]. Zero if None.
+
+        Returns:
+            v_rc (array): Voltage at every sample, shape (n_pairs,) + current.shape.
+            v_next (array): Voltage at the sample following the last one.
+        """
+        from scipy.signal import lfilter
+
+        current = np.asarray(current, dtype=float)
+        scale = self._resistance_scale(temperature)
+        n_pairs = len(self.rc_pairs)
+        if initial is None:
+            initial = np.zeros((n_pairs,) + current.shape[:-1])
+
+        v_rc = np.empty((n_pairs,) + current.shape)
+        v_next = np.empty((n_pairs,) + current.shape[:-1])
+        constant = np.ndim(dt) == 0 and np.ndim(scale) == 0
+        for i, (r, c) in enumerate(self.rc_pairs):
+            resistance = r * scale
+            a = np.exp(-dt / (resistance * c))
+            if constant:
+                # v[k+1] = a v[k] + R (1 - a) I[k] as a first-order IIR filter.
+                zi = (a * np.asarray(initial[i], dtype=float))[..., None]
+                shifted, _ = lfilter([resistance * (1.0 - a)], [1.0, -a], current, axis=-1, zi=zi)
+            else:
+                a, b = np.broadcast_arrays(a, resistance * (1.0 - a) * current)
+                shifted = _time_varying_recurrence(a, b, initial[i])
+            v_rc[i, ..., 0] = initial[i]
+            v_rc[i, ..., 1:] = shifted[..., :-1]
+            v_next[i] = shifted[..., -1]
+        return v_rc, v_next
+
+    def terminal_voltage(self, soc, current, v_rc, temperature=None):
+        """
+        Measurement model: terminal voltage for given state and current.
+
+        Parameters:
+            soc (array): State of Charge.
+            current (array): Current in Amperes, positive for discharge.
+            v_rc (array): RC-pair voltages, shape (n_pairs,) + soc.shape.
+            temperature (float or array, optional): Cell temperature in degC.
+
+        Returns:
+            voltage (array): Terminal voltage in Volts.
+        """
+        r0 = self.r0 * self._resistance_scale(temperature)
+        return self.ocv(soc, temperature) - r0 * np.asarray(current) - np.sum(v_rc, axis=0)
+
+    def simulate(self, current, dt, initial_soc=1.0, temperature=None, initial_rc=None):
+        """
+        Simulates the cell (or many cells) over a current profile.
+
+        Pass a 2-D current array (n_cells, n_samples) or a per-cell
+        initial_soc to simulate a whole pack in one call. The returned state
+        can be passed back as initial_soc / initial_rc to continue the
+        simulation chunk by chunk.
+
+        Parameters:
+            current (array): Current in Amperes, samples along the last axis.
+            dt (float or array): Time step in seconds, scalar or per sample.
+            initial_soc (float or array): SoC at the first sample.
+            temperature (float or array, optional): Cell temperature in degC.
+            initial_rc (array, optional): RC voltages at the first sample.
+
+        Returns:
+            voltage (array): Terminal voltage in Volts.
+            soc (array): State of Charge, saturating at 0 and 1 step by step
+                as in ``coulomb_counting``.
+            state (tuple): (soc, v_rc) at the sample following the last one.
+        """
+        initial_soc = np.asarray(initial_soc, dtype=float)
+        current = np.asarray(current, dtype=float)
+        if initial_rc is not None and np.ndim(initial_rc) > current.ndim:
+            current = np.broadcast_to(current, np.shape(initial_rc)[1:] + current.shape[-1:])
+
+        # SoC follows the clamped Coulomb counter, so a cell that saturates
+        # at 0 or 1 recovers as soon as the current reverses. One extra zero
+        # sample carries the counter on to the state after the last sample.
+        padded = np.concatenate((current, np.zeros(current.shape[:-1] + (1,))), axis=-1)
+        initial_soc = np.clip(initial_soc, 0.0, 1.0)
+        batch_shape = np.broadcast_shapes(current.shape[:-1], initial_soc.shape)
+        if batch_shape:
+            counted = coulomb_counting_batch(np.broadcast_to(padded, batch_shape + padded.shape[-1:]),
+                                             np.broadcast_to(initial_soc, batch_shape), self.capacity, dt)
+        else:
+            counted = coulomb_counting(padded, float(initial_soc), self.capacity, dt)
+        soc, soc_next = counted[..., :-1], counted[..., -1]
+
+        # A series pack shares one current trace: the RC voltages are then
+        # computed once and only the SoC differs between cells.
+        v_rc, v_next = self.rc_voltages(current, dt, temperature, initial_rc)
+        voltage = self.terminal_voltage(soc, current, v_rc, temperature)
+        return voltage, soc, (soc_next, v_next)
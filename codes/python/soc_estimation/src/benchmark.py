@@ -0,0 +1,281 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from battery_kalman_filter import battery_kalman_estimation
+from battery_model import EquivalentCircuitModel
+from coulomb_counting import coulomb_counting
+from data_acquisition import PROFILES, simulate_battery_data
+from features import FeatureExtractor
+from kalman_filter import kalman_filter_estimation
+from machine_learning import machine_learning_soc_estimation
+
+ESTIMATORS = ('coulomb_counting', 'kalman_filter', 'battery_kalman_filter', 'machine_learning')
+DEFAULT_LENGTHS = (3600, 36000, 360000)
+DEFAULT_TOLERANCE = 0.2
+BATTERY_CAPACITY = 3600
+# Equivalent-circuit form of the simulated 4.2 V * SoC voltage, as in main.py.
+_SIMULATED_CELL = EquivalentCircuitModel(capacity=BATTERY_CAPACITY, r0=0.0, rc_pairs=(), ocv_soc=(0.0, 1.0),
+                                         ocv=(0.0, 4.2))
+# Forest of main.py; trained once per profile on a separate trace.
+_ML_PARAMS = {'n_estimators': 20, 'max_depth': 10, 'random_state': 42}
+_TRAINING_LENGTH = 7200
+_TRAINING_SEED = 1
+_SEED = 0
+# Modules whose import time is measured, each in a fresh interpreter.
+IMPORT_MODULES = ('main', 'coulomb_counting', 'kalman_filter', 'battery_kalman_filter', 'machine_learning',
+                  'storage', 'data_acquisition', 'visualization')
+_IMPORT_SCRIPT = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)"
+
+
+def _train_model(profile):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+    data = simulate_battery_data(total_time=_TRAINING_LENGTH, profile=profile, seed=_TRAINING_SEED)
+    X = FeatureExtractor(dt=1).transform(data['current'].values, data['voltage'].values)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(**_ML_PARAMS).fit(scaler.transform(X), data['soc_ground_truth'].values)
+    return model, scaler
+
+
+def _estimator(name, model=None, scaler=None):
+    if name == 'coulomb_counting':
+        return lambda current, voltage: coulomb_counting(current, 1.0, BATTERY_CAPACITY, 1)
+    if name == 'kalman_filter':
+        return lambda current, voltage: kalman_filter_estimation(current, voltage, 1.0, BATTERY_CAPACITY, 1)
+    if name == 'battery_kalman_filter':
+        return lambda current, voltage: battery_kalman_estimation(current, voltage, 1.0, BATTERY_CAPACITY, 1,
+                                                                  _SIMULATED_CELL)
+    if name == 'machine_learning':
+        return lambda current, voltage: machine_learning_soc_estimation(
+            current, voltage, model, scaler, feature_extractor=FeatureExtractor(dt=1)
+        )
+    raise ValueError(f"Unknown estimator '{name}', expected one of {ESTIMATORS}")
+
+
+def measure(func, args, repeats=3):
+    """
+    Times a function and measures its peak Python memory allocation.
+
+    The timing runs and the tracemalloc run are separate, so tracing does
+    not slow down the timed calls.
+
+    Parameters:
+        func (callable): Function to measure.
+        args (tuple): Positional arguments.
+        repeats (int): Timed calls; the fastest is reported.
+
+    Returns:
+        result: Return value of the last call.
+        seconds (float): Fastest wall time.
+        peak_bytes (int): Peak memory allocated during one call.
+    """
+    seconds = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+def measure_import_times(modules=IMPORT_MODULES, repeats=3):
+    """
+    Measures how long importing each module takes in a fresh interpreter,
+    i.e. the startup cost it adds to a short-lived job.
+
+    Parameters:
+        modules (sequence): Module names of this directory.
+        repeats (int): Interpreters started per module; the fastest counts.
+
+    Returns:
+        import_times (dict): Module name -> seconds.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    import_times = {}
+    for module in modules:
+        timings = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', _IMPORT_SCRIPT.format(module)], cwd=directory,
+                                    check=True, capture_output=True, text=True).stdout
+            timings.append(float(output.split()[-1]))
+        import_times[module] = min(timings)
+        logging.info(f"import {module}: {1000 * import_times[module]:.0f} ms")
+    return import_times
+
+
+def run_benchmark(lengths=DEFAULT_LENGTHS, profiles=PROFILES, estimators=ESTIMATORS, repeats=3,
+                  import_modules=IMPORT_MODULES):
+    """
+    Runs the estimators over a matrix of trace lengths and current profiles.
+
+    Parameters:
+        lengths (sequence): Trace lengths in samples (1 s time step).
+        profiles (sequence): Current profiles of ``simulate_battery_data``.
+        estimators (sequence): Estimators to run, some of ESTIMATORS.
+        repeats (int): Timed calls per case.
+        import_modules (sequence): Modules whose import time is measured.
+
+    Returns:
+        report (dict): 'meta' describing the environment, 'results', one
+            dict per (estimator, profile, length) with samples_per_second,
+            seconds, peak_memory_bytes, rmse and max_error, and
+            'import_times', see ``measure_import_times``.
+    """
+    unknown = set(estimators) - set(ESTIMATORS)
+    if unknown:
+        raise ValueError(f"Unknown estimators {sorted(unknown)}, expected some of {ESTIMATORS}")
+    results = []
+    for profile in profiles:
+        model, scaler = _train_model(profile) if 'machine_learning' in estimators else (None, None)
+        for length in lengths:
+            data = simulate_battery_data(total_time=length, profile=profile, seed=_SEED)
+            current, voltage = data['current'].values, data['voltage'].values
+            truth = data['soc_ground_truth'].values
+            for name in estimators:
+                soc, seconds, peak_bytes = measure(_estimator(name, model, scaler), (current, voltage), repeats)
+                error = np.abs(soc - truth)
+                result = {
+                    'estimator': name,
+                    'profile': profile,
+                    'length': length,
+                    'seconds': seconds,
+                    'samples_per_second': length / seconds if seconds else float('inf'),
+                    'peak_memory_bytes': peak_bytes,
+                    'rmse': float(np.sqrt(np.mean(error ** 2))),
+                    'max_error': float(error.max()),
+                }
+                logging.info(f"{name} {profile} {length}: {result['samples_per_second']:.0f} samples/s, "
+                             f"peak {peak_bytes / 1024 ** 2:.1f} MiB, RMSE {result['rmse']:.4f}")
+                results.append(result)
+    meta = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'repeats': repeats,
+    }
+    import_times = measure_import_times(import_modules, repeats) if import_modules else {}
+    return {'meta': meta, 'results': results, 'import_times': import_times}
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds throughput regressions against a baseline report.
+
+    Cases are matched by (estimator, profile, length); cases missing from
+    either report are ignored.
+
+    Parameters:
+        report (dict): Output of ``run_benchmark``.
+        baseline (dict): Earlier output of ``run_benchmark``.
+        tolerance (float): Accepted relative drop in samples/s.
+
+    Returns:
+        regressions (list): Dicts with the case, both throughputs and the
+            relative change, for every case slower than the tolerance allows.
+    """
+    def key(result):
+        return result['estimator'], result['profile'], result['length']
+
+    reference = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        base = reference.get(key(result))
+        if base is None:
+            continue
+        change = result['samples_per_second'] / base['samples_per_second'] - 1.0
+        if change < -tolerance:
+            regressions.append({
+                'estimator': result['estimator'],
+                'profile': result['profile'],
+                'length': result['length'],
+                'samples_per_second': result['samples_per_second'],
+                'baseline_samples_per_second': base['samples_per_second'],
+                'change': change,
+            })
+    return regressions
+
+
+def compare_import_times(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds modules that import slower than in a baseline report.
+
+    Parameters:
+        report (dict): Output of ``run_benchmark``.
+        baseline (dict): Earlier output of ``run_benchmark``.
+        tolerance (float): Accepted relative increase of the import time.
+
+    Returns:
+        regressions (list): Dicts with the module, both import times and the
+            relative change.
+    """
+    reference = baseline.get('import_times', {})
+    regressions = []
+    for module, seconds in report.get('import_times', {}).items():
+        if module not in reference:
+            continue
+        change = seconds / reference[module] - 1.0
+        if change > tolerance:
+            regressions.append({'module': module, 'seconds': seconds, 'baseline_seconds': reference[module],
+                                'change': change})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark speed and accuracy of the SoC estimators.")
+    parser.add_argument('--lengths', type=int, nargs='+', default=list(DEFAULT_LENGTHS),
+                        help="Trace lengths in samples")
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES), help="Current profiles")
+    parser.add_argument('--estimators', nargs='+', choices=ESTIMATORS, default=list(ESTIMATORS),
+                        help="Estimators to run")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per case (the fastest counts)")
+    parser.add_argument('--no-import-times', action='store_true', help="Skip the import time measurement")
+    parser.add_argument('-o', '--output', default=None, help="JSON file receiving the results")
+    parser.add_argument('--baseline', default=None, help="Baseline JSON to compare throughput against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Accepted relative throughput drop before a case counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    report = run_benchmark(args.lengths, args.profiles, args.estimators, args.repeats,
+                           () if args.no_import_times else IMPORT_MODULES)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            logging.warning(f"Regression: {r['estimator']} {r['profile']} {r['length']}: "
+                            f"{r['samples_per_second']:.0f} samples/s vs {r['baseline_samples_per_second']:.0f} "
+                            f"({100 * r['change']:+.1f}%)")
+        import_regressions = compare_import_times(report, baseline, args.tolerance)
+        for r in import_regressions:
+            logging.warning(f"Regression: import {r['module']}: {1000 * r['seconds']:.0f} ms vs "
+                            f"{1000 * r['baseline_seconds']:.0f} ms ({100 * r['change']:+.1f}%)")
+        if regressions or import_regressions:
+            return 1
+        logging.info(f"No throughput regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,158 @@
 import numpy as np
 import pandas as pd
 import os
+from storage import detect_format, save_data
 
-def simulate_battery_data(total_time=3600, dt=1, initial_soc=1.0, battery_capacity=3600):
+PROFILES = ('square', 'drive_cycle', 'pulse', 'cccv')
+
+# Synthetic urban drive cycle as (duration in s, current in C-rate) segments:
+# accelerate, cruise, regenerative braking and idle, repeated with varying
+# intensity. Positive current discharges the battery.
+DRIVE_CYCLE_SEGMENTS = (
+    (15, 1.5), (40, 0.6), (8, -0.8), (20, 0.0),
+    (25, 2.0), (90, 0.9), (12, -1.2), (30, 0.0),
+    (10, 1.2), (30, 0.4), (6, -0.5), (45, 0.0),
+)
+
+# Samples generated per step of the profile streams. Independent of the
+# output chunk size, so chunking never changes the generated data.
+_PROFILE_BLOCK = 65536
+
+
+def _square_current(n_total, dt):
+    """Discharge-first square wave of the original simulator: -0.5 A then +0.5 A."""
+    for start in range(0, n_total, _PROFILE_BLOCK):
+        index = np.arange(start, min(start + _PROFILE_BLOCK, n_total))
+        yield np.where(index < n_total // 2, -0.5, 0.5)
+
+
+def _drive_cycle_current(n_total, dt, one_c):
+    """Periodic synthetic drive cycle sampled every dt seconds."""
+    durations, currents = np.array(DRIVE_CYCLE_SEGMENTS, dtype=float).T
+    edges = np.cumsum(durations)
+    for start in range(0, n_total, _PROFILE_BLOCK):
+        t = np.arange(start, min(start + _PROFILE_BLOCK, n_total)) * dt % edges[-1]
+        yield currents[np.searchsorted(edges, t, side='right')] * one_c
+
+
+def _pulse_current(rng, dt, one_c):
+    """Random pulse train: pulses of random amplitude separated by rests."""
+    while True:
+        n_pulses = 1024
+        amplitude = rng.uniform(-2.0, 2.0, n_pulses) * one_c
+        pulse = np.maximum(1, (rng.uniform(5, 120, n_pulses) / dt).astype(int))
+        rest = np.maximum(1, (rng.uniform(10, 600, n_pulses) / dt).astype(int))
+        values = np.column_stack((amplitude, np.zeros(n_pulses))).ravel()
+        yield np.repeat(values, np.column_stack((pulse, rest)).ravel())
+
+
+def _cccv_current(n_total, dt, c_rate, battery_capacity):
+    """
+    Repeated CC discharge, rest, CC charge and exponentially tapering CV
+    charge, with the discharge removing exactly the charge put back in.
+    """
+    one_c = battery_capacity / 3600.0
+    charge_current = 0.5 * one_c * c_rate
+    taper_tau = 600.0
+    cutoff = 0.05 * one_c * c_rate
+    cc_time = 0.5 * 3600.0 / (0.5 * c_rate)  # CC charge over half the capacity
+    cv_time = taper_tau * np.log(charge_current / cutoff)
+    charged = charge_current * cc_time + charge_current * taper_tau * (1.0 - cutoff / charge_current)
+    discharge_time = charged / (one_c * c_rate)
+
+    t = np.arange(0.0, discharge_time + 1800.0 + cc_time + cv_time + 1800.0, dt)
+    cycle = np.zeros_like(t)
+    cycle[t < discharge_time] = one_c * c_rate
+    cc = (t >= discharge_time + 1800.0) & (t < discharge_time + 1800.0 + cc_time)
+    cycle[cc] = -charge_current
+    cv_start = discharge_time + 1800.0 + cc_time
+    cv = (t >= cv_start) & (t < cv_start + cv_time)
+    cycle[cv] = -charge_current * np.exp(-(t[cv] - cv_start) / taper_tau)
+
+    for start in range(0, n_total, _PROFILE_BLOCK):
+        index = np.arange(start, min(start + _PROFILE_BLOCK, n_total))
+        yield cycle[index % len(cycle)]
+
+
+def _current_stream(profile, n_total, dt, battery_capacity, c_rate, rng):
+    if profile == 'square':
+        return _square_current(n_total, dt)
+    if profile == 'drive_cycle':
+        return _drive_cycle_current(n_total, dt, c_rate * battery_capacity / 3600.0)
+    if profile == 'pulse':
+        return _pulse_current(rng, dt, c_rate * battery_capacity / 3600.0)
+    if profile == 'cccv':
+        return _cccv_current(n_total, dt, c_rate, battery_capacity)
+    raise ValueError(f"Unknown profile '{profile}', expected one of {PROFILES}")
+
+
+def iter_battery_data(total_time=3600, dt=1, initial_soc=1.0, battery_capacity=3600,
+                      profile='square', chunk_size=100_000, seed=None, c_rate=1.0,
+                      cell_model=None, voltage_noise=0.05):
+    """
+    Generates simulated battery data chunk by chunk.
+
+    Only one chunk is held in memory at a time, so arbitrarily long
+    datasets can be streamed to disk. For a given seed the generated data
+    does not depend on chunk_size.
+
+    Parameters:
+        total_time (int): Total simulation time in seconds.
+        dt (int): Time step in seconds.
+        initial_soc (float): Initial SoC (0 to 1).
+        battery_capacity (float): Battery capacity in Coulombs.
+        profile (str): Current profile: 'square' (the original -0.5 A / +0.5 A
+            wave), 'drive_cycle', 'pulse' (random pulse train) or 'cccv'
+            (CC discharge followed by CC-CV charging).
+        chunk_size (int): Number of rows per yielded chunk.
+        seed (int, optional): Seed for the random pulses and voltage noise.
+        c_rate (float): Current scale of the 'drive_cycle', 'pulse' and
+            'cccv' profiles, in multiples of the 1C current.
+        cell_model (EquivalentCircuitModel, optional): Cell model generating
+            the terminal voltage. If None, voltage is 4.2 * SoC.
+        voltage_noise (float): Standard deviation of the voltage noise in Volts.
+
+    Yields:
+        data (DataFrame): Chunk of simulated battery data (time, current,
+            voltage, soc_ground_truth).
+    """
+    n_total = len(np.arange(0, total_time, dt))
+    profile_seed, noise_seed = np.random.SeedSequence(seed).spawn(2)
+    noise_rng = np.random.default_rng(noise_seed)
+    stream = _current_stream(profile, n_total, dt, battery_capacity, c_rate,
+                             np.random.default_rng(profile_seed))
+
+    buffered = np.empty(0)
+    charge = 0.0
+    v_rc = None
+    for start in range(0, n_total, chunk_size):
+        n = min(chunk_size, n_total - start)
+        while len(buffered) < n:
+            buffered = np.concatenate((buffered, next(stream)))
+        current, buffered = buffered[:n], buffered[n:]
+
+        # Continue the running sum exactly as one cumsum over the whole trace.
+        cumulative = np.cumsum(np.concatenate(([charge], current)))[1:]
+        charge = cumulative[-1]
+        soc_ground_truth = np.clip(initial_soc - (cumulative * dt) / battery_capacity, 0, 1)
+
+        if cell_model is None:
+            voltage = 4.2 * soc_ground_truth
+        else:
+            rc, v_rc = cell_model.rc_voltages(current, dt, initial=v_rc)
+            voltage = cell_model.terminal_voltage(soc_ground_truth, current, rc)
+        voltage = voltage + voltage_noise * noise_rng.standard_normal(n)
+
+        yield pd.DataFrame({
+            'time': (start + np.arange(n)) * dt,
+            'current': current,
+            'voltage': voltage,
+            'soc_ground_truth': soc_ground_truth
+        })
+
+
+def simulate_battery_data(total_time=3600, dt=1, initial_soc=1.0, battery_capacity=3600,
+                          cell_model=None, voltage_noise=0.05, profile='square', seed=None):
     """
     Simulates battery data for SoC estimation.
     
@@ -11,40 +161,43 @@ def simulate_battery_data(total_time=3600, dt=1, initial_soc=1.0, battery_capaci
         dt (int): Time step in seconds.
         initial_soc (float): Initial SoC (0 to 1).
         battery_capacity (float): Battery capacity in Coulombs.
+        cell_model (EquivalentCircuitModel, optional): Cell model generating
+            the terminal voltage. If None, voltage is 4.2 * SoC.
+        voltage_noise (float): Standard deviation of the voltage noise in Volts.
+        profile (str): Current profile, see ``iter_battery_data``.
+        seed (int, optional): Seed for the random pulses and voltage noise.
     
     Returns:
         data (DataFrame): Simulated battery data (time, current, voltage, soc_ground_truth).
     """
-    time_steps = np.arange(0, total_time, dt)
-    current = np.concatenate((-0.5 * np.ones(len(time_steps) // 2),
-                              0.5 * np.ones(len(time_steps) // 2)))
-    soc_ground_truth = initial_soc - (np.cumsum(current) * dt) / battery_capacity
-    soc_ground_truth = np.clip(soc_ground_truth, 0, 1)
-    voltage = 4.2 * soc_ground_truth + 0.05 * np.random.randn(len(soc_ground_truth))
+    chunks = iter_battery_data(total_time, dt, initial_soc, battery_capacity, profile=profile,
+                               chunk_size=max(1, len(np.arange(0, total_time, dt))), seed=seed,
+                               cell_model=cell_model, voltage_noise=voltage_noise)
+    return pd.concat(list(chunks), ignore_index=True)
 
-    data = pd.DataFrame({
-        'time': time_steps,
-        'current': current,
-        'voltage': voltage,
-        'soc_ground_truth': soc_ground_truth
-    })
-    return data
-
-# Save the simulated data to CSV
-def save_simulated_data(data, filename="../data/battery_data.csv"):
+# Save the simulated data to CSV (or a columnar format)
+def save_simulated_data(data, filename="../data/battery_data.csv", compression=None):
     """
-    Saves the simulated battery data to a CSV file.
+    Saves the simulated battery data to a file.
+
+    The format follows the extension: CSV keeps full float64 precision,
+    Parquet, Feather and NPZ files store float32 columns apart from the
+    float64 time (see ``storage``).
 
     Parameters:
-        data (DataFrame): The simulated battery data.
+        data (DataFrame or iterable): The simulated battery data, or an
+            iterable of chunks (e.g. from ``iter_battery_data``) that are
+            appended one after another.
         filename (str): Path to save the file.
+        compression (str, optional): Compression codec for the storage backend.
     """
     # Ensure the directory exists (though it should already exist)
     directory = os.path.dirname(filename)
-    if not os.path.exists(directory):
+    if directory and not os.path.exists(directory):
         print(f"Creating missing directory: {directory}")
         os.makedirs(directory)
 
-    # Save the data to CSV
-    data.to_csv(filename, index=False)
-    print(f"Simulated data saved to {filename}")
\ No newline at end of file
+    format = detect_format(filename)
+    save_data(data, filename, format=format, compression=compression,
+              float_dtype=None if format == 'csv' else np.float32)
+    print(f"Simulated data saved to {filename}")
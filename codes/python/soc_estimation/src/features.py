@@ -0,0 +1,114 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURES = ('current', 'voltage', 'current_mean', 'voltage_mean', 'charge', 'dvdt', 'rest_time')
+
+
+class FeatureExtractor:
+    """
+    Streaming temporal features for the SoC regressors.
+
+    Per sample, the features are (in FEATURES order):
+        current, voltage: instantaneous measurements.
+        current_mean, voltage_mean: means over the last ``window`` samples.
+        charge: charge drawn since the start of the stream, in Coulombs.
+        dvdt: voltage change since the previous sample, in V/s.
+        rest_time: time since |current| last exceeded ``rest_current``, in s.
+
+    The extractor keeps the little state these need (the last window - 1
+    samples, the running charge, the last voltage and the rest counter),
+    so transforming a trace chunk by chunk gives exactly the same features
+    as transforming it in one call. Before the first window fills, the
+    first sample is repeated.
+    """
+
+    def __init__(self, dt=1.0, window=30, rest_current=0.05):
+        """
+        Parameters:
+            dt (float): Time step in seconds.
+            window (int): Samples in the rolling means.
+            rest_current (float): Largest absolute current in Amperes counted as rest.
+        """
+        if window < 1:
+            raise ValueError(f"window must be positive, got {window}")
+        self.dt = dt
+        self.window = window
+        self.rest_current = rest_current
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the stream state, so the next chunk starts a new trace.
+        """
+        self._tail = None
+        self._last_voltage = None
+        self._charge = 0.0
+        self._rest_samples = 0
+
+    def _rolling_mean(self, tail, values):
+        # Each mean sums the same window - 1 + 1 samples in the same order
+        # regardless of chunking.
+        return sliding_window_view(np.concatenate((tail, values)), self.window).mean(axis=-1)
+
+    def transform(self, current, voltage):
+        """
+        Computes the features of the next chunk of the stream.
+
+        Parameters:
+            current (array): Current data in Amperes.
+            voltage (array): Voltage data in Volts.
+
+        Returns:
+            X (array): Features, shape (n_samples, len(FEATURES)).
+        """
+        current = np.asarray(current, dtype=np.float64)
+        voltage = np.asarray(voltage, dtype=np.float64)
+        n = len(current)
+        X = np.empty((n, len(FEATURES)))
+        if n == 0:
+            return X
+        if self._tail is None:
+            self._tail = (np.full(self.window - 1, current[0]), np.full(self.window - 1, voltage[0]))
+            self._last_voltage = voltage[0]
+        current_tail, voltage_tail = self._tail
+
+        X[:, 0] = current
+        X[:, 1] = voltage
+        X[:, 2] = self._rolling_mean(current_tail, current)
+        X[:, 3] = self._rolling_mean(voltage_tail, voltage)
+        # Accumulating from the carried total keeps the sums sequential.
+        X[:, 4] = np.cumsum(np.concatenate(([self._charge], current * self.dt)))[1:]
+        X[:, 5] = np.diff(voltage, prepend=self._last_voltage) / self.dt
+
+        # Samples since the last active one; an active sample resets to 0.
+        index = np.arange(n)
+        last_active = np.maximum.accumulate(
+            np.where(np.abs(current) > self.rest_current, index, -1 - self._rest_samples)
+        )
+        rest_samples = index - last_active
+        X[:, 6] = rest_samples * self.dt
+
+        if self.window > 1:
+            self._tail = (np.concatenate((current_tail, current))[1 - self.window:],
+                          np.concatenate((voltage_tail, voltage))[1 - self.window:])
+        self._last_voltage = voltage[-1]
+        self._charge = float(X[-1, 4])
+        self._rest_samples = int(rest_samples[-1])
+        return X
+
+
+def compute_features(current, voltage, dt=1.0, window=30, rest_current=0.05):
+    """
+    Computes the FEATURES of a whole trace, see ``FeatureExtractor``.
+
+    Parameters:
+        current (array): Current data in Amperes.
+        voltage (array): Voltage data in Volts.
+        dt (float): Time step in seconds.
+        window (int): Samples in the rolling means.
+        rest_current (float): Largest absolute current in Amperes counted as rest.
+
+    Returns:
+        X (array): Features, shape (n_samples, len(FEATURES)).
+    """
+    return FeatureExtractor(dt, window, rest_current).transform(current, voltage)
@@ -0,0 +1,255 @@
+import json
+import os
+import numpy as np
+
+MAGIC = b'SOCRF001'
+# Every array starts on a 64-byte boundary so the mapped views are aligned.
+_ALIGNMENT = 64
+# Samples routed through all trees at once by FlatForest.predict.
+_PREDICT_BLOCK = 4096
+# Descent steps between two removals of the (sample, tree) pairs that
+# already reached a leaf.
+_COMPACT_EVERY = 4
+
+
+def _align(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+class FlatScaler:
+    """
+    Array-only stand-in for a fitted StandardScaler.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        """
+        Standardizes features with the same float operations as StandardScaler.
+
+        Parameters:
+            X (array): Features, shape (n_samples, n_features).
+
+        Returns:
+            X_scaled (array): Standardized features.
+        """
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+class FlatForest:
+    """
+    Regression forest stored as contiguous node arrays.
+
+    All trees share one set of arrays and node indices are global; the two
+    children of node i are children[2 i] (left) and children[2 i + 1]
+    (right). Every (sample, tree) pair descends one level per vectorized
+    step and finished pairs are dropped periodically, so the cost follows
+    the average rather than the deepest path. Predictions match the
+    exported scikit-learn forest bit for bit.
+    """
+
+    def __init__(self, arrays):
+        """
+        Parameters:
+            arrays (dict): 'roots', 'feature', 'threshold', 'children',
+                'leaf', 'value', 'scaler_mean' and 'scaler_scale' arrays.
+        """
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children']
+        self.leaf = arrays['leaf']
+        self.value = arrays['value']
+        self.n_features = len(arrays['scaler_mean'])
+        self.scaler = FlatScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Leaf reached by each sample in each tree.
+
+        Parameters:
+            X (array): Scaled features, shape (n_samples, n_features).
+
+        Returns:
+            leaves (array): Global leaf indices, shape (n_samples, n_trees).
+        """
+        # Like scikit-learn, compare float32 features against the thresholds.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X must have shape (n_samples, {self.n_features}), got {X.shape}")
+
+        n_trees = self.n_trees
+        leaves = np.empty(len(X) * n_trees, dtype=self.roots.dtype)
+        for start in range(0, len(X), _PREDICT_BLOCK):
+            stop = min(len(X), start + _PREDICT_BLOCK)
+            flat = X[start:stop].ravel()
+            node = np.tile(self.roots, stop - start)
+            position = np.arange(start * n_trees, stop * n_trees)
+            offset = np.repeat(np.arange(stop - start) * self.n_features, n_trees)
+            level = 0
+            while len(node):
+                go_right = flat[offset + self.feature[node]] > self.threshold[node]
+                node = self.children[2 * node + go_right]
+                level += 1
+                # Leaves point to themselves, so finished pairs can keep
+                # stepping for a few levels before being dropped.
+                if level % _COMPACT_EVERY == 0:
+                    done = self.leaf[node]
+                    leaves[position[done]] = node[done]
+                    active = ~done
+                    node, position, offset = node[active], position[active], offset[active]
+        return leaves.reshape(len(X), n_trees)
+
+    def predict(self, X):
+        """
+        Predicts SoC with the flattened forest.
+
+        Parameters:
+            X (array): Scaled features, shape (n_samples, n_features).
+
+        Returns:
+            y (array): Mean of the tree predictions.
+        """
+        leaf_values = self.value[self.apply(X)]
+        # Accumulate tree by tree in order, as scikit-learn does.
+        y = np.zeros(len(leaf_values))
+        for tree in range(self.n_trees):
+            y += leaf_values[:, tree]
+        y /= self.n_trees
+        return y
+
+
+def flatten_forest(model, scaler):
+    """
+    Converts a fitted single-output forest regressor and its scaler to arrays.
+
+    Only the fitted attributes are read, so scikit-learn is not imported.
+
+    Parameters:
+        model (RandomForestRegressor): Fitted forest (or any ensemble of
+            regression trees averaged the same way).
+        scaler (StandardScaler): Fitted scaler of the model inputs.
+
+    Returns:
+        forest (FlatForest): The flattened model.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise ValueError("Only single-output regression forests can be flattened")
+
+    sizes = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    left = np.concatenate([tree.children_left for tree in trees])
+    right = np.concatenate([tree.children_right for tree in trees])
+    leaf = left == -1
+    offsets = np.repeat(roots, sizes)
+    nodes = np.arange(len(left))
+    # Leaves loop back to themselves so extra descent steps are harmless.
+    children = np.empty(2 * len(left), dtype=np.int32)
+    children[0::2] = np.where(leaf, nodes, left + offsets)
+    children[1::2] = np.where(leaf, nodes, right + offsets)
+
+    # For float32 x, x <= t holds exactly when x <= t rounded down to
+    # float32, so the comparison can run in single precision.
+    threshold = np.concatenate([tree.threshold for tree in trees])
+    threshold32 = threshold.astype(np.float32)
+    rounded_up = threshold32 > threshold
+    threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+
+    n_features = model.n_features_in_
+    mean = np.zeros(n_features) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.ones(n_features) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+    arrays = {
+        'roots': roots.astype(np.int32),
+        'feature': np.where(leaf, 0, np.concatenate([tree.feature for tree in trees])).astype(np.int32),
+        'threshold': threshold32,
+        'children': children,
+        'leaf': leaf,
+        'value': np.concatenate([tree.value.reshape(-1) for tree in trees]).astype(np.float64),
+        'scaler_mean': mean,
+        'scaler_scale': scale,
+    }
+    return FlatForest(arrays)
+
+
+def save_forest(forest, path):
+    """
+    Writes a FlatForest as a single memory-mappable file.
+
+    The file is the magic bytes, the JSON header length (uint64), a JSON
+    header describing each array and the raw arrays.
+
+    Parameters:
+        forest (FlatForest): Model to save.
+        path (str): Output file path.
+    """
+    arrays = {
+        'roots': forest.roots,
+        'feature': forest.feature,
+        'threshold': forest.threshold,
+        'children': forest.children,
+        'leaf': forest.leaf,
+        'value': forest.value,
+        'scaler_mean': forest.scaler.mean_,
+        'scaler_scale': forest.scaler.scale_,
+    }
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({'arrays': layout}).encode()
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+
+
+def load_forest(path):
+    """
+    Memory-maps a model written by ``save_forest``.
+
+    Only the header is parsed; the node arrays are views into the mapping
+    and are paged in as prediction touches them.
+
+    Parameters:
+        path (str): Model file path.
+
+    Returns:
+        forest (FlatForest): The loaded model.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a flattened forest file")
+        header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_size))
+    data_start = _align(len(MAGIC) + 8 + header_size)
+
+    mapping = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        count = int(np.prod(spec['shape']))
+        arrays[name] = mapping[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return FlatForest(arrays)
@@ -0,0 +1,213 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from storage import FORMATS, detect_format, iter_data, save_data
+from telemetry import TelemetryReader, iter_window_estimates
+
+TELEMETRY_EXTENSION = '.tlm'
+OUTPUT_FORMATS = ('parquet', 'feather')
+_OUTPUT_EXTENSIONS = {'parquet': '.parquet', 'feather': '.feather'}
+_PARTIAL_SUFFIX = '.partial'
+_INPUT_COLUMNS = ['time', 'current', 'voltage']
+
+# Model and scaler of the current worker process, loaded once by _init_worker.
+_ML = {}
+
+
+def find_logs(pattern):
+    """
+    Lists the log files matched by a glob pattern or contained in a directory.
+
+    Parameters:
+        pattern (str): Directory, file path or glob pattern (``**`` recurses).
+
+    Returns:
+        paths (list): Sorted paths of telemetry and storage files.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*')
+    paths = []
+    for path in glob.glob(pattern, recursive=True):
+        if not os.path.isfile(path):
+            continue
+        if path.endswith(TELEMETRY_EXTENSION):
+            paths.append(path)
+            continue
+        try:
+            detect_format(path)
+        except ValueError:
+            continue
+        paths.append(path)
+    return sorted(paths)
+
+
+def output_path(log_path, output_dir, output_format='parquet'):
+    """
+    Path of the estimates written for one log file.
+    """
+    stem = os.path.splitext(os.path.basename(log_path))[0]
+    return os.path.join(output_dir, stem + _OUTPUT_EXTENSIONS[output_format])
+
+
+def _iter_log_windows(path, window_size):
+    if path.endswith(TELEMETRY_EXTENSION):
+        return TelemetryReader(path).windows(window_size)
+    return iter_data(path, chunk_size=window_size, columns=_INPUT_COLUMNS)
+
+
+def _init_worker(model_path):
+    if model_path is not None:
+        import joblib
+        saved = joblib.load(model_path)
+        _ML['model'] = saved['model']
+        _ML['scaler'] = saved['scaler']
+        _ML['feature_extractor'] = saved.get('feature_extractor')
+
+
+def process_log(log_path, destination, output_format='parquet', window_size=65536, **kwargs):
+    """
+    Estimates SoC for one log file and writes the estimates atomically.
+
+    The log is read window by window, so memory use does not depend on the
+    file size. Estimates go to a temporary file that is renamed once
+    complete; an existing destination therefore always holds a full result.
+
+    Parameters:
+        log_path (str): Telemetry or storage file with time, current and voltage.
+        destination (str): Output file path.
+        output_format (str): One of OUTPUT_FORMATS.
+        window_size (int): Samples per window.
+        **kwargs: Estimator settings, see ``iter_window_estimates``.
+
+    Returns:
+        n_samples (int): Number of samples processed.
+    """
+    n_samples = 0
+    partial = destination + _PARTIAL_SUFFIX
+
+    def estimates():
+        nonlocal n_samples
+        for chunk in iter_window_estimates(_iter_log_windows(log_path, window_size),
+                                           model=_ML.get('model'), scaler=_ML.get('scaler'),
+                                           feature_extractor=_ML.get('feature_extractor'), **kwargs):
+            n_samples += len(chunk)
+            yield chunk
+
+    try:
+        # Full precision: float32 would collapse absolute (epoch) time stamps.
+        save_data(estimates(), partial, format=output_format, float_dtype=None)
+        if n_samples == 0:
+            raise ValueError(f"'{log_path}' contains no samples")
+        os.replace(partial, destination)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return n_samples
+
+
+def _run_job(log_path, destination, output_format, window_size, kwargs):
+    start = time.perf_counter()
+    n_samples = process_log(log_path, destination, output_format, window_size, **kwargs)
+    return n_samples, time.perf_counter() - start
+
+
+def run_fleet(pattern, output_dir, workers=None, output_format='parquet', window_size=65536,
+              model_path=None, resume=True, **kwargs):
+    """
+    Runs the SoC estimators over many log files on a process pool.
+
+    Each file is one job; a worker streams it window by window, so memory
+    stays bounded by workers * window_size. With ``resume`` files whose
+    output already exists are skipped, so an interrupted run can simply be
+    restarted.
+
+    Parameters:
+        pattern (str): Directory or glob pattern of the log files.
+        output_dir (str): Directory receiving one output file per log.
+        workers (int, optional): Worker processes; os.cpu_count() if None.
+        output_format (str): One of OUTPUT_FORMATS.
+        window_size (int): Samples per window.
+        model_path (str, optional): joblib file holding a dict with the
+            trained 'model', its 'scaler' and optionally the
+            'feature_extractor' it was trained with; the ML estimate is
+            skipped if None.
+        resume (bool): Skip logs whose output already exists.
+        **kwargs: Estimator settings, see ``iter_window_estimates``.
+
+    Returns:
+        summary (dict): Lists of 'completed', 'skipped' and 'failed' log paths.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    logs = find_logs(pattern)
+    destinations = {log: output_path(log, output_dir, output_format) for log in logs}
+    if len(set(destinations.values())) != len(destinations):
+        raise ValueError("Log files with the same name in different directories would share an output file")
+    os.makedirs(output_dir, exist_ok=True)
+
+    summary = {'completed': [], 'skipped': [], 'failed': []}
+    pending = []
+    for log in logs:
+        if resume and os.path.exists(destinations[log]):
+            summary['skipped'].append(log)
+        else:
+            pending.append(log)
+    logging.info(f"{len(logs)} logs found, {len(summary['skipped'])} already done, {len(pending)} to process.")
+    if not pending:
+        return summary
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = {
+            pool.submit(_run_job, log, destinations[log], output_format, window_size, kwargs): log
+            for log in pending
+        }
+        for future in as_completed(futures):
+            log = futures[future]
+            try:
+                n_samples, seconds = future.result()
+            except Exception as e:
+                logging.error(f"{log}: {e}")
+                summary['failed'].append(log)
+                continue
+            logging.info(f"{log}: {n_samples} samples in {seconds:.2f} s ({n_samples / max(seconds, 1e-9):.0f} samples/s)")
+            summary['completed'].append(log)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run SoC estimation over a fleet of log files.")
+    parser.add_argument('logs', help="Directory or glob pattern of log files "
+                                     f"({TELEMETRY_EXTENSION} telemetry or one of {', '.join(FORMATS)})")
+    parser.add_argument('-o', '--output-dir', required=True, help="Directory for the estimates")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet', help="Output format")
+    parser.add_argument('--window-size', type=int, default=65536, help="Samples per window")
+    parser.add_argument('--initial-soc', type=float, default=1.0, help="Initial SoC (0 to 1)")
+    parser.add_argument('--capacity', type=float, default=3600, help="Battery capacity in Coulombs")
+    parser.add_argument('--dt', type=float, default=None, help="Time step in seconds (default: from time stamps)")
+    parser.add_argument('--steady-state', action='store_true', help="Use the steady-state Kalman gain")
+    parser.add_argument('--model', default=None, help="joblib file with a dict of 'model' and 'scaler'")
+    parser.add_argument('--no-resume', action='store_true', help="Recompute logs that already have output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    summary = run_fleet(
+        args.logs, args.output_dir, workers=args.workers, output_format=args.format,
+        window_size=args.window_size, model_path=args.model, resume=not args.no_resume,
+        initial_soc=args.initial_soc, battery_capacity=args.capacity, dt=args.dt,
+        steady_state=args.steady_state
+    )
+    logging.info(f"{len(summary['completed'])} completed, {len(summary['skipped'])} skipped, "
+                 f"{len(summary['failed'])} failed.")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import collections
+import copy
+import json
+import logging
+import socket
+import sys
+import time
+import numpy as np
+from flat_forest import FlatScaler, flatten_forest, load_forest
+
+# Latencies kept for the percentile metrics.
+_LATENCY_HISTORY = 10000
+# Streams whose feature state is kept; the least recently used is dropped first.
+DEFAULT_MAX_STREAMS = 4096
+
+
+def load_inference_model(model_path, flatten=True):
+    """
+    Loads a model for serving.
+
+    Parameters:
+        model_path (str): A flattened forest (.forest), a joblib bundle with
+            'model', 'scaler' and optionally 'feature_extractor' entries, or
+            a joblib ``IncrementalSoCRegressor``.
+        flatten (bool): Convert forest models to a ``FlatForest``, whose
+            small-batch predictions avoid scikit-learn's per-call overhead.
+
+    Returns:
+        model: Model with a ``predict`` method taking scaled features.
+        scaler (FlatScaler): Feature scaler.
+        feature_extractor (FeatureExtractor or None): Feature stage of the model.
+    """
+    if model_path.endswith('.forest'):
+        model = load_forest(model_path)
+        return model, model.scaler, None
+
+    import joblib
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    bundle = joblib.load(model_path)
+    if not isinstance(bundle, dict):
+        # Incremental models carry their scaler.
+        bundle = {'model': bundle, 'scaler': bundle.scaler}
+    model, scaler = bundle['model'], bundle['scaler']
+    if flatten and isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        model = flatten_forest(model, scaler)
+    # Same arithmetic as StandardScaler.transform without its input checks.
+    return model, FlatScaler(scaler.mean_, scaler.scale_), bundle.get('feature_extractor')
+
+
+class InferenceServer:
+    """
+    asyncio SoC inference service speaking newline-delimited JSON.
+
+    A request is ``{"id": ..., "current": A, "voltage": V}``, optionally with
+    a ``"stream"`` name when the model uses temporal features (each stream
+    keeps its own feature state, up to ``max_streams`` recently used ones);
+    the response is ``{"id": ..., "soc": x}``.
+    ``{"metrics": true}`` returns the latency metrics instead.
+
+    Requests arriving within ``batch_window`` seconds of the first pending
+    one are predicted together, so concurrent clients share one model call.
+    """
+
+    def __init__(self, model, scaler, feature_extractor=None, batch_window=0.001, max_batch=256,
+                 max_streams=DEFAULT_MAX_STREAMS):
+        """
+        Parameters:
+            model: Model with a ``predict`` method taking scaled features.
+            scaler: Fitted scaler with a ``transform`` method.
+            feature_extractor (FeatureExtractor, optional): Feature stage of the model.
+            batch_window (float): Seconds to wait for more requests after the
+                first one of a batch.
+            max_batch (int): Largest number of requests predicted together.
+            max_streams (int): Streams whose feature state is kept. Beyond
+                that the least recently used stream is dropped, and starts
+                over from a fresh feature state if it comes back.
+        """
+        self.model = model
+        self.scaler = scaler
+        self.feature_extractor = feature_extractor
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_streams = max_streams
+        self.latencies = collections.deque(maxlen=_LATENCY_HISTORY)
+        self.n_requests = 0
+        self.n_batches = 0
+        self._streams = collections.OrderedDict()
+        self._queue = None
+        self._batcher = None
+
+    def _features(self, stream, current, voltage):
+        if self.feature_extractor is None:
+            return (current, voltage)
+        state = self._streams.get(stream)
+        if state is None:
+            state = copy.deepcopy(self.feature_extractor)
+            state.reset()
+            self._streams[stream] = state
+            if len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        else:
+            self._streams.move_to_end(stream)
+        return state.transform([current], [voltage])[0]
+
+    def predict_batch(self, rows):
+        """
+        Predicts SoC for a batch of feature rows.
+
+        Parameters:
+            rows (list): Feature rows, one per request.
+
+        Returns:
+            soc (array): Predicted SoC, clipped to [0, 1].
+        """
+        X = self.scaler.transform(np.array(rows, dtype=np.float64))
+        return np.clip(self.model.predict(X), 0, 1)
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                soc = self.predict_batch([row for row, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), value in zip(batch, soc.tolist()):
+                    future.set_result(value)
+            self.n_batches += 1
+
+    def metrics(self):
+        """
+        Latency and batching metrics since the server started.
+
+        Returns:
+            metrics (dict): Request and batch counts, mean batch size,
+                p50/p99 request latency in microseconds over the last
+                requests and the number of streams with feature state.
+        """
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'requests': self.n_requests,
+            'batches': self.n_batches,
+            'mean_batch_size': self.n_requests / self.n_batches if self.n_batches else 0.0,
+            'p50_us': 1e6 * float(np.percentile(latencies, 50)),
+            'p99_us': 1e6 * float(np.percentile(latencies, 99)),
+            'streams': len(self._streams),
+        }
+
+    async def _answer(self, request, received, writer):
+        try:
+            if request.get('metrics'):
+                response = self.metrics()
+            else:
+                row = self._features(request.get('stream'), float(request['current']), float(request['voltage']))
+                future = asyncio.get_running_loop().create_future()
+                await self._queue.put((row, future))
+                response = {'id': request.get('id'), 'soc': await future}
+                self.latencies.append(time.perf_counter() - received)
+                self.n_requests += 1
+        except Exception as e:
+            response = {'id': request.get('id'), 'error': str(e)}
+        writer.write(json.dumps(response).encode() + b'\n')
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves one client; requests on a connection may be pipelined and
+        responses are matched by id.
+        """
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    writer.write(json.dumps({'error': f"invalid JSON: {e}"}).encode() + b'\n')
+                    continue
+                task = asyncio.ensure_future(self._answer(request, received, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def start_batcher(self):
+        """
+        Creates the request queue and the batching task on the running loop.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._run_batches())
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None, ready=None):
+        """
+        Serves until cancelled.
+
+        Parameters:
+            host (str): TCP host, used if unix_path is None.
+            port (int): TCP port; 0 picks a free one.
+            unix_path (str, optional): Unix socket path to listen on instead.
+            ready (callable, optional): Called with the bound address once listening.
+        """
+        self.start_batcher()
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        address = unix_path if unix_path is not None else server.sockets[0].getsockname()[:2]
+        logging.info(f"Serving SoC inference on {address}")
+        if ready is not None:
+            ready(address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._batcher.cancel()
+
+
+def request_soc(address, requests):
+    """
+    Minimal blocking client: sends requests over one connection and waits
+    for all responses.
+
+    Parameters:
+        address (tuple or str): (host, port) or a Unix socket path.
+        requests (list): Request dicts.
+
+    Returns:
+        responses (list): Response dicts in request order if ids are
+            unique, otherwise in arrival order.
+    """
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        sock.sendall(b''.join(json.dumps(r).encode() + b'\n' for r in requests))
+        sock.shutdown(socket.SHUT_WR)
+        data = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    responses = [json.loads(line) for line in data.splitlines()]
+    ids = [r.get('id') for r in requests]
+    if len(set(ids)) == len(ids) and all(r.get('id') in ids for r in responses):
+        order = {i: n for n, i in enumerate(ids)}
+        responses.sort(key=lambda r: order[r.get('id')])
+    return responses
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve SoC predictions over a local socket.")
+    parser.add_argument('--model', required=True, help="Flattened forest (.forest) or joblib model bundle")
+    parser.add_argument('--unix', default=None, help="Unix socket path (default: TCP)")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port")
+    parser.add_argument('--batch-window-ms', type=float, default=1.0, help="Micro-batching window in milliseconds")
+    parser.add_argument('--max-batch', type=int, default=256, help="Largest micro-batch")
+    parser.add_argument('--max-streams', type=int, default=DEFAULT_MAX_STREAMS,
+                        help="Streams whose feature state is kept (least recently used dropped first)")
+    parser.add_argument('--no-flatten', action='store_true', help="Serve forests with scikit-learn")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    model, scaler, feature_extractor = load_inference_model(args.model, flatten=not args.no_flatten)
+    server = InferenceServer(model, scaler, feature_extractor, args.batch_window_ms / 1000.0, args.max_batch,
+                             args.max_streams)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        logging.info(f"Stopped: {server.metrics()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
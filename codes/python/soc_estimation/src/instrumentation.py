@@ -0,0 +1,240 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Prometheus metric -> (summary field, type, help text).
+_PROMETHEUS_METRICS = (
+    ('soc_stage_calls_total', 'calls', 'counter', 'Number of runs of the stage.'),
+    ('soc_stage_wall_seconds', 'wall_seconds', 'gauge', 'Wall time spent in the stage.'),
+    ('soc_stage_cpu_seconds', 'cpu_seconds', 'gauge', 'CPU time of the process running the stage.'),
+    ('soc_stage_peak_rss_bytes', 'peak_rss_bytes', 'gauge', 'Peak resident set size of the process running the stage.'),
+    ('soc_stage_samples_total', 'samples', 'counter', 'Samples processed by the stage.'),
+    ('soc_stage_samples_per_second', 'samples_per_second', 'gauge', 'Throughput of the stage.'),
+)
+
+
+def peak_rss():
+    """
+    Peak resident set size of the current process in bytes, or None where
+    the ``resource`` module is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Measurement:
+    """
+    Context manager measuring one run of a stage.
+
+    On exit ``metrics`` holds the stage name, wall and CPU time, the peak
+    RSS of the process and the sample count, which can be set on the
+    measurement inside the block. CPU time is that of the whole process,
+    so it includes concurrently running threads.
+    """
+
+    def __init__(self, name, samples=None):
+        """
+        Parameters:
+            name (str): Stage name.
+            samples (int, optional): Samples processed by the stage.
+        """
+        self.name = name
+        self.samples = samples
+        self.metrics = None
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self._wall
+        self.metrics = {
+            'stage': self.name,
+            'wall_seconds': wall,
+            'cpu_seconds': time.process_time() - self._cpu,
+            'peak_rss_bytes': peak_rss(),
+            'samples': self.samples,
+            'samples_per_second': self.samples / wall if self.samples is not None and wall > 0 else None,
+        }
+        return False
+
+
+class _DisabledStage:
+    """
+    Stand-in for Measurement while instrumentation is disabled.
+    """
+    samples = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class _RecordedStage(Measurement):
+    def __init__(self, instrumentation, name, samples):
+        super().__init__(name, samples)
+        self._instrumentation = instrumentation
+
+    def __exit__(self, *exc_info):
+        super().__exit__(*exc_info)
+        self._instrumentation.add(self.metrics)
+        return False
+
+
+class Instrumentation:
+    """
+    Collects per-stage metrics of a pipeline run.
+
+    Stages are measured with the ``stage`` context manager or the
+    ``instrument`` decorator. Metrics measured elsewhere, e.g. in worker
+    processes of ``run_pipeline``, are added with ``add``. While disabled,
+    ``stage`` returns a shared no-op context and decorated functions are
+    called directly, so instrumented code costs next to nothing.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Parameters:
+            enabled (bool): Record metrics.
+        """
+        self.enabled = enabled
+        self.records = []
+        self._lock = threading.Lock()
+
+    def stage(self, name, samples=None):
+        """
+        Measures the enclosed block as one run of a stage.
+
+        Parameters:
+            name (str): Stage name.
+            samples (int, optional): Samples processed; may also be set on
+                the returned object inside the block.
+
+        Returns:
+            context: Context manager yielding an object with a ``samples`` attribute.
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _RecordedStage(self, name, samples)
+
+    def instrument(self, name=None, samples=len):
+        """
+        Decorator measuring every call of a function as a stage.
+
+        Parameters:
+            name (str, optional): Stage name; the function name if None.
+            samples (callable, optional): Computes the sample count from the
+                return value; no count if None.
+        """
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(stage_name) as stage:
+                    result = func(*args, **kwargs)
+                    if samples is not None:
+                        stage.samples = samples(result)
+                return result
+            return wrapper
+        return decorator
+
+    def add(self, metrics):
+        """
+        Records the metrics of one stage run, as produced by ``Measurement``.
+        """
+        if self.enabled:
+            with self._lock:
+                self.records.append(dict(metrics))
+
+    def summary(self):
+        """
+        Metrics aggregated per stage name: calls, wall/CPU time and samples
+        are summed, the peak RSS is the maximum.
+
+        Returns:
+            summary (dict): Aggregated metrics by stage name, in first-run order.
+        """
+        summary = {}
+        for record in self.records:
+            total = summary.setdefault(record['stage'], {
+                'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_bytes': None, 'samples': None,
+            })
+            total['calls'] += 1
+            total['wall_seconds'] += record['wall_seconds']
+            total['cpu_seconds'] += record['cpu_seconds']
+            if record['peak_rss_bytes'] is not None:
+                total['peak_rss_bytes'] = max(total['peak_rss_bytes'] or 0, record['peak_rss_bytes'])
+            if record['samples'] is not None:
+                total['samples'] = (total['samples'] or 0) + record['samples']
+        for total in summary.values():
+            has_rate = total['samples'] is not None and total['wall_seconds'] > 0
+            total['samples_per_second'] = total['samples'] / total['wall_seconds'] if has_rate else None
+        return summary
+
+    def report(self):
+        """
+        Machine-readable report of all recorded runs.
+
+        Returns:
+            report (dict): 'stages', the individual runs in recording order,
+                and 'summary', see ``summary``.
+        """
+        return {'stages': list(self.records), 'summary': self.summary()}
+
+    def prometheus_text(self):
+        """
+        The summary in the Prometheus text exposition format, one sample
+        per stage labelled ``stage``.
+        """
+        summary = self.summary()
+        lines = []
+        for metric, field, kind, description in _PROMETHEUS_METRICS:
+            samples = [(stage, total[field]) for stage, total in summary.items() if total[field] is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for stage, value in samples:
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        """
+        Writes ``report`` as JSON, atomically.
+        """
+        _write_atomic(path, json.dumps(self.report(), indent=2))
+
+    def write_prometheus(self, path):
+        """
+        Writes ``prometheus_text`` atomically, as expected by the node
+        exporter's textfile collector.
+        """
+        _write_atomic(path, self.prometheus_text())
+
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -1,23 +1,221 @@
-from filterpy.kalman import KalmanFilter
+from functools import lru_cache
 import numpy as np
 
-def kalman_filter_estimation(current, voltage, initial_soc, battery_capacity, dt):
+
+def _scalar_kalman_gains(n, P, Q, R):
+    """
+    Precomputes the Kalman gains of a scalar random-walk filter (F = H = 1).
+
+    The covariance recursion does not depend on the measurements, so the
+    gains can be computed up front. The recursion stops as soon as the
+    posterior covariance reaches its floating-point fixed point; every later
+    step then uses the last gain.
+
+    Parameters:
+        n (int): Number of filter steps.
+        P (float): Initial state covariance.
+        Q (float): Process noise variance.
+        R (float): Measurement noise variance.
+
+    Returns:
+        gains (list): Gain of each step until convergence.
+        P (float): Posterior covariance after the last computed step.
+    """
+    gains = []
+    for _ in range(n):
+        # Same operation order as FilterPy: predict, then Joseph-form update.
+        P_prior = P + Q
+        K = P_prior * (1.0 / (P_prior + R))
+        I_KH = 1.0 - K
+        P_post = (I_KH * P_prior) * I_KH + (K * R) * K
+        gains.append(K)
+        if P_post == P:
+            break
+        P = P_post
+    return gains, P
+
+
+@lru_cache(maxsize=None)
+def steady_state_gain(Q, R):
+    """
+    Solves the scalar discrete algebraic Riccati equation for F = H = 1.
+
+    The predicted covariance P satisfies P = P R / (P + R) + Q, whose
+    positive root is P = (Q + sqrt(Q^2 + 4 Q R)) / 2.
+
+    Parameters:
+        Q (float): Process noise variance.
+        R (float): Measurement noise variance.
+
+    Returns:
+        K (float): Steady-state Kalman gain.
+        P (float): Steady-state posterior covariance.
+    """
+    P_prior = (Q + np.sqrt(Q * Q + 4.0 * Q * R)) / 2.0
+    K = P_prior / (P_prior + R)
+    return float(K), float((1.0 - K) * P_prior)
+
+
+def _steady_state_transient(n, P, Q, R, tol):
+    """
+    Gains of the exact recursion until they are within tol of the steady state.
+
+    Parameters:
+        n (int): Number of filter steps.
+        P (float): Initial state covariance.
+        Q (float): Process noise variance.
+        R (float): Measurement noise variance.
+        tol (float): Relative tolerance on the gain.
+
+    Returns:
+        gains (list): Gain of each transient step.
+        P (float): Posterior covariance after the transient.
+    """
+    K_ss, _ = steady_state_gain(Q, R)
+    gains = []
+    for _ in range(n):
+        P_prior = P + Q
+        K = P_prior * (1.0 / (P_prior + R))
+        if abs(K - K_ss) <= tol * K_ss:
+            break
+        I_KH = 1.0 - K
+        P = (I_KH * P_prior) * I_KH + (K * R) * K
+        gains.append(K)
+    return gains, P
+
+
+def scalar_kalman_filter(measurements, x, P, Q, R, steady_state=False, tol=1e-12):
+    """
+    Runs a scalar random-walk Kalman filter with plain float recurrences.
+
+    With ``steady_state`` the exact recursion only runs during the initial
+    transient; once the gain is within ``tol`` of the Riccati solution the
+    rest of the trace is a first-order linear filter evaluated by
+    ``scipy.signal.lfilter``. The result then differs from the exact
+    recursion by rounding only.
+
+    Parameters:
+        measurements (array): Measurements of the state.
+        x (float): Initial state estimate.
+        P (float): Initial state covariance.
+        Q (float): Process noise variance.
+        R (float): Measurement noise variance.
+        steady_state (bool): Use the steady-state gain after the transient.
+        tol (float): Relative gain tolerance that ends the transient.
+
+    Returns:
+        states (array): Posterior state estimate after each measurement.
+        x (float): Final state estimate.
+        P (float): Final state covariance.
+    """
+    if steady_state:
+        return _steady_state_kalman_filter(measurements, x, P, Q, R, tol)
+
+    zs = np.asarray(measurements, dtype=float).tolist()
+    gains, P = _scalar_kalman_gains(len(zs), float(P), float(Q), float(R))
+
+    states = []
+    append = states.append
+    x = float(x)
+    for K, z in zip(gains, zs):
+        x = x + K * (z - x)
+        append(x)
+    if len(gains) < len(zs):
+        K = gains[-1]
+        for z in zs[len(gains):]:
+            x = x + K * (z - x)
+            append(x)
+    return np.array(states, dtype=float), x, P
+
+
+def _steady_state_kalman_filter(measurements, x, P, Q, R, tol):
+    """
+    Steady-state variant of ``scalar_kalman_filter``.
+    """
+    measurements = np.asarray(measurements, dtype=float)
+    Q, R = float(Q), float(R)
+    gains, P = _steady_state_transient(len(measurements), float(P), Q, R, tol)
+
+    states = np.empty(len(measurements))
+    x = float(x)
+    for i, (K, z) in enumerate(zip(gains, measurements[:len(gains)].tolist())):
+        x = x + K * (z - x)
+        states[i] = x
+
+    if len(gains) < len(measurements):
+        # x[k] = (1 - K) x[k-1] + K z[k]
+        from scipy.signal import lfilter
+
+        K, P = steady_state_gain(Q, R)
+        states[len(gains):], _ = lfilter(
+            [K], [1.0, K - 1.0], measurements[len(gains):], zi=[(1.0 - K) * x]
+        )
+        x = float(states[-1])
+    return states, x, P
+
+
+def kalman_filter_estimation(current, voltage, initial_soc, battery_capacity, dt,
+                             process_noise=0.01, measurement_noise=1.0, initial_covariance=1.0,
+                             steady_state=False, cell_model=None):
+    """
+    Estimates SoC using a scalar Kalman Filter.
+
+    Produces the same output as ``kalman_filter_estimation_filterpy`` without
+    the per-step matrix machinery.
+
+    Parameters:
+        current (array): Current data in Amperes.
+        voltage (array): Voltage data in Volts.
+        initial_soc (float): Initial SoC (0 to 1).
+        battery_capacity (float): Battery capacity in Coulombs.
+        dt (float): Time step in seconds.
+        process_noise (float): Process noise variance.
+        measurement_noise (float): Measurement noise variance.
+        initial_covariance (float): Initial SoC variance.
+        steady_state (bool): Switch to the precomputed steady-state gain
+            once the initial transient has decayed.
+        cell_model (EquivalentCircuitModel, optional): Cell model used to map
+            voltage to SoC measurements through its OCV curve.
+
+    Returns:
+        soc (array): Estimated SoC over time.
+    """
+    if cell_model is None:
+        # Measurements: Voltage normalized to max voltage (assume linear relation)
+        measurements = np.asarray(voltage) / 4.2
+    else:
+        measurements = cell_model.soc_from_voltage(voltage, current)
+    soc, _, _ = scalar_kalman_filter(
+        measurements, initial_soc, initial_covariance, process_noise, measurement_noise,
+        steady_state=steady_state
+    )
+
+    # Adjust SoC using current
+    soc[1:] -= (np.asarray(current)[:-1] * dt) / battery_capacity
+    return np.clip(soc, 0, 1)
+
+
+def kalman_filter_estimation_filterpy(current, voltage, initial_soc, battery_capacity, dt):
     """
     Estimates SoC using Kalman Filter (with FilterPy).
-    
+
+    Reference implementation for ``kalman_filter_estimation``.
+
     Parameters:
         current (array): Current data in Amperes.
         voltage (array): Voltage data in Volts.
         initial_soc (float): Initial SoC (0 to 1).
         battery_capacity (float): Battery capacity in Coulombs.
         dt (float): Time step in seconds.
-    
+
     Returns:
         soc (array): Estimated SoC over time.
     """
+    from filterpy.kalman import KalmanFilter
+
     # Initialize Kalman Filter
     kf = KalmanFilter(dim_x=1, dim_z=1)
-    
+
     # Define initial state and matrices
     kf.x = np.array([initial_soc])  # Initial SoC
     kf.F = np.array([[1]])  # State transition matrix
@@ -33,14 +231,14 @@ def kalman_filter_estimation(current, voltage, initial_soc, battery_capacity, dt
     for i in range(len(measurements)):
         # Predict phase
         kf.predict()
-        
+
         # Update phase with measurement
         kf.update(measurements[i])
-        
+
         # Adjust SoC using current and store result
         state = kf.x[0]
         if i > 0:
             state -= (current[i-1] * dt) / battery_capacity
         soc.append(np.clip(state, 0, 1))
-    
+
     return np.array(soc)
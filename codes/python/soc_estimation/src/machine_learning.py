@@ -1,10 +1,13 @@
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
 import numpy as np
-import joblib
+import os
+import time
+from flat_forest import flatten_forest, load_forest, save_forest
+from model_cache import fingerprint
 
-def train_ml_model(X_train, y_train, model_path=None):
+FLAT_MODEL_EXTENSION = '.forest'
+MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+def train_ml_model(X_train, y_train, model_path=None, **params):
     """
     Trains a Machine Learning model for SoC prediction and optionally saves it.
 
@@ -12,21 +15,25 @@ def train_ml_model(X_train, y_train, model_path=None):
         X_train (array): Training features.
         y_train (array): Training target (SoC).
         model_path (str, optional): Path to save the trained model. If None, the model is not saved.
+        **params: RandomForestRegressor hyperparameters overriding MODEL_PARAMS.
 
     Returns:
         model (RandomForestRegressor): Trained ML model.
     """
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(**{**MODEL_PARAMS, **params})
     model.fit(X_train, y_train)
 
     # Save the model if a path is provided
     if model_path:
+        import joblib
         joblib.dump(model, model_path)
         print(f"Model saved to {model_path}")
 
     return model
 
-def machine_learning_soc_estimation(current, voltage, model, scaler):
+def machine_learning_soc_estimation(current, voltage, model, scaler, feature_extractor=None):
     """
     Estimates SoC using a trained ML model.
     
@@ -35,19 +42,93 @@ def machine_learning_soc_estimation(current, voltage, model, scaler):
         voltage (array): Voltage data in Volts.
         model: Trained Machine Learning model.
         scaler: Scaler for feature normalization.
+        feature_extractor (FeatureExtractor, optional): Feature stage the
+            model was trained with; its stream state carries over between
+            calls on consecutive chunks. The raw (current, voltage) pair
+            is used if None.
     
     Returns:
         soc (array): Predicted SoC over time.
     """
-    X = np.column_stack((current, voltage))
+    if feature_extractor is None:
+        X = np.column_stack((current, voltage))
+    else:
+        X = feature_extractor.transform(current, voltage)
     X_scaled = scaler.transform(X)
     soc_pred = model.predict(X_scaled)
     return np.clip(soc_pred, 0, 1)
 
+def export_flat_model(model, scaler, model_path):
+    """
+    Saves a trained forest and its scaler in the flattened, memory-mappable
+    format of ``flat_forest``.
+
+    Parameters:
+        model (RandomForestRegressor): Trained ML model.
+        scaler (StandardScaler): Scaler fitted on the training features.
+        model_path (str): Path to save the model, ending in FLAT_MODEL_EXTENSION.
+    """
+    save_forest(flatten_forest(model, scaler), model_path)
+    print(f"Flattened model saved to {model_path}")
+
+def cached_ml_model(X_train, y_train, cache, feature_extractor=None, **params):
+    """
+    Fits scaler and model, or reuses them from a cache.
+
+    The cache key hashes the unscaled training data, the hyperparameters
+    and the scikit-learn version, so any change retrains instead of
+    pairing a stale model with a new scaler. Each entry holds a joblib
+    bundle of model and scaler and the flattened model, which is what is
+    loaded on a hit.
+
+    Parameters:
+        X_train (array): Unscaled training features.
+        y_train (array): Training target (SoC).
+        cache (ModelCache): Model cache.
+        feature_extractor (FeatureExtractor, optional): Feature stage that
+            produced X_train, stored in the joblib bundle for consumers
+            such as ``fleet``.
+        **params: RandomForestRegressor hyperparameters overriding MODEL_PARAMS.
+
+    Returns:
+        model: Trained ML model (a FlatForest on a cache hit).
+        scaler: Scaler fitted on X_train.
+    """
+    import joblib
+    import sklearn
+    from sklearn.preprocessing import StandardScaler
+
+    params = {**MODEL_PARAMS, **params}
+    key = fingerprint(X_train, y_train, sklearn_version=sklearn.__version__, **params)
+
+    flat_path = cache.get(key, FLAT_MODEL_EXTENSION[1:])
+    if flat_path is not None:
+        model = load_forest(flat_path)
+        print(f"Model loaded from cache {flat_path}")
+        return model, model.scaler
+
+    bundle_path = cache.get(key, 'joblib')
+    if bundle_path is not None:
+        bundle = joblib.load(bundle_path)
+        model, scaler = bundle['model'], bundle['scaler']
+        print(f"Model loaded from cache {bundle_path}")
+    else:
+        scaler = StandardScaler()
+        model = train_ml_model(scaler.fit_transform(X_train), y_train, **params)
+        cache.put(key, 'joblib', lambda path: joblib.dump(
+            {'model': model, 'scaler': scaler, 'feature_extractor': feature_extractor}, path
+        ))
+        print(f"Model trained and cached as {cache.path(key, 'joblib')}")
+    cache.put(key, FLAT_MODEL_EXTENSION[1:], lambda path: save_forest(flatten_forest(model, scaler), path))
+    return model, scaler
+
 def load_ml_model(model_path="trained_model.pkl"):
     """
     Loads a trained Machine Learning model from a file.
 
+    Files ending in FLAT_MODEL_EXTENSION are memory-mapped as a
+    ``FlatForest``, whose ``scaler`` attribute holds the bundled scaler.
+
     Parameters:
         model_path (str): Path to the saved model.
 
@@ -55,9 +136,204 @@ def load_ml_model(model_path="trained_model.pkl"):
         model: Loaded ML model.
     """
     try:
-        model = joblib.load(model_path)
+        if model_path.endswith(FLAT_MODEL_EXTENSION):
+            model = load_forest(model_path)
+        else:
+            import joblib
+            model = joblib.load(model_path)
         print(f"Model loaded from {model_path}")
         return model
     except FileNotFoundError:
         print(f"Model file not found at {model_path}. Train the model first.")
-        return None
\ No newline at end of file
+        return None
+
+
+def _expand_features(X_scaled):
+    """
+    Appends quadratic terms of the scaled current and voltage (the first
+    two columns), so a linear model can follow the curvature of the OCV
+    relation.
+    """
+    current, voltage = X_scaled[:, 0], X_scaled[:, 1]
+    return np.column_stack((X_scaled, voltage * voltage, current * voltage))
+
+
+class IncrementalSoCRegressor:
+    """
+    Linear SoC regressor on expanded features, trained incrementally.
+
+    SGD weights are updated chunk by chunk through ``partial_fit``, so
+    memory stays bounded by the chunk size and an existing model can be
+    updated with new data instead of retrained on the full history. The
+    scaler is frozen once fitted, as re-fitting it later would change the
+    meaning of the weights already learned. It is fitted on the first
+    ``scaler_warmup`` samples, which are held back from training until
+    then, so that a first chunk of constant current does not leave it with
+    a degenerate unit scale; a pre-fitted scaler can be passed instead.
+    Like a ``FlatForest``, ``predict`` takes features scaled by the bundled
+    ``scaler``.
+    """
+
+    def __init__(self, batch_size=4096, alpha=1e-6, eta0=0.01, random_state=42, scaler_warmup=10_000,
+                 scaler=None):
+        """
+        Parameters:
+            batch_size (int): Samples per SGD mini-batch.
+            alpha (float): L2 regularization strength.
+            eta0 (float): Initial learning rate.
+            random_state (int): Seed of the SGD sample shuffling.
+            scaler_warmup (int): Samples collected to fit the scaler before
+                it is frozen and training starts.
+            scaler (StandardScaler, optional): Fitted scaler used as is,
+                skipping the warm-up.
+        """
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        self.batch_size = batch_size
+        self.scaler_warmup = scaler_warmup
+        self.scaler = StandardScaler() if scaler is None else scaler
+        self.scaler_frozen_ = scaler is not None
+        self.model = SGDRegressor(alpha=alpha, eta0=eta0, learning_rate='invscaling',
+                                  random_state=random_state)
+        self.n_samples_seen_ = 0
+        self.fit_seconds_ = 0.0
+        self._warmup = []
+
+    @property
+    def samples_per_second(self):
+        """
+        Training throughput over all partial_fit calls so far.
+        """
+        return self.n_samples_seen_ / self.fit_seconds_ if self.fit_seconds_ else 0.0
+
+    def partial_fit(self, X, y):
+        """
+        Updates the model with one chunk of samples. During the scaler
+        warm-up the chunk is only collected; the chunk that completes it
+        fits and freezes the scaler and trains on all collected samples.
+
+        Parameters:
+            X (array): Unscaled features, current and voltage first.
+            y (array): Training target (SoC).
+
+        Returns:
+            self (IncrementalSoCRegressor): The updated model.
+        """
+        start = time.perf_counter()
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not self.scaler_frozen_:
+            self._warmup.append((X, y))
+            if sum(len(chunk) for chunk, _ in self._warmup) < self.scaler_warmup:
+                self.fit_seconds_ += time.perf_counter() - start
+                return self
+            X, y = self._freeze_scaler()
+        self._train(X, y)
+        self.fit_seconds_ += time.perf_counter() - start
+        return self
+
+    def finish_warmup(self):
+        """
+        Fits and freezes the scaler on the samples collected so far and
+        trains on them, if the warm-up is still running. ``fit_stream``
+        calls it at the end, so a stream shorter than the warm-up still
+        yields a trained model.
+
+        Returns:
+            self (IncrementalSoCRegressor): The updated model.
+        """
+        if not self.scaler_frozen_ and self._warmup:
+            start = time.perf_counter()
+            self._train(*self._freeze_scaler())
+            self.fit_seconds_ += time.perf_counter() - start
+        return self
+
+    def _freeze_scaler(self):
+        X = np.concatenate([chunk for chunk, _ in self._warmup])
+        y = np.concatenate([target for _, target in self._warmup])
+        self._warmup = []
+        self.scaler.fit(X)
+        self.scaler_frozen_ = True
+        return X, y
+
+    def _train(self, X, y):
+        features = _expand_features(self.scaler.transform(X))
+        for begin in range(0, len(X), self.batch_size):
+            self.model.partial_fit(features[begin:begin + self.batch_size], y[begin:begin + self.batch_size])
+        self.n_samples_seen_ += len(X)
+
+    def fit_stream(self, chunks, features=('current', 'voltage'), target='soc_ground_truth',
+                   feature_extractor=None):
+        """
+        Trains on an iterable of DataFrame chunks, e.g. from
+        ``iter_battery_data`` or ``storage.iter_data``.
+
+        Parameters:
+            chunks (iterable): DataFrames with the feature and target columns.
+            features (sequence): Feature columns, current then voltage.
+            target (str): Target column.
+            feature_extractor (FeatureExtractor, optional): Streaming feature
+                stage applied to the current and voltage columns; the chunks
+                must then be consecutive parts of one trace.
+
+        Returns:
+            metrics (dict): 'samples', 'chunks', 'seconds' and
+                'samples_per_second' of this call.
+        """
+        samples, seconds = self.n_samples_seen_, self.fit_seconds_
+        n_chunks = 0
+        for chunk in chunks:
+            if feature_extractor is None:
+                X = chunk[list(features)].values
+            else:
+                X = feature_extractor.transform(chunk[features[0]].values, chunk[features[1]].values)
+            self.partial_fit(X, chunk[target].values)
+            n_chunks += 1
+        self.finish_warmup()
+        samples = self.n_samples_seen_ - samples
+        seconds = self.fit_seconds_ - seconds
+        return {
+            'samples': samples,
+            'chunks': n_chunks,
+            'seconds': seconds,
+            'samples_per_second': samples / seconds if seconds else 0.0,
+        }
+
+    def predict(self, X_scaled):
+        """
+        Predicts SoC from scaled features.
+
+        Parameters:
+            X_scaled (array): Features scaled by ``self.scaler``.
+
+        Returns:
+            soc (array): Predicted SoC (not clipped).
+        """
+        return self.model.predict(_expand_features(np.asarray(X_scaled)))
+
+
+def update_incremental_model(chunks, model_path, **params):
+    """
+    Loads an incremental model (or creates one), trains it on new chunks
+    and saves it back atomically.
+
+    Parameters:
+        chunks (iterable): DataFrames with current, voltage and soc_ground_truth columns.
+        model_path (str): joblib file of the model; created if missing.
+        **params: IncrementalSoCRegressor parameters for a new model.
+
+    Returns:
+        model (IncrementalSoCRegressor): The updated model.
+        metrics (dict): Training metrics, see ``IncrementalSoCRegressor.fit_stream``.
+    """
+    import joblib
+
+    model = joblib.load(model_path) if os.path.exists(model_path) else IncrementalSoCRegressor(**params)
+    metrics = model.fit_stream(chunks)
+    tmp_path = model_path + '.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, model_path)
+    print(f"Model updated with {metrics['samples']} samples "
+          f"({metrics['samples_per_second']:.0f} samples/s), saved to {model_path}")
+    return model, metrics
@@ -1,90 +1,318 @@
-import pandas as pd
-from data_acquisition import simulate_battery_data, save_simulated_data
-from coulomb_counting import coulomb_counting
-from kalman_filter import kalman_filter_estimation
-from machine_learning import train_ml_model, machine_learning_soc_estimation, load_ml_model
-from visualization import plot_soc
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+import argparse
 import logging
 import os
+import sys
+import numpy as np
+from instrumentation import Instrumentation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-MODEL_PATH = "trained_model.pkl"
+# Heavy dependencies (pandas, scikit-learn, scipy, joblib, matplotlib) are
+# imported inside the commands that use them, so a short Coulomb Counting
+# job on telemetry or NPZ input only loads NumPy.
 
-def main():
-    try:
-        # Step 1: Simulate Data
-        logging.info("Simulating battery data...")
-        data = simulate_battery_data()
-        save_simulated_data(data)
-        logging.info("Data simulation completed and saved as 'data/battery_data.csv'.")
-
-        # Step 2: Coulomb Counting
-        logging.info("Performing Coulomb Counting...")
-        soc_cc = coulomb_counting(
-            current=data['current'].values,
-            initial_soc=1.0,
-            battery_capacity=3600,
-            dt=1
-        )
-        logging.info("Coulomb Counting completed.")
-
-        # Step 3: Kalman Filter
-        logging.info("Performing Kalman Filter estimation...")
-        soc_kf = kalman_filter_estimation(
-            current=data['current'].values,
-            voltage=data['voltage'].values,
-            initial_soc=1.0,
-            battery_capacity=3600,
-            dt=1
-        )
-        logging.info("Kalman Filter estimation completed.")
-
-        # Step 4: Machine Learning
-        logging.info("Preparing data for Machine Learning...")
-        X = data[['current', 'voltage']].values
-        y = data['soc_ground_truth'].values
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-
-        logging.info("Scaling features...")
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-
-        if os.path.exists(MODEL_PATH):
-            logging.info(f"Loading trained model from {MODEL_PATH}...")
-            model = load_ml_model(MODEL_PATH)
+MODEL_CACHE_DIR = "model_cache"
+MODEL_CACHE_MAX_BYTES = 512 * 1024 ** 2
+# With the temporal features a small forest matches the accuracy of the
+# default 100 full-depth trees on (current, voltage) alone.
+ML_MODEL_PARAMS = {'n_estimators': 20, 'max_depth': 10}
+# Fixed so repeated runs simulate the same data and hit the model cache.
+SIMULATION_SEED = 0
+BATTERY_CAPACITY = 3600
+# Files receiving the per-stage metrics of a run (JSON report and
+# Prometheus text format); instrumentation is off unless one is set.
+METRICS_JSON = os.environ.get('SOC_METRICS_JSON')
+METRICS_PROMETHEUS = os.environ.get('SOC_METRICS_PROM')
+INSTRUMENTATION = Instrumentation(enabled=bool(METRICS_JSON or METRICS_PROMETHEUS))
+# Estimator subcommand -> stage name.
+ESTIMATORS = {'cc': 'coulomb_counting', 'kf': 'kalman_filter', 'ekf': 'battery_kalman_filter',
+              'ml': 'machine_learning'}
+# Cell model of the battery_kalman_filter stage on simulated data: the
+# simulation measures 4.2 V * SoC without resistance or polarization.
+SIMULATED_CELL_PARAMS = {'r0': 0.0, 'rc_pairs': (), 'ocv_soc': (0.0, 1.0), 'ocv': (0.0, 4.2)}
+
+def machine_learning_stage(current, voltage, soc_ground_truth, dt=1.0):
+    """
+    Fits the scaler and model, or reuses them from the model cache, and
+    predicts SoC.
+
+    Parameters:
+        current (array): Current data in Amperes.
+        voltage (array): Voltage data in Volts.
+        soc_ground_truth (array): Ground Truth SoC used for training.
+        dt (float): Time step of the temporal features in seconds.
+
+    Returns:
+        soc (array): Predicted SoC over time.
+    """
+    from sklearn.model_selection import train_test_split
+    from features import FeatureExtractor
+    from machine_learning import cached_ml_model, machine_learning_soc_estimation
+    from model_cache import ModelCache
+
+    logging.info("Computing temporal features...")
+    features = FeatureExtractor(dt=dt)
+    with INSTRUMENTATION.stage('ml_features', samples=len(current)):
+        X = features.transform(current, voltage)
+    X_train, _, y_train, _ = train_test_split(X, soc_ground_truth, test_size=0.2, shuffle=False)
+
+    logging.info(f"Looking up the model in {MODEL_CACHE_DIR}...")
+    with INSTRUMENTATION.stage('ml_model', samples=len(X_train)):
+        model, scaler = cached_ml_model(X_train, y_train, ModelCache(MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES),
+                                        feature_extractor=FeatureExtractor(dt=dt), **ML_MODEL_PARAMS)
+
+    logging.info("Predicting SoC using Machine Learning model...")
+    features.reset()
+    with INSTRUMENTATION.stage('ml_predict', samples=len(current)):
+        return machine_learning_soc_estimation(current=current, voltage=voltage, model=model, scaler=scaler,
+                                               feature_extractor=features)
+
+def cell_model(capacity, simulated=False):
+    """
+    Equivalent-circuit model for the battery_kalman_filter stage: the
+    default EquivalentCircuitModel, or one matching the simulated voltage.
+    """
+    from battery_model import EquivalentCircuitModel
+    return EquivalentCircuitModel(capacity=capacity, **(SIMULATED_CELL_PARAMS if simulated else {}))
+
+def write_metrics(instrumentation, json_path=None, prometheus_path=None):
+    """
+    Logs the per-stage metrics and writes them to the requested files.
+
+    Parameters:
+        instrumentation (Instrumentation): Metrics of the run.
+        json_path (str, optional): File receiving the JSON report.
+        prometheus_path (str, optional): File receiving the Prometheus text format.
+    """
+    if not instrumentation.enabled:
+        return
+    for name, total in instrumentation.summary().items():
+        rss = total['peak_rss_bytes']
+        logging.info(f"{name}: wall {total['wall_seconds']:.3f} s, cpu {total['cpu_seconds']:.3f} s, "
+                     f"peak RSS {rss / 1024 ** 2 if rss is not None else float('nan'):.0f} MiB, "
+                     f"samples {total['samples']}")
+    if json_path:
+        instrumentation.write_json(json_path)
+        logging.info(f"Metrics written to {json_path}")
+    if prometheus_path:
+        instrumentation.write_prometheus(prometheus_path)
+        logging.info(f"Prometheus metrics written to {prometheus_path}")
+
+def load_input(path=None):
+    """
+    Loads a trace as float64 arrays, or simulates one.
+
+    Telemetry (.tlm) and NPZ files are read with NumPy alone; other
+    formats go through ``storage`` and pandas.
+
+    Parameters:
+        path (str, optional): Telemetry or storage file with time, current
+            and voltage (and optionally soc_ground_truth); the seeded
+            simulation of ``run`` if None.
+
+    Returns:
+        arrays (dict): Column name -> array.
+    """
+    if path is None:
+        from data_acquisition import simulate_battery_data
+        data = simulate_battery_data(seed=SIMULATION_SEED)
+    elif path.endswith('.tlm'):
+        from telemetry import TelemetryReader
+        data = TelemetryReader(path).read()
+        return {column: np.array(data[column], dtype=np.float64) for column in ('time', 'current', 'voltage')}
+    elif path.endswith('.npz'):
+        with np.load(path) as data:
+            return {column: data[column].astype(np.float64) for column in data.files}
+    else:
+        from storage import load_data
+        data = load_data(path)
+    return {column: data[column].to_numpy(np.float64) for column in data.columns}
+
+def save_estimate(path, time, soc):
+    """
+    Writes an estimate: a bare SoC array for .npy files, otherwise time and
+    soc columns through ``storage``.
+    """
+    if path.endswith('.npy'):
+        np.save(path, soc)
+    else:
+        import pandas as pd
+        from storage import save_data
+        save_data(pd.DataFrame({'time': time, 'soc': soc}), path, float_dtype=None)
+    logging.info(f"Estimate written to {path}")
+
+def estimate(args):
+    """
+    Runs one estimator over a trace (the cc, kf, ekf and ml subcommands).
+    """
+    with INSTRUMENTATION.stage('load_data') as stage:
+        arrays = load_input(args.data)
+        stage.samples = len(arrays['current'])
+    current, voltage = arrays['current'], arrays['voltage']
+    time = arrays.get('time', np.arange(len(current), dtype=np.float64))
+    # Without an explicit time step, dt[k-1] is the interval between samples k-1 and k.
+    dt = args.dt if args.dt is not None or len(time) < 2 else np.diff(time)
+    name = ESTIMATORS[args.command]
+
+    with INSTRUMENTATION.stage(name, samples=len(current)):
+        if args.command == 'cc':
+            from coulomb_counting import coulomb_counting
+            soc = coulomb_counting(current, args.initial_soc, args.capacity, dt)
+        elif args.command == 'kf':
+            from kalman_filter import kalman_filter_estimation
+            soc = kalman_filter_estimation(current, voltage, args.initial_soc, args.capacity, dt,
+                                           steady_state=args.steady_state)
+        elif args.command == 'ekf':
+            from battery_kalman_filter import battery_kalman_estimation
+            soc = battery_kalman_estimation(current, voltage, args.initial_soc, args.capacity, dt,
+                                            cell_model=cell_model(args.capacity, simulated=args.data is None),
+                                            method=args.method, estimate_capacity=args.estimate_capacity)
+        elif args.model is not None:
+            from inference_server import load_inference_model
+            from machine_learning import machine_learning_soc_estimation
+            model, scaler, feature_extractor = load_inference_model(args.model)
+            soc = machine_learning_soc_estimation(current, voltage, model, scaler, feature_extractor)
+        elif 'soc_ground_truth' in arrays:
+            # The temporal features take one time step: --dt, or else the
+            # median interval of the time stamps.
+            feature_dt = 1.0 if dt is None else float(np.median(dt))
+            soc = machine_learning_stage(current, voltage, arrays['soc_ground_truth'], feature_dt)
         else:
-            logging.info("Training new Machine Learning model...")
-            model = train_ml_model(X_train_scaled, y_train, MODEL_PATH)
-            logging.info(f"Model trained and saved to {MODEL_PATH}.")
-
-        logging.info("Predicting SoC using Machine Learning model...")
-        soc_ml = machine_learning_soc_estimation(
-            current=data['current'].values,
-            voltage=data['voltage'].values,
-            model=model,
-            scaler=scaler
-        )
-        logging.info("Machine Learning prediction completed.")
+            raise ValueError("The ml command needs --model or data with a soc_ground_truth column to train on")
+
+    message = f"{name}: {len(soc)} samples, final SoC {soc[-1]:.4f}" if len(soc) else f"{name}: no samples"
+    if 'soc_ground_truth' in arrays and len(soc):
+        message += f", RMSE {np.sqrt(np.mean((soc - arrays['soc_ground_truth']) ** 2)):.4f}"
+    logging.info(message)
+    if args.output:
+        save_estimate(args.output, time, soc)
+    return soc
+
+def run(args):
+    """
+    Simulates data, runs all estimators and plots them (the run subcommand).
+    """
+    from data_acquisition import simulate_battery_data, save_simulated_data
+    from battery_kalman_filter import battery_kalman_estimation
+    from coulomb_counting import coulomb_counting
+    from kalman_filter import kalman_filter_estimation
+    from pipeline import Stage, run_pipeline
+    from visualization import plot_soc
 
-        # Step 5: Visualization
-        logging.info("Generating plots for SoC estimation...")
+    # Step 1: Simulate Data
+    logging.info("Simulating battery data...")
+    with INSTRUMENTATION.stage('simulation') as stage:
+        data = simulate_battery_data(seed=SIMULATION_SEED)
+        stage.samples = len(data)
+    with INSTRUMENTATION.stage('save_data', samples=len(data)):
+        save_simulated_data(data)
+    logging.info("Data simulation completed and saved as 'data/battery_data.csv'.")
+
+    # Steps 2-4: Coulomb Counting, the Kalman Filters and Machine Learning
+    # are independent, so they run concurrently. The ML stage stays in a
+    # thread since scikit-learn releases the GIL and the model is large.
+    logging.info("Running Coulomb Counting, Kalman Filter, EKF and Machine Learning estimation...")
+    stages = [
+        Stage('coulomb_counting', coulomb_counting, ['current'],
+              dict(initial_soc=1.0, battery_capacity=BATTERY_CAPACITY, dt=1)),
+        Stage('kalman_filter', kalman_filter_estimation, ['current', 'voltage'],
+              dict(initial_soc=1.0, battery_capacity=BATTERY_CAPACITY, dt=1)),
+        Stage('battery_kalman_filter', battery_kalman_estimation, ['current', 'voltage'],
+              dict(initial_soc=1.0, battery_capacity=BATTERY_CAPACITY, dt=1,
+                   cell_model=cell_model(BATTERY_CAPACITY, simulated=True))),
+        Stage('machine_learning', machine_learning_stage,
+              ['current', 'voltage', 'soc_ground_truth'], dict(dt=1), executor='thread'),
+    ]
+    arrays = {column: data[column].values for column in ('current', 'voltage', 'soc_ground_truth')}
+    results, timings = run_pipeline(arrays, stages, instrumentation=INSTRUMENTATION)
+    for name, seconds in timings.items():
+        logging.info(f"Stage {name}: {seconds:.3f} s")
+
+    # Step 5: Visualization
+    logging.info("Generating plots for SoC estimation...")
+    with INSTRUMENTATION.stage('visualization', samples=len(data)):
         plot_soc(
             time=data['time'].values,
-            soc_cc=soc_cc,
-            soc_kf=soc_kf,
-            soc_ml=soc_ml,
-            soc_gt=data['soc_ground_truth'].values
+            soc_cc=results['coulomb_counting'],
+            soc_kf=results['kalman_filter'],
+            soc_ekf=results['battery_kalman_filter'],
+            soc_ml=results['machine_learning'],
+            soc_gt=data['soc_ground_truth'].values,
+            output_path=args.plot
         )
-        logging.info("Plots generated successfully. Program completed.")
+    logging.info("Plots generated successfully. Program completed.")
+    return results
+
+def parse_args(argv=None):
+    """
+    Parses the command line; without a subcommand ``run`` is assumed.
 
+    Returns:
+        args (Namespace): Parsed arguments.
+        extra (list): Arguments passed on to ``model_search`` by ``train``.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv:
+        argv = ['run']
+    parser = argparse.ArgumentParser(description="Battery State of Charge estimation.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--metrics-json', default=METRICS_JSON,
+                        help="JSON file receiving per-stage metrics (default: $SOC_METRICS_JSON)")
+    common.add_argument('--metrics-prom', default=METRICS_PROMETHEUS,
+                        help="Prometheus text file receiving per-stage metrics (default: $SOC_METRICS_PROM)")
+
+    run_parser = commands.add_parser('run', parents=[common],
+                                     help="Simulate data, run all estimators and plot them (default)")
+    run_parser.add_argument('--plot', default=None, help="Image file (.png, .svg) for the plot (default: show it)")
+
+    estimator = argparse.ArgumentParser(add_help=False, parents=[common])
+    estimator.add_argument('--data', default=None,
+                           help="Telemetry (.tlm) or storage file with time, current and voltage "
+                                "(default: the simulated trace of run)")
+    estimator.add_argument('-o', '--output', default=None, help="File receiving the estimate (.npy or a storage format)")
+    estimator.add_argument('--initial-soc', type=float, default=1.0, help="Initial SoC (0 to 1)")
+    estimator.add_argument('--capacity', type=float, default=BATTERY_CAPACITY, help="Battery capacity in Coulombs")
+    estimator.add_argument('--dt', type=float, default=None, help="Time step in seconds (default: from time stamps)")
+    commands.add_parser('cc', parents=[estimator], help="Coulomb Counting")
+    kf_parser = commands.add_parser('kf', parents=[estimator], help="Kalman Filter")
+    kf_parser.add_argument('--steady-state', action='store_true', help="Use the steady-state Kalman gain")
+    ekf_parser = commands.add_parser('ekf', parents=[estimator],
+                                     help="Extended/Unscented Kalman Filter on an equivalent-circuit model")
+    ekf_parser.add_argument('--method', choices=('ekf', 'ukf'), default='ekf', help="Filter type")
+    ekf_parser.add_argument('--estimate-capacity', action='store_true',
+                            help="Also estimate the capacity, starting from --capacity")
+    ml_parser = commands.add_parser('ml', parents=[estimator], help="Machine Learning model")
+    ml_parser.add_argument('--model', default=None,
+                           help="Flattened forest (.forest) or joblib model bundle (default: train on the "
+                                "data's soc_ground_truth through the model cache)")
+    commands.add_parser('train', add_help=False,
+                        help="Search hyperparameters and train a model; arguments go to model_search.py")
+
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != 'train':
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args, extra
+
+def main(argv=None):
+    args, extra = parse_args(argv)
+    if args.command == 'train':
+        from model_search import main as model_search_main
+        return model_search_main(extra)
+
+    INSTRUMENTATION.enabled = bool(args.metrics_json or args.metrics_prom)
+    try:
+        if args.command == 'run':
+            run(args)
+        else:
+            estimate(args)
+        write_metrics(INSTRUMENTATION, args.metrics_json, args.metrics_prom)
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         raise
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
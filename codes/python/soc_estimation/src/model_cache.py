@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+# Bump when the layout of the cached files changes, so old entries miss.
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def fingerprint(*arrays, **params):
+    """
+    Content hash of training data and the settings that shape the model.
+
+    Parameters:
+        *arrays (array): Training arrays; shape and dtype are hashed as well.
+        **params: JSON-serializable hyperparameters, library versions, etc.
+
+    Returns:
+        key (str): Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'version': CACHE_VERSION, 'params': params},
+                             sort_keys=True, default=str).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    On-disk cache of fitted models keyed by ``fingerprint``.
+
+    An entry is the set of files named ``<key>.<extension>`` in the cache
+    directory, e.g. a joblib bundle of model and scaler plus a flattened
+    copy. Reading an entry refreshes its modification time and writing one
+    evicts the least recently used entries until the directory fits in
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Parameters:
+            directory (str): Cache directory, created if missing.
+            max_bytes (int): Size cap of all entries together.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, extension):
+        """
+        Path of one file of an entry.
+        """
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, extension):
+        """
+        Looks up a cached file and marks its entry as recently used.
+
+        Parameters:
+            key (str): Entry key.
+            extension (str): File extension within the entry.
+
+        Returns:
+            path (str or None): Path of the file, or None on a miss.
+        """
+        path = self.path(key, extension)
+        if not os.path.exists(path):
+            return None
+        for entry_path in self._entry_files(key):
+            os.utime(entry_path)
+        return path
+
+    def put(self, key, extension, write):
+        """
+        Adds a file to an entry atomically, then enforces the size cap.
+
+        Parameters:
+            key (str): Entry key.
+            extension (str): File extension within the entry.
+            write (callable): Called with a temporary path to write the file to.
+
+        Returns:
+            path (str): Path of the cached file.
+        """
+        path = self.path(key, extension)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        for entry_path in self._entry_files(key):
+            os.utime(entry_path)
+        self.evict(keep=key)
+        return path
+
+    def _entry_files(self, key):
+        prefix = key + '.'
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.startswith(prefix) and not name.endswith('.tmp')]
+
+    def entries(self):
+        """
+        Lists the cached entries, most recently used first.
+
+        Returns:
+            entries (list): (key, last use time, size in bytes) tuples.
+        """
+        usage = {}
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            key = name.split('.', 1)[0]
+            last_used, size = usage.get(key, (0.0, 0))
+            usage[key] = (max(last_used, stat.st_mtime), size + stat.st_size)
+        return sorted(((key, t, size) for key, (t, size) in usage.items()),
+                      key=lambda entry: entry[1], reverse=True)
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+
+        Parameters:
+            keep (str, optional): Key that is never evicted, e.g. the entry
+                just written even if it alone exceeds the cap.
+
+        Returns:
+            evicted (list): Keys of the removed entries.
+        """
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for key, _, size in reversed(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._entry_files(key):
+                os.remove(path)
+            total -= size
+            evicted.append(key)
+        return evicted
@@ -0,0 +1,265 @@
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+from features import FeatureExtractor
+from storage import load_data
+
+# Model family -> (estimator class, fixed parameters, grid of searched parameters).
+SEARCH_SPACE = {
+    'random_forest': (RandomForestRegressor, {'random_state': 42, 'n_jobs': 1},
+                      {'n_estimators': [10, 30, 100], 'max_depth': [6, 10, None]}),
+    'extra_trees': (ExtraTreesRegressor, {'random_state': 42, 'n_jobs': 1},
+                    {'n_estimators': [10, 30, 100], 'max_depth': [6, 10, None]}),
+    'gradient_boosting': (HistGradientBoostingRegressor, {'random_state': 42},
+                          {'max_iter': [50, 200], 'max_depth': [3, 6, None]}),
+    'ridge': (Ridge, {}, {'alpha': [0.1, 1.0, 10.0]}),
+}
+# Single-sample predictions timed per candidate; the median is reported.
+_LATENCY_REPEATS = 25
+
+# Training data of the current worker process, set once by _init_worker.
+_DATA = {}
+
+
+def candidates(families=None, seed=0):
+    """
+    Lists the (family, params) combinations of SEARCH_SPACE in random order,
+    so a search cut short by its time budget still covers every family.
+
+    Parameters:
+        families (sequence, optional): Families to include; all if None.
+        seed (int): Seed of the order.
+
+    Returns:
+        candidates (list): (family, params) tuples.
+    """
+    families = list(SEARCH_SPACE) if families is None else list(families)
+    unknown = set(families) - set(SEARCH_SPACE)
+    if unknown:
+        raise ValueError(f"Unknown model families {sorted(unknown)}, expected some of {list(SEARCH_SPACE)}")
+    combos = []
+    for family in families:
+        grid = SEARCH_SPACE[family][2]
+        for values in itertools.product(*grid.values()):
+            combos.append((family, dict(zip(grid, values))))
+    order = np.random.default_rng(seed).permutation(len(combos))
+    return [combos[i] for i in order]
+
+
+def make_model(family, params):
+    """
+    Instantiates an estimator of SEARCH_SPACE.
+    """
+    estimator, fixed, _ = SEARCH_SPACE[family]
+    return estimator(**{**fixed, **params})
+
+
+def _init_worker(X, y):
+    _DATA['X'] = X
+    _DATA['y'] = y
+
+
+def _single_sample_latency(model, scaler, x):
+    timings = []
+    for _ in range(_LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict(scaler.transform(x))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def evaluate_candidate(family, params, n_splits, deadline):
+    """
+    Time-series cross-validation of one candidate.
+
+    Every fold trains on the samples before its test range only. Folds
+    stop early once ``deadline`` has passed, as long as one fold is done.
+
+    Parameters:
+        family (str): Model family.
+        params (dict): Searched parameters.
+        n_splits (int): TimeSeriesSplit folds.
+        deadline (float): time.time() after which no new fold starts.
+
+    Returns:
+        result (dict): Scores, latencies and timings of the candidate.
+    """
+    X, y = _DATA['X'], _DATA['y']
+    errors = []
+    fit_seconds = 0.0
+    batch_latency = []
+    single_latency = []
+    for train, test in TimeSeriesSplit(n_splits=n_splits).split(X):
+        if errors and time.time() > deadline:
+            break
+        scaler = StandardScaler().fit(X[train])
+        model = make_model(family, params)
+        start = time.perf_counter()
+        model.fit(scaler.transform(X[train]), y[train])
+        fit_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        prediction = np.clip(model.predict(scaler.transform(X[test])), 0, 1)
+        batch_latency.append((time.perf_counter() - start) / len(test))
+        errors.append(np.sqrt(np.mean((prediction - y[test]) ** 2)))
+        single_latency.append(_single_sample_latency(model, scaler, X[test[:1]]))
+    return {
+        'family': family,
+        'params': params,
+        'rmse': float(np.mean(errors)),
+        'rmse_std': float(np.std(errors)),
+        'latency_us': 1e6 * float(np.median(single_latency)),
+        'batch_latency_us': 1e6 * float(np.mean(batch_latency)),
+        'fit_seconds': fit_seconds,
+        'folds': len(errors),
+    }
+
+
+def search(X, y, time_budget=300.0, workers=None, n_splits=5, families=None, seed=0):
+    """
+    Parallel time-series-aware hyperparameter search over SEARCH_SPACE.
+
+    Candidates are evaluated on a process pool; each worker receives the
+    data once. No new candidate starts after ``time_budget`` seconds and
+    running ones stop after their current fold.
+
+    Parameters:
+        X (array): Features in time order.
+        y (array): Target (SoC).
+        time_budget (float): Seconds after which the search winds down.
+        workers (int, optional): Worker processes; os.cpu_count() if None.
+        n_splits (int): TimeSeriesSplit folds.
+        families (sequence, optional): Model families to search; all if None.
+        seed (int): Seed of the candidate order.
+
+    Returns:
+        leaderboard (DataFrame): One row per evaluated candidate, best RMSE
+            first and faster models first among equal RMSE.
+    """
+    deadline = time.time() + time_budget
+    queue = candidates(families, seed)
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        running = set()
+        while queue or running:
+            # Keep at most one candidate per worker in flight, so stopping
+            # at the deadline does not leave a backlog to cancel.
+            while queue and len(running) < workers and time.time() < deadline:
+                family, params = queue.pop(0)
+                running.add(pool.submit(evaluate_candidate, family, params, n_splits, deadline))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                logging.info(f"{result['family']} {result['params']}: RMSE {result['rmse']:.4f}, "
+                             f"{result['latency_us']:.0f} us/sample")
+                results.append(result)
+    if queue:
+        logging.info(f"Time budget reached, {len(queue)} candidates not evaluated.")
+    leaderboard = pd.DataFrame(results, columns=['family', 'params', 'rmse', 'rmse_std', 'latency_us',
+                                                 'batch_latency_us', 'fit_seconds', 'folds'])
+    return leaderboard.sort_values(['rmse', 'latency_us'], ignore_index=True)
+
+
+def pick_model(leaderboard, max_latency_us=None):
+    """
+    Best candidate by RMSE within an inference latency budget.
+
+    Parameters:
+        leaderboard (DataFrame): Output of ``search``.
+        max_latency_us (float, optional): Largest single-sample latency in
+            microseconds; no limit if None.
+
+    Returns:
+        row (Series): The chosen leaderboard row.
+    """
+    eligible = leaderboard if max_latency_us is None else leaderboard[leaderboard['latency_us'] <= max_latency_us]
+    if eligible.empty:
+        raise ValueError(f"No candidate predicts within {max_latency_us} us per sample")
+    return eligible.iloc[0]
+
+
+def train_best(X, y, leaderboard, max_latency_us=None, feature_extractor=None, model_path=None):
+    """
+    Retrains the chosen candidate on all data.
+
+    Parameters:
+        X (array): Features in time order.
+        y (array): Target (SoC).
+        leaderboard (DataFrame): Output of ``search``.
+        max_latency_us (float, optional): Single-sample latency budget in microseconds.
+        feature_extractor (FeatureExtractor, optional): Feature stage that produced X.
+        model_path (str, optional): joblib file receiving a dict of 'model',
+            'scaler' and 'feature_extractor', as read by ``fleet``.
+
+    Returns:
+        model: Trained estimator.
+        scaler (StandardScaler): Scaler fitted on X.
+    """
+    best = pick_model(leaderboard, max_latency_us)
+    scaler = StandardScaler().fit(X)
+    model = make_model(best['family'], best['params']).fit(scaler.transform(X), y)
+    if model_path:
+        joblib.dump({'model': model, 'scaler': scaler, 'feature_extractor': feature_extractor}, model_path)
+        print(f"Model saved to {model_path}")
+    return model, scaler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search SoC regressor hyperparameters and train the best model.")
+    parser.add_argument('--data', default="../data/battery_data.csv",
+                        help="Training data with time, current, voltage and soc_ground_truth columns")
+    parser.add_argument('--time-budget', type=float, default=300.0, help="Search time budget in seconds")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--splits', type=int, default=5, help="Time-series cross-validation folds")
+    parser.add_argument('--families', nargs='+', choices=list(SEARCH_SPACE), default=None,
+                        help="Model families to search (default: all)")
+    parser.add_argument('--raw-features', action='store_true',
+                        help="Train on (current, voltage) only instead of the temporal features")
+    parser.add_argument('--dt', type=float, default=1.0, help="Time step of the data in seconds")
+    parser.add_argument('--max-latency-us', type=float, default=None,
+                        help="Single-sample inference budget used to pick the model")
+    parser.add_argument('--leaderboard', default=None, help="CSV file receiving the leaderboard")
+    parser.add_argument('--model-out', default=None, help="joblib file receiving the chosen model")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    data = load_data(args.data, columns=['current', 'voltage', 'soc_ground_truth'])
+    current = data['current'].values
+    voltage = data['voltage'].values
+    if args.raw_features:
+        feature_extractor = None
+        X = np.column_stack((current, voltage))
+    else:
+        feature_extractor = FeatureExtractor(dt=args.dt)
+        X = feature_extractor.transform(current, voltage)
+        feature_extractor.reset()
+    y = data['soc_ground_truth'].values
+
+    leaderboard = search(X, y, args.time_budget, args.workers, args.splits, args.families)
+    print(leaderboard.to_string())
+    if args.leaderboard:
+        leaderboard.to_csv(args.leaderboard, index=False)
+    if args.model_out:
+        train_best(X, y, leaderboard, args.max_latency_us, feature_extractor, args.model_out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def sigma_weights(n, alpha=1e-3, beta=2.0, kappa=0.0):
+    """
+    Weights of Van der Merwe's scaled sigma points, computed once per
+    parameter set.
+
+    Parameters:
+        n (int): State dimension.
+        alpha (float): Spread of the sigma points around the mean.
+        beta (float): Prior knowledge of the distribution (2 is optimal for Gaussians).
+        kappa (float): Secondary scaling parameter.
+
+    Returns:
+        lambda_ (float): Scaling parameter.
+        Wm (array): Mean weights, shape (2n + 1,), read-only.
+        Wc (array): Covariance weights, shape (2n + 1,), read-only.
+    """
+    lambda_ = alpha ** 2 * (n + kappa) - n
+    Wc = np.full(2 * n + 1, 0.5 / (n + lambda_))
+    Wm = Wc.copy()
+    Wm[0] = lambda_ / (n + lambda_)
+    Wc[0] = lambda_ / (n + lambda_) + (1.0 - alpha ** 2 + beta)
+    Wm.flags.writeable = False
+    Wc.flags.writeable = False
+    return lambda_, Wm, Wc
+
+
+def sigma_points(x, P, lambda_):
+    """
+    Van der Merwe's scaled sigma points of a Gaussian, in FilterPy's order.
+
+    Parameters:
+        x (array): Mean, shape (n,).
+        P (array): Covariance, shape (n, n).
+        lambda_ (float): Scaling parameter from ``sigma_weights``.
+
+    Returns:
+        sigmas (array): Sigma points as rows, shape (2n + 1, n).
+    """
+    n = len(x)
+    # Columns of the lower Cholesky factor are the rows of FilterPy's upper one.
+    offsets = np.linalg.cholesky((n + lambda_) * P).T
+    sigmas = np.empty((2 * n + 1, n))
+    sigmas[0] = x
+    sigmas[1:n + 1] = x + offsets
+    sigmas[n + 1:] = x - offsets
+    return sigmas
+
+
+class NonlinearKalmanFilter(ABC):
+    """
+    Common interface of the extended and unscented Kalman filters.
+
+    The motion model ``fx(states, dt[, u])`` and the measurement model
+    ``hx(states[, u])`` are vectorized: they take states as rows of an
+    (m, n) array and return one row per state, (m, n) and (m, dim_z)
+    respectively. The UKF evaluates them on all sigma points in one call,
+    the EKF on a single row. ``u`` is an optional per-step input such as
+    the cell current, passed to both models when given.
+    """
+
+    def __init__(self, x, P, Q, R, fx, hx):
+        """
+        Parameters:
+            x (array): Initial state, shape (n,).
+            P (array): Initial state covariance, shape (n, n).
+            Q (array): Process noise covariance, shape (n, n).
+            R (array): Measurement noise covariance, shape (dim_z, dim_z).
+            fx (callable): Vectorized motion model.
+            hx (callable): Vectorized measurement model.
+        """
+        self.x = np.array(x, dtype=np.float64)
+        self.P = np.array(P, dtype=np.float64)
+        self.Q = np.array(Q, dtype=np.float64)
+        self.R = np.atleast_2d(np.array(R, dtype=np.float64))
+        self.fx = fx
+        self.hx = hx
+
+    @staticmethod
+    def _args(u):
+        return () if u is None else (u,)
+
+    @abstractmethod
+    def predict(self, dt=1.0, u=None):
+        """
+        Propagates the state and covariance over one time step.
+        """
+
+    @abstractmethod
+    def update(self, z, u=None):
+        """
+        Corrects the state and covariance with one measurement.
+        """
+
+    def run(self, measurements, dt=1.0, inputs=None):
+        """
+        Filters a whole sequence: predict, then update, at every step.
+
+        Parameters:
+            measurements (array): Measurements, shape (N, dim_z) or (N,) for dim_z = 1.
+            dt (float or array): Time step, scalar or one per step.
+            inputs (array, optional): Per-step input ``u`` of the models.
+
+        Returns:
+            states (array): Posterior states, shape (N, n).
+            covariances (array): Posterior covariances, shape (N, n, n).
+        """
+        measurements = np.asarray(measurements, dtype=np.float64)
+        n_steps = len(measurements)
+        dts = np.broadcast_to(np.asarray(dt, dtype=np.float64), (n_steps,))
+        states = np.empty((n_steps, len(self.x)))
+        covariances = np.empty((n_steps,) + self.P.shape)
+        for k in range(n_steps):
+            u = None if inputs is None else inputs[k]
+            self.predict(dts[k], u)
+            self.update(measurements[k], u)
+            states[k] = self.x
+            covariances[k] = self.P
+        return states, covariances
+
+
+class ExtendedKalmanFilter(NonlinearKalmanFilter):
+    """
+    Extended Kalman filter with analytic Jacobians.
+
+    The state is propagated through the nonlinear models; the Jacobians
+    ``F_jacobian(x, dt[, u])`` and ``H_jacobian(x[, u])`` of a single
+    state propagate the covariance. The update uses the Joseph form, like
+    FilterPy.
+    """
+
+    def __init__(self, x, P, Q, R, fx, hx, F_jacobian, H_jacobian):
+        """
+        Parameters:
+            x, P, Q, R, fx, hx: See ``NonlinearKalmanFilter``.
+            F_jacobian (callable): Jacobian of fx at one state, shape (n, n).
+            H_jacobian (callable): Jacobian of hx at one state, shape (dim_z, n).
+        """
+        super().__init__(x, P, Q, R, fx, hx)
+        self.F_jacobian = F_jacobian
+        self.H_jacobian = H_jacobian
+
+    def predict(self, dt=1.0, u=None):
+        args = self._args(u)
+        F = self.F_jacobian(self.x, dt, *args)
+        self.x = self.fx(self.x[None], dt, *args)[0]
+        self.P = F @ self.P @ F.T + self.Q
+
+    def update(self, z, u=None):
+        args = self._args(u)
+        H = np.atleast_2d(self.H_jacobian(self.x, *args))
+        y = np.atleast_1d(z) - self.hx(self.x[None], *args)[0]
+        PHT = self.P @ H.T
+        S = H @ PHT + self.R
+        K = np.linalg.solve(S.T, PHT.T).T
+        self.x = self.x + K @ y
+        I_KH = np.eye(len(self.x)) - K @ H
+        self.P = I_KH @ self.P @ I_KH.T + K @ self.R @ K.T
+
+
+class UnscentedKalmanFilter(NonlinearKalmanFilter):
+    """
+    Unscented Kalman filter with Van der Merwe's scaled sigma points.
+
+    All 2n + 1 sigma points go through the models as one (2n + 1, n)
+    array, and the weights come from the ``sigma_weights`` cache. Same
+    equations as FilterPy's UnscentedKalmanFilter with plain subtraction
+    as residual.
+    """
+
+    def __init__(self, x, P, Q, R, fx, hx, alpha=1e-3, beta=2.0, kappa=0.0):
+        """
+        Parameters:
+            x, P, Q, R, fx, hx: See ``NonlinearKalmanFilter``.
+            alpha, beta, kappa (float): Sigma point parameters, see ``sigma_weights``.
+        """
+        super().__init__(x, P, Q, R, fx, hx)
+        self.lambda_, self.Wm, self.Wc = sigma_weights(len(self.x), alpha, beta, kappa)
+        self.sigmas_f = None
+
+    def predict(self, dt=1.0, u=None):
+        sigmas = sigma_points(self.x, self.P, self.lambda_)
+        self.sigmas_f = self.fx(sigmas, dt, *self._args(u))
+        self.x = self.Wm @ self.sigmas_f
+        d = self.sigmas_f - self.x
+        self.P = (d.T * self.Wc) @ d + self.Q
+
+    def update(self, z, u=None):
+        sigmas_h = np.asarray(self.hx(self.sigmas_f, *self._args(u))).reshape(len(self.sigmas_f), -1)
+        zp = self.Wm @ sigmas_h
+        dz = sigmas_h - zp
+        S = (dz.T * self.Wc) @ dz + self.R
+        Pxz = ((self.sigmas_f - self.x).T * self.Wc) @ dz
+        K = np.linalg.solve(S.T, Pxz.T).T
+        self.x = self.x + K @ (np.atleast_1d(z) - zp)
+        self.P = self.P - K @ S @ K.T
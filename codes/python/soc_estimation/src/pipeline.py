@@ -0,0 +1,158 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from instrumentation import Measurement
+
+EXECUTORS = ('process', 'thread')
+
+
+class Stage:
+    """
+    One independent step of the estimation pipeline.
+
+    CPU-bound stages holding the GIL (e.g. the scalar Kalman recursion) run
+    in a worker process; stages that mostly wait on NumPy or scikit-learn
+    code releasing the GIL, or whose arguments are expensive to pickle such
+    as a trained model, can run in a thread of the calling process instead.
+    """
+
+    def __init__(self, name, func, inputs, kwargs=None, executor='process'):
+        """
+        Parameters:
+            name (str): Stage name, used as key of the results and timings.
+            func (callable): Module-level function computing the stage.
+            inputs (sequence): Names of the shared arrays passed to func as
+                keyword arguments of the same name.
+            kwargs (dict, optional): Additional keyword arguments for func.
+            executor (str): 'process' or 'thread'.
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTORS}")
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.kwargs = dict(kwargs or {})
+        self.executor = executor
+
+
+def _share(arrays):
+    """
+    Copies arrays into shared memory blocks.
+
+    Returns:
+        blocks (list): The SharedMemory blocks; the caller must unlink them.
+        descriptors (dict): name -> (block name, shape, dtype) for the workers.
+    """
+    blocks = []
+    descriptors = {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            descriptors[name] = (block.name, array.shape, array.dtype.str)
+    except BaseException:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        raise
+    return blocks, descriptors
+
+
+def _measured_call(name, func, arrays, kwargs):
+    with Measurement(name) as measurement:
+        result = func(**arrays, **kwargs)
+        if hasattr(result, '__len__'):
+            measurement.samples = len(result)
+    return result, measurement.metrics
+
+
+def _run_shared_stage(name, func, descriptors, inputs, kwargs):
+    """
+    Worker side of a process stage: attaches to the shared inputs by name,
+    so the arrays themselves never go through pickle.
+
+    Returns:
+        result: Output of func.
+        metrics (dict): Metrics of the stage measured in the worker, see
+            ``instrumentation.Measurement``.
+    """
+    blocks = [shared_memory.SharedMemory(name=descriptors[name][0]) for name in inputs]
+    try:
+        arrays = {
+            name: np.ndarray(descriptors[name][1], dtype=descriptors[name][2], buffer=block.buf)
+            for name, block in zip(inputs, blocks)
+        }
+        result, metrics = _measured_call(name, func, arrays, kwargs)
+        # The result is sent back after the blocks are closed, so it must
+        # not be a view of them.
+        if isinstance(result, np.ndarray) and any(np.shares_memory(result, a) for a in arrays.values()):
+            result = result.copy()
+        del arrays
+    finally:
+        for block in blocks:
+            block.close()
+    return result, metrics
+
+
+def run_pipeline(arrays, stages, max_workers=None, instrumentation=None):
+    """
+    Runs independent stages concurrently on the same input arrays.
+
+    Inputs of process stages are placed in shared memory once; thread
+    stages use the arrays directly. The total wall time therefore
+    approaches that of the slowest stage rather than the sum of all.
+
+    Parameters:
+        arrays (dict): Input arrays by name.
+        stages (list): Stage objects; their inputs must be keys of arrays.
+        max_workers (int, optional): Worker processes; one per process stage if None.
+        instrumentation (Instrumentation, optional): Receives the metrics
+            of every stage, measured in the process that ran it.
+
+    Returns:
+        results (dict): Output of each stage by stage name.
+        timings (dict): Wall time in seconds of each stage by stage name,
+            plus 'total' for the whole pipeline.
+    """
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Stage names must be unique, got {names}")
+    for stage in stages:
+        missing = set(stage.inputs) - set(arrays)
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' needs missing inputs {sorted(missing)}")
+
+    start = time.perf_counter()
+    process_stages = [stage for stage in stages if stage.executor == 'process']
+    thread_stages = [stage for stage in stages if stage.executor == 'thread']
+    shared = {name for stage in process_stages for name in stage.inputs}
+    blocks, descriptors = _share({name: arrays[name] for name in shared})
+    futures = {}
+    try:
+        with ProcessPoolExecutor(max_workers or max(1, len(process_stages))) as processes, \
+                ThreadPoolExecutor(max(1, len(thread_stages))) as threads:
+            for stage in process_stages:
+                futures[stage.name] = processes.submit(
+                    _run_shared_stage, stage.name, stage.func, descriptors, stage.inputs, stage.kwargs
+                )
+            for stage in thread_stages:
+                futures[stage.name] = threads.submit(
+                    _measured_call, stage.name, stage.func, {name: arrays[name] for name in stage.inputs},
+                    stage.kwargs
+                )
+            outcomes = {name: future.result() for name, future in futures.items()}
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results = {name: outcomes[name][0] for name in names}
+    timings = {name: outcomes[name][1]['wall_seconds'] for name in names}
+    timings['total'] = time.perf_counter() - start
+    if instrumentation is not None:
+        for name in names:
+            instrumentation.add(outcomes[name][1])
+    return results, timings
@@ -0,0 +1,214 @@
+import os
+import numpy as np
+import pandas as pd
+
+FORMATS = ('csv', 'parquet', 'feather', 'npz')
+TIME_COLUMN = 'time'
+
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+    '.npz': 'npz',
+}
+
+
+def detect_format(path):
+    """
+    Determines the storage format from the file extension.
+
+    Parameters:
+        path (str): File path.
+
+    Returns:
+        format (str): One of FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f"Cannot infer storage format from '{path}', expected one of {sorted(_EXTENSIONS)}")
+    return _EXTENSIONS[extension]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet and Feather storage require pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _chunks(data):
+    return [data] if isinstance(data, pd.DataFrame) else data
+
+
+def _cast_floats(chunk, float_dtype):
+    if float_dtype is None:
+        return chunk
+    # Time stays float64: float32 loses resolution on long or absolute time stamps.
+    floats = [column for column in chunk.select_dtypes(include='floating').columns if column != TIME_COLUMN]
+    return chunk.astype({column: float_dtype for column in floats})
+
+
+def save_data(data, path, format=None, float_dtype=np.float32, compression=None):
+    """
+    Saves battery data in a row-oriented (CSV) or columnar format.
+
+    Parquet, Feather and CSV are written chunk by chunk, so an iterable of
+    chunks (e.g. from ``iter_battery_data``) never has to fit in memory.
+    NPZ has no append mode and collects the chunks first.
+
+    Parameters:
+        data (DataFrame or iterable): Data, or an iterable of DataFrame chunks.
+        path (str): Output file path.
+        format (str, optional): One of FORMATS; inferred from the extension if None.
+        float_dtype (dtype, optional): Type of the floating-point columns
+            other than TIME_COLUMN, which is never cast; None keeps the
+            input types.
+        compression (str, optional): Codec passed to the backend, e.g.
+            'zstd' or 'snappy' for Parquet, 'zstd' or 'lz4' for Feather,
+            'gzip' for CSV. For NPZ any value enables zip compression.
+    """
+    format = format or detect_format(path)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    if format == 'csv':
+        for i, chunk in enumerate(_chunks(data)):
+            chunk = _cast_floats(chunk, float_dtype)
+            chunk.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0,
+                         compression=compression)
+    elif format == 'parquet':
+        pa = _import_pyarrow()
+        writer = None
+        try:
+            for chunk in _chunks(data):
+                table = pa.Table.from_pandas(_cast_floats(chunk, float_dtype), preserve_index=False)
+                if writer is None:
+                    writer = pa.parquet.ParquetWriter(path, table.schema, compression=compression or 'none')
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif format == 'feather':
+        pa = _import_pyarrow()
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = None
+        try:
+            for chunk in _chunks(data):
+                table = pa.Table.from_pandas(_cast_floats(chunk, float_dtype), preserve_index=False)
+                if writer is None:
+                    writer = pa.ipc.new_file(path, table.schema, options=options)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif format == 'npz':
+        data = pd.concat(list(_chunks(data)), ignore_index=True)
+        data = _cast_floats(data, float_dtype)
+        arrays = {column: data[column].to_numpy() for column in data.columns}
+        (np.savez_compressed if compression else np.savez)(path, **arrays)
+    else:
+        raise ValueError(f"Unknown storage format '{format}', expected one of {FORMATS}")
+
+
+def load_data(path, columns=None, start=0, stop=None, format=None):
+    """
+    Loads battery data saved by ``save_data``, optionally only some columns
+    and a range of rows.
+
+    Parquet reads only the row groups overlapping the range and Feather is
+    memory-mapped, so neither touches the rest of the file.
+
+    Parameters:
+        path (str): Input file path.
+        columns (list, optional): Columns to load; all columns if None.
+        start (int): First row to load.
+        stop (int, optional): Row after the last one to load; end of file if None.
+        format (str, optional): One of FORMATS; inferred from the extension if None.
+
+    Returns:
+        data (DataFrame): The requested rows and columns.
+    """
+    format = format or detect_format(path)
+
+    if format == 'csv':
+        nrows = None if stop is None else max(0, stop - start)
+        return pd.read_csv(path, usecols=columns, skiprows=range(1, start + 1), nrows=nrows)
+
+    if format == 'parquet':
+        pa = _import_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        metadata = parquet_file.metadata
+        stop = metadata.num_rows if stop is None else min(stop, metadata.num_rows)
+        groups = []
+        first_row = None
+        offset = 0
+        for i in range(metadata.num_row_groups):
+            rows = metadata.row_group(i).num_rows
+            if offset < stop and offset + rows > start:
+                groups.append(i)
+                first_row = offset if first_row is None else first_row
+            offset += rows
+        if not groups:
+            return parquet_file.schema_arrow.empty_table().select(columns or parquet_file.schema_arrow.names).to_pandas()
+        table = parquet_file.read_row_groups(groups, columns=columns)
+        return table.slice(start - first_row, stop - start).to_pandas()
+
+    if format == 'feather':
+        pa = _import_pyarrow()
+        table = pa.feather.read_table(path, columns=columns, memory_map=True)
+        stop = table.num_rows if stop is None else min(stop, table.num_rows)
+        return table.slice(start, max(0, stop - start)).to_pandas()
+
+    if format == 'npz':
+        with np.load(path) as arrays:
+            return pd.DataFrame({column: arrays[column][start:stop] for column in (columns or arrays.files)})
+
+    raise ValueError(f"Unknown storage format '{format}', expected one of {FORMATS}")
+
+
+def iter_data(path, chunk_size=100_000, columns=None, format=None):
+    """
+    Reads battery data saved by ``save_data`` in consecutive chunks.
+
+    CSV and Parquet are streamed, Feather is memory-mapped and sliced. NPZ
+    cannot be read partially, so its columns are loaded once and sliced.
+
+    Parameters:
+        path (str): Input file path.
+        chunk_size (int): Rows per chunk.
+        columns (list, optional): Columns to load; all columns if None.
+        format (str, optional): One of FORMATS; inferred from the extension if None.
+
+    Yields:
+        chunk (DataFrame): Up to chunk_size consecutive rows.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    format = format or detect_format(path)
+
+    if format == 'csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    elif format == 'parquet':
+        pa = _import_pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif format == 'feather':
+        pa = _import_pyarrow()
+        table = pa.feather.read_table(path, columns=columns, memory_map=True)
+        for start in range(0, table.num_rows, chunk_size):
+            yield table.slice(start, chunk_size).to_pandas()
+    elif format == 'npz':
+        with np.load(path) as arrays:
+            data = {column: arrays[column] for column in (columns or arrays.files)}
+        n_rows = len(next(iter(data.values()))) if data else 0
+        for start in range(0, n_rows, chunk_size):
+            yield pd.DataFrame({column: values[start:start + chunk_size] for column, values in data.items()})
+    else:
+        raise ValueError(f"Unknown storage format '{format}', expected one of {FORMATS}")
@@ -0,0 +1,229 @@
+import os
+import numpy as np
+from coulomb_counting import coulomb_counting
+from kalman_filter import scalar_kalman_filter
+
+# Fixed-width little-endian records. float64 fields let the estimators use
+# the mapped columns as they are, without a conversion copy.
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('current', '<f8'),
+    ('voltage', '<f8'),
+    ('temperature', '<f8'),
+])
+MAGIC = b'SOCTLM01'
+# Magic followed by the record size, so a file written with another layout
+# is rejected instead of misread.
+HEADER_SIZE = 16
+
+
+def _header():
+    return MAGIC + np.uint64(RECORD_DTYPE.itemsize).tobytes()
+
+
+def write_telemetry(path, data, temperature=25.0):
+    """
+    Writes battery data as fixed-width binary telemetry records.
+
+    Chunks are converted and written one at a time, so an iterable of
+    chunks (e.g. from ``iter_battery_data``) never has to fit in memory.
+
+    Parameters:
+        path (str): Output file path.
+        data (DataFrame or iterable): Data with 'time', 'current' and 'voltage'
+            columns (and optionally 'temperature'), or an iterable of chunks.
+        temperature (float): Temperature in degC for chunks without a
+            'temperature' column.
+
+    Returns:
+        n_records (int): Number of records written.
+    """
+    # storage imports pandas, which the telemetry readers do not need.
+    from storage import _chunks
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    n_records = 0
+    with open(path, 'wb') as f:
+        f.write(_header())
+        for chunk in _chunks(data):
+            records = np.empty(len(chunk), dtype=RECORD_DTYPE)
+            records['time'] = chunk['time']
+            records['current'] = chunk['current']
+            records['voltage'] = chunk['voltage']
+            records['temperature'] = chunk['temperature'] if 'temperature' in chunk else temperature
+            f.write(records.tobytes())
+            n_records += len(records)
+    return n_records
+
+
+class TelemetryReader:
+    """
+    Memory-mapped reader for files written by ``write_telemetry``.
+
+    Every window is mapped on its own and released when the caller drops it,
+    so the resident memory is bounded by the window size rather than the
+    file size. Columns of a window are strided views into the mapping.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Telemetry file path.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a telemetry file")
+        record_size = int(np.frombuffer(header[len(MAGIC):], dtype=np.uint64)[0])
+        if record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(
+                f"'{path}' has {record_size}-byte records, expected {RECORD_DTYPE.itemsize}"
+            )
+
+        payload = os.path.getsize(path) - HEADER_SIZE
+        if payload % record_size:
+            raise ValueError(f"'{path}' is truncated: {payload % record_size} trailing bytes")
+        self.path = path
+        self.n_records = payload // record_size
+
+    def __len__(self):
+        return self.n_records
+
+    def read(self, start=0, stop=None):
+        """
+        Maps a range of records.
+
+        Parameters:
+            start (int): First record.
+            stop (int, optional): Record after the last one; end of file if None.
+
+        Returns:
+            records (memmap): Read-only structured array with RECORD_DTYPE fields.
+        """
+        start, stop, _ = slice(start, stop).indices(self.n_records)
+        if stop <= start:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r',
+                         offset=HEADER_SIZE + start * RECORD_DTYPE.itemsize,
+                         shape=(stop - start,))
+
+    def windows(self, window_size, start=0, stop=None):
+        """
+        Iterates over consecutive windows of records.
+
+        Parameters:
+            window_size (int): Records per window.
+            start (int): First record.
+            stop (int, optional): Record after the last one; end of file if None.
+
+        Yields:
+            records (memmap): Read-only structured array of at most window_size records.
+        """
+        if window_size < 1:
+            raise ValueError(f"window_size must be positive, got {window_size}")
+        start, stop, _ = slice(start, stop).indices(self.n_records)
+        for begin in range(start, stop, window_size):
+            yield self.read(begin, min(stop, begin + window_size))
+
+
+def iter_soc_estimates(path, window_size=65536, **kwargs):
+    """
+    Runs the SoC estimators over a telemetry file window by window.
+
+    Parameters:
+        path (str): Telemetry file path.
+        window_size (int): Records per window.
+        **kwargs: Estimator settings, see ``iter_window_estimates``.
+
+    Yields:
+        estimates (DataFrame): Estimates for one window.
+    """
+    return iter_window_estimates(TelemetryReader(path).windows(window_size), **kwargs)
+
+
+def iter_window_estimates(windows, initial_soc=1.0, battery_capacity=3600, dt=None,
+                          process_noise=0.01, measurement_noise=1.0, initial_covariance=1.0,
+                          steady_state=False, cell_model=None, model=None, scaler=None,
+                          feature_extractor=None):
+    """
+    Runs the SoC estimators over consecutive windows of one trace.
+
+    Coulomb Counting restarts each window from the previous SoC and current,
+    and the Kalman Filter carries its state and covariance, so the
+    concatenated windows equal running ``coulomb_counting`` and
+    ``kalman_filter_estimation`` over the whole trace at once.
+
+    Parameters:
+        windows (iterable): Windows with 'time', 'current' and 'voltage'
+            fields, e.g. telemetry records or DataFrame chunks.
+        initial_soc (float): Initial SoC (0 to 1).
+        battery_capacity (float): Battery capacity in Coulombs.
+        dt (float, optional): Time step in seconds; taken from the recorded
+            time stamps if None.
+        process_noise (float): Kalman Filter process noise variance.
+        measurement_noise (float): Kalman Filter measurement noise variance.
+        initial_covariance (float): Kalman Filter initial SoC variance.
+        steady_state (bool): Use the steady-state Kalman gain after the transient.
+        cell_model (EquivalentCircuitModel, optional): Cell model for the
+            Kalman Filter voltage-to-SoC measurements.
+        model: Trained Machine Learning model; the ML estimate is skipped if None.
+        scaler: Scaler for feature normalization, required with model.
+        feature_extractor (FeatureExtractor, optional): Feature stage of the
+            model; it is reset and then carried across the windows.
+
+    Yields:
+        estimates (DataFrame): Columns 'time', 'soc_cc', 'soc_kf' and, with a
+            model, 'soc_ml' for one window.
+    """
+    import pandas as pd
+    if model is not None:
+        from machine_learning import machine_learning_soc_estimation
+    if feature_extractor is not None:
+        feature_extractor.reset()
+    soc_cc = initial_soc
+    x, P = initial_soc, initial_covariance
+    previous = None
+
+    for records in windows:
+        if len(records) == 0:
+            continue
+        time = np.asarray(records['time'], dtype=np.float64)
+        current = np.asarray(records['current'], dtype=np.float64)
+        voltage = np.asarray(records['voltage'], dtype=np.float64)
+
+        if previous is None:
+            # dt[k-1] is the interval between samples k-1 and k.
+            interval = dt if dt is not None else np.diff(time)
+            cc = coulomb_counting(current, soc_cc, battery_capacity, interval)
+            charge = current[:-1] * interval
+        else:
+            # Prepend the last sample of the previous window so the first
+            # step of this window is integrated over the boundary.
+            previous_time, previous_current = previous
+            interval = dt if dt is not None else np.diff(time, prepend=previous_time)
+            cc = coulomb_counting(np.concatenate(([previous_current], current)),
+                                  soc_cc, battery_capacity, interval)[1:]
+            charge = np.concatenate(([previous_current], current[:-1])) * interval
+
+        if cell_model is None:
+            measurements = voltage / 4.2
+        else:
+            measurements = cell_model.soc_from_voltage(voltage, current)
+        kf, x, P = scalar_kalman_filter(measurements, x, P, process_noise, measurement_noise,
+                                        steady_state=steady_state)
+        if previous is None:
+            kf[1:] -= charge / battery_capacity
+        else:
+            kf -= charge / battery_capacity
+
+        estimates = {'time': np.array(time), 'soc_cc': cc, 'soc_kf': np.clip(kf, 0, 1)}
+        if model is not None:
+            estimates['soc_ml'] = machine_learning_soc_estimation(current, voltage, model, scaler,
+                                                                  feature_extractor)
+
+        soc_cc = float(cc[-1])
+        previous = (float(time[-1]), float(current[-1]))
+        yield pd.DataFrame(estimates)
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from battery_kalman_filter import (BatteryStateModel, battery_inputs, battery_kalman_estimation,
+                                   make_battery_filter)
+from battery_model import EquivalentCircuitModel
+from data_acquisition import simulate_battery_data
+from nonlinear_filters import ExtendedKalmanFilter
+
+CAPACITY = 7200
+
+
+class TestBatteryKalmanFilter(unittest.TestCase):
+    def setUp(self):
+        self.cell = EquivalentCircuitModel(capacity=CAPACITY, rc_pairs=((0.015, 2000.0), (0.01, 50.0)))
+        data = simulate_battery_data(total_time=3000, profile='drive_cycle', seed=0, cell_model=self.cell,
+                                     battery_capacity=CAPACITY, initial_soc=0.9)
+        self.current = data['current'].values
+        self.voltage = data['voltage'].values
+        self.soc = data['soc_ground_truth'].values
+
+    def test_jacobians_match_finite_differences(self):
+        """Test the analytic Jacobians, including the tabulated dOCV/dSoC, against finite differences."""
+        model = BatteryStateModel(self.cell, CAPACITY, estimate_capacity=True)
+        x, dt, u, eps = np.array([0.55, 0.02, -0.01, 0.95]), 2.0, (3.0, 5.0), 1e-6
+        steps = x + eps * np.eye(4)
+        F = (model.fx(steps, dt, u) - model.fx(x[None], dt, u)).T / eps
+        H = (model.hx(steps, u) - model.hx(x[None], u)).T / eps
+        np.testing.assert_allclose(model.F_jacobian(x, dt, u), F, atol=1e-6)
+        np.testing.assert_allclose(model.H_jacobian(x, u), H, atol=1e-3)
+
+    def test_fast_ekf_matches_generic_ekf(self):
+        """Test that the specialized EKF loop gives the generic EKF's states and covariances."""
+        dt = np.ones(len(self.current))
+        dt[::7] = 2.0
+        for estimate_capacity in (False, True):
+            model = BatteryStateModel(self.cell, CAPACITY * 1.1, estimate_capacity)
+            ekf = make_battery_filter(model, initial_soc=0.6)
+            generic = ExtendedKalmanFilter(ekf.x, ekf.P, ekf.Q, ekf.R, model.fx, model.hx,
+                                           model.F_jacobian, model.H_jacobian)
+            states, covariances = ekf.run(self.voltage, dt, battery_inputs(self.current))
+            expected_states, expected_covariances = generic.run(self.voltage, dt, battery_inputs(self.current))
+            np.testing.assert_allclose(states, expected_states, atol=1e-12)
+            np.testing.assert_allclose(covariances, expected_covariances, atol=1e-15)
+        with self.assertRaises(ValueError):
+            ekf.run(self.voltage, dt)
+
+    def test_tracks_soc_and_capacity(self):
+        """Test that EKF and UKF recover SoC from a wrong start, and the capacity state a wrong capacity."""
+        for method in ('ekf', 'ukf'):
+            soc = battery_kalman_estimation(self.current, self.voltage, 0.6, CAPACITY, 1.0, self.cell, method=method)
+            self.assertLess(np.abs(soc[100:] - self.soc[100:]).max(), 0.02)
+        np.testing.assert_array_equal(
+            battery_kalman_estimation(self.current, self.voltage, 0.6, CAPACITY, np.ones(len(self.current) - 1),
+                                      self.cell),
+            battery_kalman_estimation(self.current, self.voltage, 0.6, CAPACITY, 1.0, self.cell))
+
+        model = BatteryStateModel(self.cell, CAPACITY * 1.1, estimate_capacity=True)
+        states, _ = make_battery_filter(model, initial_soc=0.6).run(self.voltage, 1.0, battery_inputs(self.current))
+        self.assertAlmostEqual(states[-1, -1] * CAPACITY * 1.1 / CAPACITY, 1.0, delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from battery_model import DEFAULT_OCV, DEFAULT_OCV_SOC, EquivalentCircuitModel
+from coulomb_counting import coulomb_counting
+
+
+class TestEquivalentCircuitModel(unittest.TestCase):
+    def test_ocv_and_slope(self):
+        """Test the OCV lookup at its breakpoints and the slope table against finite differences."""
+        # A table step of 1/4000 puts every breakpoint on the dense grid.
+        model = EquivalentCircuitModel(ocv_temp_coeff=1e-3, table_size=4001)
+        np.testing.assert_allclose(model.ocv(DEFAULT_OCV_SOC), DEFAULT_OCV, atol=1e-12)
+        np.testing.assert_allclose(model.ocv([-0.5, 1.5]), DEFAULT_OCV[[0, -1]])
+        np.testing.assert_allclose(model.ocv(0.5, temperature=35.0), model.ocv(0.5) + 0.01)
+
+        # Away from the breakpoints, where the piecewise linear curve has no kink.
+        soc = np.random.default_rng(0).uniform(0.0, 1.0, 200)
+        soc = soc[np.abs(soc * 10 - np.round(soc * 10)) > 0.01]
+        eps = 1e-6
+        slope = (model.ocv(soc + eps) - model.ocv(soc - eps)) / (2 * eps)
+        np.testing.assert_allclose(model.docv_dsoc(soc), slope, rtol=1e-6)
+
+    def test_soc_from_voltage_inverts_ocv(self):
+        """Test that soc_from_voltage undoes the OCV curve and the R0 drop."""
+        model = EquivalentCircuitModel(ocv_temp_coeff=1e-3, r_temp_coeff=0.02)
+        soc = np.linspace(0.0, 1.0, 101)
+        current = np.linspace(-5.0, 5.0, 101)
+        np.testing.assert_allclose(model.soc_from_ocv(model.ocv(soc)), soc, atol=1e-12)
+        voltage = model.terminal_voltage(soc, current, np.zeros((1, 101)), temperature=10.0)
+        np.testing.assert_allclose(model.soc_from_voltage(voltage, current, temperature=10.0), soc, atol=1e-12)
+
+    def test_simulate_saturates_like_coulomb_counting(self):
+        """Test that simulate clamps SoC as the Coulomb counter does, for single cells, packs and chunks."""
+        model = EquivalentCircuitModel(rc_pairs=((0.015, 2000.0), (0.01, 50.0)))
+        # Discharge past empty, then charge back: the SoC must recover right away.
+        current = np.concatenate((np.full(1000, 2.0), np.full(1000, -2.0)))
+        voltage, soc, (soc_next, _) = model.simulate(current, 1.0, initial_soc=0.5)
+        np.testing.assert_array_equal(soc, coulomb_counting(current, 0.5, model.capacity, 1.0))
+        self.assertEqual(soc.min(), 0.0)
+        self.assertAlmostEqual(soc_next, 2000 / model.capacity)
+        v_rc, _ = model.rc_voltages(current, 1.0)
+        np.testing.assert_array_equal(voltage, model.terminal_voltage(soc, current, v_rc))
+
+        dt = np.random.default_rng(1).uniform(0.5, 1.5, 2000)
+        initial_soc = np.array([0.1, 0.5, 0.9])
+        _, pack_soc, _ = model.simulate(current, dt, initial_soc=initial_soc)
+        for cell in range(3):
+            np.testing.assert_array_equal(pack_soc[cell],
+                                          coulomb_counting(current, initial_soc[cell], model.capacity, dt))
+
+        first_voltage, first_soc, state = model.simulate(current[:700], 1.0, initial_soc=0.5)
+        rest_voltage, rest_soc, _ = model.simulate(current[700:], 1.0, *state[:1], initial_rc=state[1])
+        np.testing.assert_array_equal(np.concatenate((first_soc, rest_soc)), soc)
+        np.testing.assert_allclose(np.concatenate((first_voltage, rest_voltage)), voltage, atol=1e-12)
+
+    def test_rc_voltages_with_time_stamp_gaps(self):
+        """Test that variable time steps, including gaps that fully relax the RC pairs, match a plain loop."""
+        model = EquivalentCircuitModel(rc_pairs=((0.015, 2000.0), (0.01, 5.0)))
+        rng = np.random.default_rng(0)
+        current = rng.normal(1.0, 2.0, 3000)
+        dt = rng.uniform(0.5, 2.0, 3000)
+        dt[[3, 1000, 1001, 2500]] = [1e5, 1e4, 1e6, 500.0]
+        v_rc, v_next = model.rc_voltages(current, dt, initial=np.array([0.01, -0.02]))
+        self.assertTrue(np.isfinite(v_rc).all())
+
+        expected = np.empty((2, 3001))
+        expected[:, 0] = [0.01, -0.02]
+        for i, (r, c) in enumerate(model.rc_pairs):
+            for k in range(3000):
+                a = np.exp(-dt[k] / (r * c))
+                expected[i, k + 1] = a * expected[i, k] + r * (1.0 - a) * current[k]
+        np.testing.assert_allclose(v_rc, expected[:, :-1], rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(v_next, expected[:, -1], rtol=1e-9, atol=1e-12)
+
+        v_rc, _ = model.rc_voltages(np.ones(6), np.array([1, 1, 1e5, 1, 1, 1.0]))
+        # The gap relaxes the pair to its steady state R I under constant current.
+        np.testing.assert_allclose(v_rc[0, 3:], 0.015)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import copy
+import unittest
+from benchmark import compare, compare_import_times, run_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_report_and_regression_check(self):
+        """Test that every case is reported and only slowed-down cases are flagged."""
+        report = run_benchmark(lengths=(200, 400), profiles=('square', 'pulse'),
+                               estimators=('coulomb_counting', 'kalman_filter'), repeats=1,
+                               import_modules=('coulomb_counting',))
+        self.assertEqual(len(report['results']), 8)
+        self.assertEqual(list(report['import_times']), ['coulomb_counting'])
+        self.assertGreater(report['import_times']['coulomb_counting'], 0)
+        for result in report['results']:
+            self.assertGreater(result['samples_per_second'], 0)
+            self.assertGreater(result['peak_memory_bytes'], 0)
+            self.assertGreaterEqual(result['max_error'], result['rmse'])
+
+        self.assertEqual(compare(report, report), [])
+        baseline = copy.deepcopy(report)
+        baseline['results'][0]['samples_per_second'] *= 2
+        baseline['results'][1]['samples_per_second'] *= 1.1
+        del baseline['results'][2]
+        regressions = compare(report, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]['estimator'], report['results'][0]['estimator'])
+        self.assertAlmostEqual(regressions[0]['change'], -0.5)
+
+        self.assertEqual(compare_import_times(report, report), [])
+        baseline['import_times']['coulomb_counting'] /= 2
+        self.assertEqual([r['module'] for r in compare_import_times(report, baseline)], ['coulomb_counting'])
+
+
+if __name__ == '__main__':
+    unittest.main()
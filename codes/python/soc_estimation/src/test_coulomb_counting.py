@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from coulomb_counting import coulomb_counting, coulomb_counting_batch, coulomb_counting_loop
+
+
+class TestCoulombCounting(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def assertBitIdentical(self, a, b):
+        self.assertEqual(a.dtype, b.dtype)
+        self.assertEqual(a.tobytes(), b.tobytes())
+
+    def test_matches_loop_without_saturation(self):
+        """Test that an unsaturated trace matches the reference loop bit for bit."""
+        current = self.rng.normal(0, 0.5, 5000)
+        self.assertBitIdentical(
+            coulomb_counting(current, 0.5, 36000, 1),
+            coulomb_counting_loop(current, 0.5, 36000, 1),
+        )
+
+    def test_matches_loop_with_saturation(self):
+        """Test traces that repeatedly hit both saturation bounds."""
+        for _ in range(50):
+            current = self.rng.normal(self.rng.normal(0, 3), 5, 3000) * 20
+            initial_soc = self.rng.choice([0.0, 1.0, self.rng.random()])
+            dt = self.rng.random() * 2
+            soc = coulomb_counting(current, initial_soc, 3600, dt)
+            self.assertBitIdentical(soc, coulomb_counting_loop(current, initial_soc, 3600, dt))
+            self.assertTrue(((soc[1:] >= 0) & (soc[1:] <= 1)).all())
+
+    def test_variable_dt(self):
+        """Test that a per-sample dt array matches stepping with each interval."""
+        current = self.rng.normal(0, 50, 1000)
+        dt = self.rng.random(1000)
+        soc = coulomb_counting(current, 0.5, 3600, dt)
+        expected = [0.5]
+        for t in range(1, len(current)):
+            expected.append(min(1.0, max(0.0, expected[-1] - (current[t-1] * dt[t-1]) / 3600)))
+        self.assertBitIdentical(soc, np.array(expected))
+        self.assertBitIdentical(soc, coulomb_counting(current, 0.5, 3600, dt[:-1]))
+
+    def test_invalid_dt_length(self):
+        """Test that a dt array of the wrong length is rejected."""
+        with self.assertRaises(ValueError):
+            coulomb_counting(np.ones(10), 0.5, 3600, np.ones(5))
+
+    def test_short_traces(self):
+        """Test empty and single-sample traces."""
+        self.assertEqual(len(coulomb_counting(np.array([]), 0.5, 3600, 1)), 0)
+        self.assertBitIdentical(coulomb_counting(np.array([2.0]), 0.5, 3600, 1), np.array([0.5]))
+
+    def test_batch_matches_per_cell(self):
+        """Test that every batched row matches integrating that cell alone."""
+        current = self.rng.normal(0, 20, (40, 6000))
+        capacity = self.rng.uniform(3000, 5000, 40)
+        initial_soc = self.rng.random(40)
+        dt = self.rng.random(6000)
+        soc = coulomb_counting_batch(current, initial_soc, capacity, dt)
+        self.assertEqual(soc.shape, current.shape)
+        for cell in range(len(current)):
+            self.assertBitIdentical(
+                soc[cell], coulomb_counting(current[cell], initial_soc[cell], capacity[cell], dt)
+            )
+
+    def test_batch_rejects_1d_current(self):
+        """Test that the batched mode requires a 2-D current matrix."""
+        with self.assertRaises(ValueError):
+            coulomb_counting_batch(np.ones(10), 0.5, 3600, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import pandas as pd
+from battery_model import EquivalentCircuitModel
+from data_acquisition import _PROFILE_BLOCK, PROFILES, iter_battery_data, simulate_battery_data
+
+TOTAL_TIME = 2 * _PROFILE_BLOCK + 1000
+
+
+class TestIterBatteryData(unittest.TestCase):
+    def test_chunks_match_one_shot_simulation(self):
+        """Test that every profile gives the same trace for any chunk size, across profile blocks."""
+        for profile in PROFILES:
+            expected = simulate_battery_data(total_time=TOTAL_TIME, profile=profile, seed=3)
+            for chunk_size in (997, 50000, _PROFILE_BLOCK, _PROFILE_BLOCK + 1):
+                with self.subTest(profile=profile, chunk_size=chunk_size):
+                    chunks = list(iter_battery_data(total_time=TOTAL_TIME, profile=profile, seed=3,
+                                                    chunk_size=chunk_size))
+                    self.assertTrue(all(len(chunk) == chunk_size for chunk in chunks[:-1]))
+                    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected, check_exact=True)
+
+    def test_cell_model_chunks(self):
+        """Test that the RC voltages of a cell model carry over between chunks."""
+        cell = EquivalentCircuitModel()
+        expected = simulate_battery_data(total_time=20000, profile='drive_cycle', seed=3, cell_model=cell)
+        chunks = iter_battery_data(total_time=20000, profile='drive_cycle', seed=3, cell_model=cell, chunk_size=1234)
+        pd.testing.assert_frame_equal(pd.concat(list(chunks), ignore_index=True), expected, rtol=1e-12)
+
+    def test_deterministic_per_seed(self):
+        """Test that a seed reproduces the trace and another seed changes the random parts of it."""
+        for profile in PROFILES:
+            first = simulate_battery_data(total_time=5000, profile=profile, seed=7)
+            pd.testing.assert_frame_equal(simulate_battery_data(total_time=5000, profile=profile, seed=7), first)
+            other = simulate_battery_data(total_time=5000, profile=profile, seed=8)
+            self.assertFalse(first['voltage'].equals(other['voltage']))
+            # Only the pulse train is random; the other profiles are fixed waveforms.
+            self.assertEqual(first['current'].equals(other['current']), profile != 'pulse')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from features import FEATURES, FeatureExtractor, compute_features
+
+
+class TestFeatureExtractor(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.current = rng.normal(0, 2, 5000)
+        self.current[rng.random(5000) < 0.6] = 0.0
+        self.voltage = rng.normal(3.7, 0.1, 5000)
+        self.rng = rng
+
+    def test_chunked_matches_one_shot(self):
+        """Test that streaming random-sized chunks gives bit-identical features."""
+        for window in (1, 2, 30):
+            expected = compute_features(self.current, self.voltage, dt=0.5, window=window)
+            extractor = FeatureExtractor(dt=0.5, window=window)
+            chunks = []
+            bounds = np.sort(self.rng.choice(np.arange(1, 5000), 40, replace=False))
+            for current, voltage in zip(np.split(self.current, bounds), np.split(self.voltage, bounds)):
+                chunks.append(extractor.transform(current, voltage))
+            self.assertEqual(np.concatenate(chunks).tobytes(), expected.tobytes())
+
+    def test_feature_values(self):
+        """Test each feature against a direct per-sample computation."""
+        X = compute_features(self.current, self.voltage, dt=2.0, window=5)
+        self.assertEqual(X.shape, (5000, len(FEATURES)))
+        padded = np.concatenate((np.full(4, self.current[0]), self.current))
+        np.testing.assert_allclose(X[:, 2], [padded[k:k + 5].mean() for k in range(5000)])
+        np.testing.assert_allclose(X[:, 4], np.cumsum(self.current * 2.0))
+        np.testing.assert_allclose(X[1:, 5], np.diff(self.voltage) / 2.0)
+
+        rest, count = [], 0
+        for i in self.current:
+            count = count + 1 if abs(i) <= 0.05 else 0
+            rest.append(count * 2.0)
+        np.testing.assert_array_equal(X[:, 6], rest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+from flat_forest import flatten_forest, load_forest, save_forest
+
+
+class TestFlatForest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = np.column_stack((rng.normal(0, 20, 2000), rng.uniform(3.0, 4.2, 2000)))
+        y = np.clip(X[:, 1] / 4.2 - X[:, 0] / 200 + rng.normal(0, 0.01, 2000), 0, 1)
+        self.scaler = StandardScaler().fit(X)
+        self.model = RandomForestRegressor(n_estimators=20, random_state=0).fit(self.scaler.transform(X), y)
+        self.X = np.column_stack((rng.normal(0, 25, 3000), rng.uniform(2.9, 4.3, 3000)))
+
+    def test_matches_sklearn(self):
+        """Test that scaling and prediction are bit-identical to scikit-learn."""
+        forest = flatten_forest(self.model, self.scaler)
+        X_scaled = self.scaler.transform(self.X)
+        self.assertEqual(forest.scaler.transform(self.X).tobytes(), X_scaled.tobytes())
+        self.assertEqual(forest.predict(X_scaled).tobytes(), self.model.predict(X_scaled).tobytes())
+
+    def test_save_and_load(self):
+        """Test that a memory-mapped model predicts the same as the in-memory one."""
+        forest = flatten_forest(self.model, self.scaler)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.forest')
+            save_forest(forest, path)
+            loaded = load_forest(path)
+            self.assertIsInstance(loaded.threshold.base, np.memmap)
+            X_scaled = loaded.scaler.transform(self.X)
+            np.testing.assert_array_equal(loaded.predict(X_scaled), forest.predict(X_scaled))
+            del loaded, X_scaled
+
+    def test_rejects_wrong_feature_count(self):
+        """Test that inputs with the wrong number of features are rejected."""
+        with self.assertRaises(ValueError):
+            flatten_forest(self.model, self.scaler).predict(np.zeros((5, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from coulomb_counting import coulomb_counting
+from fleet import output_path, run_fleet
+from storage import load_data
+from telemetry import write_telemetry
+
+
+@unittest.skipIf(importlib.util.find_spec('pyarrow') is None, 'pyarrow not installed')
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.logs = os.path.join(self.directory.name, 'logs')
+        self.output = os.path.join(self.directory.name, 'out')
+        os.makedirs(self.logs)
+        rng = np.random.default_rng(0)
+        self.data = {}
+        for name in ('a.csv', 'b.tlm', 'c.csv'):
+            data = pd.DataFrame({
+                'time': np.arange(500, dtype=float),
+                'current': rng.normal(1, 10, 500),
+                'voltage': rng.uniform(3.0, 4.2, 500),
+            })
+            path = os.path.join(self.logs, name)
+            if name.endswith('.tlm'):
+                write_telemetry(path, data)
+            else:
+                data.to_csv(path, index=False)
+            self.data[path] = data
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_and_resume(self):
+        """Test that every log is estimated once and completed logs are skipped on rerun."""
+        summary = run_fleet(self.logs, self.output, workers=2, window_size=128, initial_soc=0.9)
+        self.assertEqual(sorted(summary['completed']), sorted(self.data))
+        for path, data in self.data.items():
+            estimates = load_data(output_path(path, self.output))
+            expected = coulomb_counting(data['current'].values, 0.9, 3600, 1)
+            np.testing.assert_allclose(estimates['soc_cc'], expected, rtol=1e-6)
+            self.assertEqual(len(estimates), len(data))
+
+        os.remove(output_path(os.path.join(self.logs, 'c.csv'), self.output))
+        summary = run_fleet(self.logs, self.output, workers=2, window_size=128, initial_soc=0.9)
+        self.assertEqual(summary['completed'], [os.path.join(self.logs, 'c.csv')])
+        self.assertEqual(len(summary['skipped']), 2)
+
+    def test_epoch_time_stamps_keep_full_precision(self):
+        """Test that absolute time stamps at 10 Hz and the estimates are written as float64."""
+        logs = os.path.join(self.directory.name, 'epoch')
+        os.makedirs(logs)
+        data = self.data[os.path.join(self.logs, 'a.csv')].copy()
+        data['time'] = 1.7e9 + np.arange(len(data)) / 10
+        path = os.path.join(logs, 'epoch.csv')
+        data.to_csv(path, index=False, float_format='%.17g')
+        summary = run_fleet(logs, self.output, workers=1, window_size=128, initial_soc=0.9)
+        self.assertEqual(summary['completed'], [path])
+
+        estimates = load_data(output_path(path, self.output))
+        self.assertTrue((estimates.dtypes == np.float64).all())
+        np.testing.assert_array_equal(estimates['time'], data['time'])
+        expected = coulomb_counting(data['current'].values, 0.9, 3600, np.diff(data['time'].values))
+        np.testing.assert_allclose(estimates['soc_cc'], expected, rtol=1e-12)
+
+    def test_failed_log_leaves_no_output(self):
+        """Test that a broken log is reported without writing a partial result."""
+        broken = os.path.join(self.logs, 'broken.csv')
+        with open(broken, 'w') as f:
+            f.write('time,current\n0,1\n')
+        summary = run_fleet(self.logs, self.output, workers=1)
+        self.assertEqual(summary['failed'], [broken])
+        self.assertEqual(sorted(os.listdir(self.output)), ['a.parquet', 'b.parquet', 'c.parquet'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+from features import FeatureExtractor
+from inference_server import InferenceServer, load_inference_model, request_soc
+from machine_learning import machine_learning_soc_estimation
+
+
+class TestInferenceServer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.current = rng.normal(0, 5, 400)
+        self.voltage = rng.uniform(3.0, 4.2, 400)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _serve(self, model_path, **kwargs):
+        server = InferenceServer(*load_inference_model(model_path), **kwargs)
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        address = []
+
+        def on_ready(bound):
+            address.append(bound)
+            ready.set()
+
+        task = loop.create_task(server.serve(port=0, ready=on_ready))
+
+        def run():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.assertTrue(ready.wait(10))
+
+        def stop():
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join(10)
+            loop.close()
+        self.addCleanup(stop)
+        return server, tuple(address[0])
+
+    def _bundle(self, feature_extractor=None):
+        X = np.column_stack((self.current, self.voltage)) if feature_extractor is None \
+            else feature_extractor.transform(self.current, self.voltage)
+        y = np.clip(0.5 + 0.3 * X[:, 1] - 1.0, 0, 1)
+        scaler = StandardScaler().fit(X)
+        model = RandomForestRegressor(n_estimators=5, max_depth=6, random_state=0).fit(scaler.transform(X), y)
+        path = os.path.join(self.directory.name, 'model.joblib')
+        if feature_extractor is not None:
+            feature_extractor.reset()
+        joblib.dump({'model': model, 'scaler': scaler, 'feature_extractor': feature_extractor}, path)
+        return path, model, scaler
+
+    def test_concurrent_requests_are_batched(self):
+        """Test that concurrent clients get the offline predictions and share model calls."""
+        path, model, scaler = self._bundle()
+        server, address = self._serve(path, batch_window=0.005)
+        expected = machine_learning_soc_estimation(self.current, self.voltage, model, scaler)
+
+        def client(part):
+            return request_soc(address, [{'id': int(i), 'current': self.current[i], 'voltage': self.voltage[i]}
+                                         for i in range(part, len(self.current), 4)])
+
+        with ThreadPoolExecutor(4) as pool:
+            responses = [r for part in pool.map(client, range(4)) for r in part]
+        soc = np.empty(len(self.current))
+        for response in responses:
+            soc[response['id']] = response['soc']
+        np.testing.assert_allclose(soc, expected)
+
+        metrics = request_soc(address, [{'metrics': True}])[0]
+        self.assertEqual(metrics['requests'], len(self.current))
+        self.assertLess(metrics['batches'], len(self.current))
+        self.assertGreater(metrics['p99_us'], 0)
+        self.assertGreaterEqual(metrics['p99_us'], metrics['p50_us'])
+
+    def test_streams_keep_feature_state(self):
+        """Test that per-stream temporal features match the offline feature stage and streams are bounded."""
+        path, model, scaler = self._bundle(FeatureExtractor(window=5))
+        server, address = self._serve(path, batch_window=0.0, max_streams=2)
+        expected = machine_learning_soc_estimation(self.current, self.voltage, model, scaler, FeatureExtractor(window=5))
+
+        requests = [{'id': int(i), 'stream': 'cell-1', 'current': self.current[i], 'voltage': self.voltage[i]}
+                    for i in range(len(self.current))]
+        soc = [r['soc'] for r in request_soc(address, requests)]
+        np.testing.assert_allclose(soc, expected)
+
+        error = request_soc(address, [{'id': 'bad', 'current': 1.0}])[0]
+        self.assertIn('error', error)
+
+        # Only the most recently used streams keep their feature state.
+        request_soc(address, [{'id': i, 'stream': f'cell-{i}', 'current': 1.0, 'voltage': 3.7} for i in (2, 3)])
+        self.assertEqual(list(server._streams), ['cell-2', 'cell-3'])
+        self.assertEqual(request_soc(address, [{'metrics': True}])[0]['streams'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from coulomb_counting import coulomb_counting
+from instrumentation import Instrumentation
+from pipeline import Stage, run_pipeline
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_stage_and_decorator(self):
+        """Test that stages and decorated calls are recorded and summarised per name."""
+        instrumentation = Instrumentation()
+
+        @instrumentation.instrument()
+        def square(values):
+            return np.asarray(values) ** 2
+
+        with instrumentation.stage('setup') as stage:
+            values = np.arange(1000.0)
+            stage.samples = len(values)
+        square(values)
+        square(values[:10])
+
+        self.assertEqual([r['stage'] for r in instrumentation.records], ['setup', 'square', 'square'])
+        summary = instrumentation.summary()
+        self.assertEqual(summary['square']['calls'], 2)
+        self.assertEqual(summary['square']['samples'], 1010)
+        self.assertEqual(summary['setup']['samples'], 1000)
+        for total in summary.values():
+            self.assertGreaterEqual(total['wall_seconds'], 0)
+            self.assertGreaterEqual(total['cpu_seconds'], 0)
+
+    def test_disabled_records_nothing(self):
+        """Test that disabled instrumentation records nothing and leaves results unchanged."""
+        instrumentation = Instrumentation(enabled=False)
+
+        @instrumentation.instrument()
+        def identity(values):
+            return values
+
+        values = [1, 2, 3]
+        with instrumentation.stage('stage') as stage:
+            stage.samples = 3
+        self.assertIs(identity(values), values)
+        run_pipeline({'current': np.ones(10)}, [Stage('cc', coulomb_counting, ['current'],
+                                                     dict(initial_soc=1.0, battery_capacity=3600, dt=1))],
+                     instrumentation=instrumentation)
+        self.assertEqual(instrumentation.records, [])
+        self.assertEqual(instrumentation.summary(), {})
+
+    def test_pipeline_metrics_and_outputs(self):
+        """Test that pipeline stages are recorded and written as JSON and Prometheus text."""
+        instrumentation = Instrumentation()
+        kwargs = dict(initial_soc=1.0, battery_capacity=3600, dt=1)
+        run_pipeline({'current': np.ones(500)}, [Stage('cc', coulomb_counting, ['current'], kwargs),
+                                                 Stage('cc_thread', coulomb_counting, ['current'], kwargs,
+                                                       executor='thread')],
+                     instrumentation=instrumentation)
+        summary = instrumentation.summary()
+        self.assertEqual(set(summary), {'cc', 'cc_thread'})
+        self.assertEqual(summary['cc']['samples'], 500)
+
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, 'metrics.json')
+            prometheus_path = os.path.join(directory, 'metrics.prom')
+            instrumentation.write_json(json_path)
+            instrumentation.write_prometheus(prometheus_path)
+            with open(json_path) as f:
+                self.assertEqual(len(json.load(f)['stages']), 2)
+            with open(prometheus_path) as f:
+                text = f.read()
+        self.assertIn('# TYPE soc_stage_wall_seconds gauge', text)
+        self.assertIn('soc_stage_samples_total{stage="cc"} 500', text)
+        for line in text.splitlines():
+            if not line.startswith('#'):
+                float(line.rsplit(' ', 1)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import importlib.util
+import unittest
+import numpy as np
+from kalman_filter import kalman_filter_estimation, kalman_filter_estimation_filterpy, scalar_kalman_filter
+
+
+class TestKalmanFilter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.current = rng.normal(0, 1, 2000)
+        self.voltage = 4.2 * rng.random(2000)
+
+    @unittest.skipIf(importlib.util.find_spec('filterpy') is None, 'filterpy not installed')
+    def test_matches_filterpy(self):
+        """Test that the scalar filter reproduces the FilterPy implementation."""
+        soc = kalman_filter_estimation(self.current, self.voltage, 1.0, 3600, 1)
+        expected = kalman_filter_estimation_filterpy(self.current, self.voltage, 1.0, 3600, 1)
+        self.assertEqual(soc.tobytes(), expected.tobytes())
+
+    def test_split_run_matches_single_run(self):
+        """Test that carrying (x, P) across two calls matches one call."""
+        z = self.voltage / 4.2
+        states, _, _ = scalar_kalman_filter(z, 1.0, 1.0, 0.01, 1.0)
+        first, x, P = scalar_kalman_filter(z[:700], 1.0, 1.0, 0.01, 1.0)
+        second, _, _ = scalar_kalman_filter(z[700:], x, P, 0.01, 1.0)
+        np.testing.assert_array_equal(np.concatenate((first, second)), states)
+
+    def test_steady_state_close_to_exact(self):
+        """Test that the steady-state gain path only differs by rounding."""
+        soc = kalman_filter_estimation(self.current, self.voltage, 1.0, 3600, 1)
+        steady = kalman_filter_estimation(self.current, self.voltage, 1.0, 3600, 1, steady_state=True)
+        np.testing.assert_allclose(steady, soc, rtol=0, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from data_acquisition import iter_battery_data, simulate_battery_data
+from machine_learning import IncrementalSoCRegressor, machine_learning_soc_estimation, update_incremental_model
+
+
+class TestIncrementalSoCRegressor(unittest.TestCase):
+    def test_learns_from_chunks(self):
+        """Test that streaming chunks through partial_fit yields an accurate model."""
+        model = IncrementalSoCRegressor()
+        metrics = model.fit_stream(iter_battery_data(total_time=36000, chunk_size=5000, seed=0))
+        self.assertEqual(metrics['samples'], 36000)
+        self.assertEqual(metrics['chunks'], 8)
+        self.assertGreater(metrics['samples_per_second'], 0)
+
+        data = simulate_battery_data(seed=1)
+        soc = machine_learning_soc_estimation(data['current'].values, data['voltage'].values,
+                                              model, model.scaler)
+        rmse = np.sqrt(np.mean((soc - data['soc_ground_truth'].values) ** 2))
+        self.assertLess(rmse, 0.03)
+
+    def test_update_resumes_saved_model(self):
+        """Test that updates accumulate on the saved model while the scaler stays fixed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'incremental.joblib')
+            first, _ = update_incremental_model(iter_battery_data(total_time=3600, chunk_size=1000, seed=0), path)
+            mean, scale = first.scaler.mean_.copy(), first.scaler.scale_.copy()
+            model, _ = update_incremental_model(iter_battery_data(total_time=3600, chunk_size=1000, seed=1), path)
+            self.assertEqual(model.n_samples_seen_, 7200)
+            # The first stream is shorter than the warm-up: the scaler is fitted on all of it.
+            self.assertEqual(model.scaler.n_samples_seen_, 3600)
+            np.testing.assert_array_equal(model.scaler.mean_, mean)
+            np.testing.assert_array_equal(model.scaler.scale_, scale)
+            self.assertEqual(os.listdir(directory), ['incremental.joblib'])
+
+    def test_scaler_warmup_spans_constant_first_chunk(self):
+        """Test that a constant-current first chunk does not fix the current scale at 1."""
+        chunks = list(iter_battery_data(total_time=36000, chunk_size=1000, seed=0))
+        self.assertEqual(chunks[0]['current'].nunique(), 1)
+        model = IncrementalSoCRegressor(scaler_warmup=20_000)
+        model.partial_fit(chunks[0][['current', 'voltage']].values, chunks[0]['soc_ground_truth'].values)
+        self.assertEqual(model.n_samples_seen_, 0)
+        model.fit_stream(chunks[1:])
+        self.assertEqual(model.n_samples_seen_, 36000)
+        self.assertEqual(model.scaler.n_samples_seen_, 20_000)
+        current = np.concatenate([chunk['current'].values for chunk in chunks[:20]])
+        self.assertAlmostEqual(model.scaler.scale_[0], current.std())
+        self.assertNotEqual(model.scaler.scale_[0], 1.0)
+
+        prefit = IncrementalSoCRegressor(scaler=model.scaler)
+        prefit.fit_stream(chunks[:1])
+        self.assertEqual(prefit.n_samples_seen_, 1000)
+        self.assertIs(prefit.scaler, model.scaler)
+        self.assertEqual(prefit.scaler.n_samples_seen_, 20_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
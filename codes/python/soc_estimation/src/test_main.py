@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import main
+from battery_kalman_filter import battery_kalman_estimation
+from battery_model import EquivalentCircuitModel
+from coulomb_counting import coulomb_counting
+from kalman_filter import kalman_filter_estimation
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = {
+            'time': np.arange(1000, dtype=float),
+            'current': rng.normal(0.5, 2, 1000),
+            'voltage': rng.uniform(3.0, 4.2, 1000),
+        }
+        self.path = os.path.join(self.directory.name, 'trace.npz')
+        np.savez(self.path, **self.data)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_estimator_commands(self):
+        """Test that the cc, kf and ekf commands match the estimator functions."""
+        output = os.path.join(self.directory.name, 'cc.npy')
+        self.assertEqual(main.main(['cc', '--data', self.path, '--initial-soc', '0.9', '-o', output]), 0)
+        np.testing.assert_array_equal(np.load(output), coulomb_counting(self.data['current'], 0.9, 3600, 1.0))
+
+        args, _ = main.parse_args(['kf', '--data', self.path, '--dt', '1'])
+        np.testing.assert_array_equal(main.estimate(args),
+                                      kalman_filter_estimation(self.data['current'], self.data['voltage'], 1.0, 3600, 1))
+
+        args, _ = main.parse_args(['ekf', '--data', self.path, '--method', 'ukf', '--initial-soc', '0.8'])
+        np.testing.assert_array_equal(main.estimate(args), battery_kalman_estimation(
+            self.data['current'], self.data['voltage'], 0.8, 3600, np.ones(999), EquivalentCircuitModel(), 'ukf'))
+
+    def test_ml_features_use_the_time_step(self):
+        """Test that the ml command computes its temporal features with the interval of the time stamps."""
+        import glob
+        import joblib
+        data = dict(self.data, time=2.0 * self.data['time'], soc_ground_truth=np.linspace(1.0, 0.5, 1000))
+        np.savez(self.path, **data)
+        cache = os.path.join(self.directory.name, 'cache')
+        args, _ = main.parse_args(['ml', '--data', self.path])
+        with mock.patch.object(main, 'MODEL_CACHE_DIR', cache):
+            self.assertEqual(len(main.estimate(args)), 1000)
+        bundle, = glob.glob(os.path.join(cache, '**', '*.joblib'), recursive=True)
+        self.assertEqual(joblib.load(bundle)['feature_extractor'].dt, 2.0)
+
+    def test_default_command_and_passthrough(self):
+        """Test that run is the default command and train passes its arguments on."""
+        self.assertEqual(main.parse_args([])[0].command, 'run')
+        args, extra = main.parse_args(['train', '--time-budget', '5', '--families', 'ridge'])
+        self.assertEqual((args.command, extra), ('train', ['--time-budget', '5', '--families', 'ridge']))
+        with self.assertRaises(SystemExit), open(os.devnull, 'w') as devnull:
+            stderr, sys.stderr = sys.stderr, devnull
+            try:
+                main.parse_args(['cc', '--unknown'])
+            finally:
+                sys.stderr = stderr
+
+    def test_cc_imports_no_heavy_dependencies(self):
+        """Test that a Coulomb Counting job on NPZ input never imports the heavy libraries."""
+        script = (
+            "import sys, main; main.main(['cc', '--data', sys.argv[1]]); "
+            "print(sorted(m for m in ('pandas', 'sklearn', 'scipy', 'matplotlib', 'joblib', 'filterpy') "
+            "if m in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, '-c', script, self.path], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(main.__file__))).stdout
+        self.assertEqual(output.strip().splitlines()[-1], '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from machine_learning import cached_ml_model
+from model_cache import ModelCache, fingerprint
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.X = np.column_stack((rng.normal(0, 20, 500), rng.uniform(3.0, 4.2, 500)))
+        self.y = self.X[:, 1] / 4.2
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fingerprint_tracks_data_and_params(self):
+        """Test that the key changes with the data, its layout and the hyperparameters."""
+        key = fingerprint(self.X, self.y, n_estimators=10)
+        self.assertEqual(key, fingerprint(self.X.copy(), self.y, n_estimators=10))
+        self.assertNotEqual(key, fingerprint(self.X, self.y, n_estimators=20))
+        self.assertNotEqual(key, fingerprint(self.X.astype(np.float32), self.y, n_estimators=10))
+        X = self.X.copy()
+        X[0, 0] += 1e-9
+        self.assertNotEqual(key, fingerprint(X, self.y, n_estimators=10))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest entries are evicted once the size cap is exceeded."""
+        cache = ModelCache(self.directory.name, max_bytes=10000)
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, 'bin', lambda path: open(path, 'wb').write(b'x' * 1000))
+            os.utime(cache.path(key, 'bin'), (i, i))
+        cache.max_bytes = 2500
+        self.assertEqual(cache.evict(), ['a'])
+        self.assertIsNotNone(cache.get('b', 'bin'))
+        cache.put('d', 'bin', lambda path: open(path, 'wb').write(b'x' * 1000))
+        self.assertEqual([key for key, _, _ in cache.entries()], ['d', 'b'])
+
+    def test_cached_model_is_reused_until_inputs_change(self):
+        """Test that a second fit hits the cache and changed data retrains."""
+        cache = ModelCache(self.directory.name)
+        model, scaler = cached_ml_model(self.X, self.y, cache, n_estimators=5)
+        start = time.perf_counter()
+        cached, cached_scaler = cached_ml_model(self.X, self.y, cache, n_estimators=5)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        X_scaled = scaler.transform(self.X)
+        np.testing.assert_array_equal(cached_scaler.transform(self.X), X_scaled)
+        np.testing.assert_array_equal(cached.predict(X_scaled), model.predict(X_scaled))
+        self.assertEqual(len(cache.entries()), 1)
+
+        cached_ml_model(self.X[:400], self.y[:400], cache, n_estimators=5)
+        self.assertEqual(len(cache.entries()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
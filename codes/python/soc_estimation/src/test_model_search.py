@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from model_search import SEARCH_SPACE, candidates, pick_model, search
+
+
+class TestModelSearch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(0, 1, (600, 3))
+        self.y = np.clip(0.5 + 0.1 * self.X[:, 0] + rng.normal(0, 0.01, 600), 0, 1)
+
+    def test_candidates_cover_grid(self):
+        """Test that every grid point of every family is listed exactly once."""
+        listed = candidates(seed=3)
+        expected = sum(int(np.prod([len(v) for v in grid.values()])) for _, _, grid in SEARCH_SPACE.values())
+        self.assertEqual(len(listed), expected)
+        self.assertEqual(len({(family, tuple(params.items())) for family, params in listed}), expected)
+        with self.assertRaises(ValueError):
+            candidates(['svm'])
+
+    def test_search_and_pick(self):
+        """Test that the leaderboard is sorted and the latency budget is honoured."""
+        leaderboard = search(self.X, self.y, time_budget=60, workers=2, n_splits=3, families=['ridge'])
+        self.assertEqual(len(leaderboard), len(SEARCH_SPACE['ridge'][2]['alpha']))
+        self.assertTrue(leaderboard['rmse'].is_monotonic_increasing)
+        self.assertLess(leaderboard['rmse'].iloc[0], 0.02)
+        self.assertEqual(pick_model(leaderboard)['rmse'], leaderboard['rmse'].min())
+        with self.assertRaises(ValueError):
+            pick_model(leaderboard, max_latency_us=0)
+
+    def test_exhausted_budget_evaluates_nothing(self):
+        """Test that no candidate starts once the time budget is spent."""
+        self.assertTrue(search(self.X, self.y, time_budget=0, workers=1, families=['ridge']).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
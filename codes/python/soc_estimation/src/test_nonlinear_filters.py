@@ -0,0 +1,94 @@
+import importlib.util
+import unittest
+import numpy as np
+from nonlinear_filters import ExtendedKalmanFilter, NonlinearKalmanFilter, UnscentedKalmanFilter, sigma_points, sigma_weights
+
+ACCELERATION = 0.5
+YAW_RATE = 0.05
+
+
+def motion_model(states, dt):
+    x, y, v, psi = states.T
+    v = v + ACCELERATION * dt
+    psi = psi + YAW_RATE * dt
+    return np.column_stack((x + v * np.cos(psi) * dt, y + v * np.sin(psi) * dt, v, psi))
+
+
+def measurement_model(states):
+    return states[:, :3]
+
+
+class TestNonlinearFilters(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.measurements = np.cumsum(rng.normal(1.0, 1.0, (300, 3)), axis=0)
+        self.x = np.array([0.0, 0.0, 15.0, np.pi / 6])
+        self.Q = np.diag([0.1, 0.1, 0.1, 0.01])
+        self.R = np.diag([1.0, 1.0, 0.5])
+
+    def test_sigma_points(self):
+        """Test that the cached weights reproduce mean and covariance from the sigma points."""
+        self.assertIs(sigma_weights(4, 0.1, 2.0, 0.0), sigma_weights(4, 0.1, 2.0, 0.0))
+        lambda_, Wm, Wc = sigma_weights(4, 0.1, 2.0, 0.0)
+        self.assertAlmostEqual(Wm.sum(), 1.0)
+        P = np.array([[2.0, 0.3, 0, 0], [0.3, 1.0, 0.1, 0], [0, 0.1, 0.5, 0], [0, 0, 0, 0.1]])
+        sigmas = sigma_points(self.x, P, lambda_)
+        self.assertEqual(sigmas.shape, (9, 4))
+        np.testing.assert_allclose(Wm @ sigmas, self.x)
+        d = sigmas - self.x
+        np.testing.assert_allclose((d.T * Wc) @ d, P, atol=1e-12)
+
+    def test_base_class_is_abstract(self):
+        """Test that the common base class cannot be instantiated without predict and update."""
+        with self.assertRaises(TypeError):
+            NonlinearKalmanFilter(self.x, np.eye(4), self.Q, self.R, motion_model, measurement_model)
+
+    @unittest.skipIf(importlib.util.find_spec('filterpy') is None, 'filterpy not installed')
+    def test_ukf_matches_filterpy(self):
+        """Test that the batched UKF follows FilterPy's per-sigma-point UKF."""
+        from filterpy.kalman import MerweScaledSigmaPoints
+        from filterpy.kalman import UnscentedKalmanFilter as FilterPyUKF
+
+        points = MerweScaledSigmaPoints(n=4, alpha=0.1, beta=2, kappa=0)
+        reference = FilterPyUKF(dim_x=4, dim_z=3, dt=0.1, points=points,
+                                fx=lambda state, dt: motion_model(state[None], dt)[0],
+                                hx=lambda state: measurement_model(state[None])[0])
+        reference.x, reference.P, reference.Q, reference.R = self.x.copy(), np.eye(4), self.Q, self.R
+        expected = []
+        for z in self.measurements:
+            reference.predict()
+            reference.update(z)
+            expected.append(reference.x.copy())
+
+        ukf = UnscentedKalmanFilter(self.x, np.eye(4), self.Q, self.R, motion_model, measurement_model,
+                                    alpha=0.1, beta=2, kappa=0)
+        states, covariances = ukf.run(self.measurements, dt=0.1)
+        np.testing.assert_allclose(states, expected, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(covariances[-1], reference.P, rtol=1e-9, atol=1e-12)
+
+    @unittest.skipIf(importlib.util.find_spec('filterpy') is None, 'filterpy not installed')
+    def test_ekf_on_linear_model_matches_kalman_filter(self):
+        """Test that the EKF reduces to FilterPy's linear Kalman filter for a linear model."""
+        from filterpy.kalman import KalmanFilter
+
+        F = np.array([[1.0, 0.1], [0.0, 1.0]])
+        H = np.array([[1.0, 0.0]])
+        measurements = np.cumsum(np.random.default_rng(1).normal(0, 1, 200))
+        reference = KalmanFilter(dim_x=2, dim_z=1)
+        reference.x, reference.P, reference.F, reference.H = np.zeros(2), np.eye(2), F, H
+        reference.Q, reference.R = np.eye(2) * 0.01, np.array([[0.5]])
+        expected = []
+        for z in measurements:
+            reference.predict()
+            reference.update(z)
+            expected.append(reference.x.copy())
+
+        ekf = ExtendedKalmanFilter(np.zeros(2), np.eye(2), np.eye(2) * 0.01, 0.5,
+                                   lambda states, dt: states @ F.T, lambda states: states @ H.T,
+                                   lambda x, dt: F, lambda x: H)
+        states, _ = ekf.run(measurements)
+        np.testing.assert_allclose(states, expected, rtol=1e-10, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from coulomb_counting import coulomb_counting
+from kalman_filter import kalman_filter_estimation
+from pipeline import Stage, run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.arrays = {'current': rng.normal(1, 5, 5000), 'voltage': rng.uniform(3.0, 4.2, 5000)}
+
+    def test_matches_sequential_run(self):
+        """Test that process and thread stages return the same as direct calls."""
+        kwargs = dict(initial_soc=0.9, battery_capacity=3600, dt=1)
+        stages = [
+            Stage('cc', coulomb_counting, ['current'], kwargs),
+            Stage('kf', kalman_filter_estimation, ['current', 'voltage'], kwargs),
+            Stage('kf_thread', kalman_filter_estimation, ['current', 'voltage'], kwargs, executor='thread'),
+        ]
+        results, timings = run_pipeline(self.arrays, stages)
+        np.testing.assert_array_equal(results['cc'], coulomb_counting(self.arrays['current'], **kwargs))
+        expected_kf = kalman_filter_estimation(self.arrays['current'], self.arrays['voltage'], **kwargs)
+        np.testing.assert_array_equal(results['kf'], expected_kf)
+        np.testing.assert_array_equal(results['kf_thread'], expected_kf)
+        self.assertEqual(set(timings), {'cc', 'kf', 'kf_thread', 'total'})
+
+    def test_returned_views_are_copied(self):
+        """Test that a stage returning its shared input gets a private copy back."""
+        results, _ = run_pipeline(self.arrays, [Stage('identity', _identity, ['current'])])
+        np.testing.assert_array_equal(results['identity'], self.arrays['current'])
+
+    def test_rejects_missing_input(self):
+        """Test that stages referring to unknown arrays are rejected up front."""
+        with self.assertRaises(ValueError):
+            run_pipeline(self.arrays, [Stage('cc', coulomb_counting, ['temperature'])])
+
+
+def _identity(current):
+    return current
+
+
+if __name__ == '__main__':
+    unittest.main()
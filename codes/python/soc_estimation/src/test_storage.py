@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from storage import FORMATS, iter_data, load_data, save_data
+
+_HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather', 'npz': '.npz'}
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = pd.DataFrame({
+            'time': 1.7e9 + np.arange(1000) / 10,
+            'current': rng.normal(0, 5, 1000),
+            'voltage': rng.uniform(3.0, 4.2, 1000),
+        })
+        self.chunks = [self.data.iloc[i:i + 300].reset_index(drop=True) for i in range(0, 1000, 300)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _formats(self):
+        return FORMATS if _HAS_PYARROW else ('csv', 'npz')
+
+    def _save(self, format, **kwargs):
+        path = os.path.join(self.directory.name, 'data' + _EXTENSIONS[format])
+        save_data(iter(self.chunks), path, **kwargs)
+        return path
+
+    def test_round_trip(self):
+        """Test that chunked saves round-trip in every format, with float32 columns but float64 time."""
+        for format in self._formats():
+            with self.subTest(format=format):
+                path = self._save(format, float_dtype=None)
+                pd.testing.assert_frame_equal(load_data(path), self.data, check_exact=format != 'csv',
+                                              rtol=1e-14)
+                compact = load_data(self._save(format))
+                np.testing.assert_array_equal(compact['time'], self.data['time'])
+                np.testing.assert_allclose(compact['current'], self.data['current'], rtol=1e-6)
+                if format != 'csv':
+                    self.assertEqual(compact['time'].dtype, np.float64)
+                    self.assertEqual(compact['voltage'].dtype, np.float32)
+
+    def test_row_and_column_selection(self):
+        """Test that load_data returns exactly the requested rows and columns."""
+        for format in self._formats():
+            with self.subTest(format=format):
+                path = self._save(format, float_dtype=None)
+                for start, stop in ((0, 10), (250, 650), (990, None)):
+                    data = load_data(path, columns=['time', 'voltage'], start=start, stop=stop)
+                    expected = self.data[['time', 'voltage']].iloc[start:stop].reset_index(drop=True)
+                    pd.testing.assert_frame_equal(data.reset_index(drop=True), expected, rtol=1e-14)
+                empty = load_data(path, columns=['time', 'voltage'], start=1000)
+                self.assertEqual((len(empty), list(empty.columns)), (0, ['time', 'voltage']))
+
+    def test_iter_data_chunks(self):
+        """Test that iter_data yields consecutive chunks of the requested size covering the file."""
+        for format in self._formats():
+            with self.subTest(format=format):
+                path = self._save(format, float_dtype=None)
+                chunks = list(iter_data(path, chunk_size=128, columns=['current']))
+                self.assertEqual([len(chunk) for chunk in chunks], [128] * 7 + [104])
+                self.assertEqual(list(chunks[0].columns), ['current'])
+                np.testing.assert_allclose(pd.concat(chunks)['current'], self.data['current'], rtol=1e-14, atol=1e-15)
+        with self.assertRaises(ValueError):
+            next(iter_data(path, chunk_size=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from coulomb_counting import coulomb_counting
+from kalman_filter import kalman_filter_estimation
+from telemetry import RECORD_DTYPE, TelemetryReader, iter_soc_estimates, write_telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 1000
+        self.data = pd.DataFrame({
+            'time': np.arange(n, dtype=float),
+            'current': rng.normal(2, 20, n),
+            'voltage': rng.uniform(3.0, 4.2, n),
+        })
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'battery.tlm')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Test that chunked writes are read back exactly, window by window."""
+        chunks = [self.data.iloc[i:i + 300] for i in range(0, len(self.data), 300)]
+        self.assertEqual(write_telemetry(self.path, chunks, temperature=30.0), len(self.data))
+
+        reader = TelemetryReader(self.path)
+        self.assertEqual(len(reader), len(self.data))
+        windows = list(reader.windows(128))
+        self.assertEqual([len(w) for w in windows[:-1]], [128] * (len(windows) - 1))
+        records = np.concatenate(windows)
+        self.assertEqual(records.dtype, RECORD_DTYPE)
+        np.testing.assert_array_equal(records['current'], self.data['current'])
+        np.testing.assert_array_equal(records['temperature'], 30.0)
+        np.testing.assert_array_equal(reader.read(10, 20)['time'], np.arange(10, 20))
+
+    def test_windowed_estimates_match_whole_trace(self):
+        """Test that carrying state across windows reproduces the one-shot estimators."""
+        write_telemetry(self.path, self.data)
+        current = self.data['current'].values
+        voltage = self.data['voltage'].values
+        expected_cc = coulomb_counting(current, 0.8, 3600, 1)
+        expected_kf = kalman_filter_estimation(current, voltage, 0.8, 3600, 1)
+
+        for dt in (None, 1):
+            estimates = pd.concat(iter_soc_estimates(self.path, window_size=97, initial_soc=0.8, dt=dt))
+            self.assertEqual(estimates['soc_cc'].values.tobytes(), expected_cc.tobytes())
+            self.assertEqual(estimates['soc_kf'].values.tobytes(), expected_kf.tobytes())
+
+    def test_rejects_foreign_file(self):
+        """Test that files without the telemetry header are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(b'time,current,voltage\n')
+        with self.assertRaises(ValueError):
+            TelemetryReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
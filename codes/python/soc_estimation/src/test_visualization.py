@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from visualization import decimate_minmax, render_plots
+
+
+class TestVisualization(unittest.TestCase):
+    def test_decimate_keeps_bucket_extremes(self):
+        """Test that min/max decimation keeps each bucket's extremes in time order."""
+        rng = np.random.default_rng(0)
+        time = np.arange(10007, dtype=float)
+        values = rng.normal(size=len(time))
+        t, v = decimate_minmax(time, values, 100)
+        self.assertLessEqual(len(v), 200)
+        self.assertTrue(np.all(np.diff(t) > 0))
+        np.testing.assert_array_equal(v, values[t.astype(int)])
+        self.assertEqual(v.min(), values.min())
+        self.assertEqual(v.max(), values.max())
+        for start in range(0, len(values), 101):
+            bucket = values[start:start + 101]
+            self.assertIn(bucket.min(), v)
+            self.assertIn(bucket.max(), v)
+
+        short_t, short_v = decimate_minmax(time[:150], values[:150], 100)
+        np.testing.assert_array_equal(short_v, values[:150])
+
+    def test_render_plots_to_files(self):
+        """Test that plots render to PNG and SVG files without a display."""
+        time = np.arange(5000, dtype=float)
+        soc = np.linspace(1, 0, len(time))
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = [dict(time=time, soc_cc=soc, soc_kf=soc, soc_ml=None, soc_gt=soc,
+                         output_path=os.path.join(directory, 'plots', name))
+                    for name in ('a.png', 'b.svg')]
+            paths = render_plots(jobs, workers=2)
+            self.assertEqual(paths, [job['output_path'] for job in jobs])
+            with open(paths[0], 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+            with open(paths[1]) as f:
+                self.assertIn('<svg', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
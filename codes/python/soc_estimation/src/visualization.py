@@ -1,24 +1,126 @@
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
 
-def plot_soc(time, soc_cc, soc_kf, soc_ml, soc_gt):
+FIGSIZE = (15, 8)
+DPI = 100
+# Series of plot_soc: (argument name, label, line style).
+_SERIES = (
+    ('soc_gt', 'Ground Truth SoC', {'linestyle': '--', 'color': 'black'}),
+    ('soc_cc', 'Coulomb Counting', {'alpha': 0.7}),
+    ('soc_kf', 'Kalman Filter', {'alpha': 0.7}),
+    ('soc_ekf', 'Extended Kalman Filter', {'alpha': 0.7}),
+    ('soc_ml', 'Machine Learning Model', {'alpha': 0.7}),
+)
+
+
+def decimate_minmax(time, values, n_columns):
+    """
+    Min/max decimation for plotting.
+
+    The samples are split into ``n_columns`` buckets of equal sample count,
+    i.e. pixel columns for a uniformly sampled trace, and only the minimum
+    and maximum of each bucket are kept, in their original order. The line
+    drawn through them covers the same pixels as the full trace.
+
+    Parameters:
+        time (array): Time data, increasing.
+        values (array): Series to decimate.
+        n_columns (int): Number of buckets, typically the plot width in pixels.
+
+    Returns:
+        time (array): Decimated time data.
+        values (array): Decimated series, at most 2 * n_columns samples.
+    """
+    time = np.asarray(time)
+    values = np.asarray(values)
+    n = len(values)
+    if n <= 2 * n_columns:
+        return time, values
+    bucket = -(-n // n_columns)
+    n_buckets = -(-n // bucket)
+    # Padding with the last value cannot change any bucket's extremes.
+    padded = np.concatenate((values, np.full(n_buckets * bucket - n, values[-1]))).reshape(n_buckets, bucket)
+    offsets = np.arange(n_buckets) * bucket
+    index = np.concatenate((offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)))
+    index = np.unique(np.minimum(index, n - 1))
+    return time[index], values[index]
+
+
+def _draw_soc(ax, time, series, title, decimate, n_columns):
+    for name, label, style in _SERIES:
+        if series[name] is None:
+            continue
+        x, y = decimate_minmax(time, series[name], n_columns) if decimate else (time, series[name])
+        ax.plot(x, y, label=label, **style)
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('State of Charge (SoC)')
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+
+
+def plot_soc(time, soc_cc, soc_kf, soc_ml, soc_gt, output_path=None, decimate=True, dpi=DPI,
+             title='Battery State of Charge Estimation', soc_ekf=None):
     """
     Plots SoC estimations from different methods.
-    
+
+    Without ``output_path`` the plot is shown interactively. With it, the
+    figure is rendered by the Agg (or SVG) backend straight to the file,
+    which needs no display.
+
     Parameters:
         time (array): Time data in seconds.
         soc_cc (array): SoC from Coulomb Counting.
         soc_kf (array): SoC from Kalman Filter.
-        soc_ml (array): SoC from Machine Learning.
-        soc_gt (array): Ground Truth SoC.
+        soc_ml (array): SoC from Machine Learning; omitted if None.
+        soc_gt (array): Ground Truth SoC; omitted if None.
+        output_path (str, optional): Image file (.png, .svg, ...) to write.
+        decimate (bool): Draw only the min/max per pixel column, see
+            ``decimate_minmax``.
+        dpi (int): Resolution; also sets the number of pixel columns.
+        title (str): Plot title.
+        soc_ekf (array, optional): SoC from the equivalent-circuit EKF/UKF.
     """
-    plt.figure(figsize=(15, 8))
-    plt.plot(time, soc_gt, label='Ground Truth SoC', linestyle='--', color='black')
-    plt.plot(time, soc_cc, label='Coulomb Counting', alpha=0.7)
-    plt.plot(time, soc_kf, label='Kalman Filter', alpha=0.7)
-    plt.plot(time, soc_ml, label='Machine Learning Model', alpha=0.7)
-    plt.xlabel('Time (s)')
-    plt.ylabel('State of Charge (SoC)')
-    plt.title('Battery State of Charge Estimation')
-    plt.legend()
-    plt.grid(True)
+    series = {'soc_cc': soc_cc, 'soc_kf': soc_kf, 'soc_ekf': soc_ekf, 'soc_ml': soc_ml, 'soc_gt': soc_gt}
+    n_columns = int(FIGSIZE[0] * dpi)
+    if output_path is not None:
+        fig = Figure(figsize=FIGSIZE, dpi=dpi)
+        _draw_soc(fig.add_subplot(), time, series, title, decimate, n_columns)
+        fig.savefig(output_path)
+        return
+
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=FIGSIZE, dpi=dpi)
+    _draw_soc(fig.add_subplot(), time, series, title, decimate, n_columns)
     plt.show()
+
+
+def _render_job(job):
+    plot_soc(**job)
+    return job['output_path']
+
+
+def render_plots(jobs, workers=None):
+    """
+    Renders many SoC plots to files on a process pool, e.g. one per vehicle.
+
+    Parameters:
+        jobs (list): Keyword arguments of ``plot_soc``, each with an
+            ``output_path``.
+        workers (int, optional): Worker processes; os.cpu_count() if None.
+
+    Returns:
+        paths (list): Written files, in job order.
+    """
+    for job in jobs:
+        if job.get('output_path') is None:
+            raise ValueError("Every job needs an output_path")
+        directory = os.path.dirname(job['output_path'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    if len(jobs) == 1 or workers == 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_render_job, jobs))